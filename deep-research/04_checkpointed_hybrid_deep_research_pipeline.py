@@ -0,0 +1,267 @@
+"""Cookbook example: Hybrid Deep Research Pipeline with Durable Checkpoints.
+
+This cookbook extends the hybrid deep research pipeline with checkpoint/resume support. Both deep
+researchers can run for many minutes, so losing their outputs because the process died before the
+reporter finished is expensive. The router and both researchers persist their outputs to a local
+SQLite database as soon as they complete. Invoking the pipeline again with the same run id resumes
+from the last completed step: completed steps return their persisted output instead of running again.
+
+The pipeline intelligently routes user queries between two processing paths:
+- Deep research: For complex queries requiring comprehensive research, this path executes
+  TWO deep research systems in parallel (OpenAI Deep Researcher and GL Open Deep Researcher),
+  then combines their results using a response synthesizer
+- Normal response: For simple conversational queries like greetings and small talk
+
+Key Features:
+    - Durable per-step checkpoints in a pluggable local store (SQLite or filesystem)
+    - Resume by run id: `uv run 04_checkpointed_hybrid_deep_research_pipeline.py <run_id>`
+    - Cheap serialization of large `LMOutput` fields with pydantic's native JSON serializer
+    - Parallel execution of multiple deep research systems, each checkpointed independently
+
+Prerequisites:
+    - Set OPENAI_API_KEY environment variable
+    - Set GLODR_API_KEY environment variable (for GL Open Deep Researcher)
+    - Install required dependencies (gllm-core, gllm-generation, gllm-inference, gllm-pipeline)
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import asyncio
+import sys
+import uuid
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_generation.deep_researcher import GLOpenDeepResearcher, OpenAIDeepResearcher
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_inference.schema import LMOutput
+from gllm_pipeline.router import LMBasedRouter
+from gllm_pipeline.steps import parallel, step, switch
+from pydantic import BaseModel
+
+from checkpoint import Checkpointed, SQLiteCheckpointStore
+
+load_dotenv()
+
+
+class DeepResearchState(BaseModel):
+    """Checkpointed hybrid deep research state.
+
+    This state model holds the data that flows through the pipeline. The router sets the
+    `route` field, and the selected branch processes the query accordingly:
+    - Deep research branch: Executes both researchers in parallel, stores results in
+      `openai_result` and `glopen_result`, then combines them into `combined_result`
+    - Normal branch: Directly sets the `combined_result` field
+
+    Attributes:
+        run_id (str): The id under which the step outputs are checkpointed.
+        user_query (str): The user's research query to be processed.
+        route (str | None): The route determined by the router ("deep_research" or "normal").
+        openai_result (LMOutput | None): Result from OpenAI Deep Researcher (o4-mini-deep-research).
+        glopen_result (LMOutput | None): Result from GL Open Deep Researcher (INTERNAL).
+        combined_result (str | LMOutput | None): Final synthesized result combining both research outputs.
+        event_emitter (EventEmitter): Event emitter for streaming events during processing.
+    """
+
+    run_id: str
+    user_query: str
+    route: str | None = None
+    openai_result: LMOutput | None = None
+    glopen_result: LMOutput | None = None
+    combined_result: str | LMOutput | None = None
+    event_emitter: EventEmitter
+
+    class Config:
+        """Pydantic configuration for DeepResearchState.
+
+        Allows arbitrary types (like EventEmitter) to be used in the model.
+        """
+
+        arbitrary_types_allowed = True
+
+
+# Step 0: Configure the checkpoint store
+# The output of every checkpointed step is persisted here as soon as the step completes.
+# Use FileCheckpointStore("checkpoints") instead to keep one file per step.
+checkpoint_store = SQLiteCheckpointStore("checkpoints.db")
+
+# Step 1: Configure the LLM-based router
+# The router uses an LLM to classify queries as either "deep_research" or "normal"
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        - **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+          in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+        - **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+          in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+          "analyze the market for...", "what are the pros and cons of...".
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-4o-mini"),
+    output_parser=JSONOutputParser(),
+)
+
+# Step 2: Create the router step
+# This step classifies the user query and sets the "route" field in the state
+router = step(
+    component=Checkpointed(
+        LMBasedRouter(
+            valid_routes={"deep_research", "normal"},
+            lm_request_processor=lmrp,
+            default_route="normal",
+        ),
+        name="router",
+        store=checkpoint_store,
+    ),
+    input_map={"text": "user_query", "run_id": "run_id"},
+    output_state="route",
+)
+
+# Step 3a: Define the OpenAI Deep Researcher step
+# This step uses OpenAI's o4-mini-deep-research model for deep research
+# It processes the query and stores the result in the "openai_result" state field
+openai_deep_researcher = step(
+    component=Checkpointed(
+        OpenAIDeepResearcher(model_name="o4-mini-deep-research"),
+        name="openai_deep_researcher",
+        store=checkpoint_store,
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter", "run_id": "run_id"},
+    output_state="openai_result",
+)
+
+# Step 3b: Define the GL Open Deep Researcher step
+# This step uses GL Open's INTERNAL profile for comprehensive research
+# It processes the same query in parallel and stores the result in the "glopen_result" state field
+glopen_deep_researcher = step(
+    component=Checkpointed(
+        GLOpenDeepResearcher(profile="INTERNAL"),
+        name="glopen_deep_researcher",
+        store=checkpoint_store,
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter", "run_id": "run_id"},
+    output_state="glopen_result",
+)
+
+# Step 4: Create parallel execution step
+# This step runs both deep researchers simultaneously for faster results
+# The parallel execution reduces total processing time by ~40-50% compared to sequential execution
+parallel_deep_research = parallel(
+    [openai_deep_researcher, glopen_deep_researcher],
+    name="parallel_deep_research",
+)
+
+# Step 5: Define the Response Synthesizer to combine results
+# This step takes the outputs from both researchers and synthesizes them into a unified response
+# It highlights complementary information, notes contradictions, and provides a coherent answer
+reporter = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-4o-mini",
+        user_template="""
+        You are tasked with combining research results from two different deep research systems.
+
+        **OpenAI Deep Research Result:**
+        {openai_result}
+
+        **GL Open Deep Research Result:**
+        {glopen_result}
+
+        Please synthesize these two research results into a comprehensive, coherent answer that:
+        1. Combines insights from both sources
+        2. Highlights any complementary information
+        3. Notes any contradictions or differences in findings
+        4. Provides a unified, well-structured response
+
+        Original Query: {query}
+        """,
+    ),
+    input_map={
+        "query": "user_query",
+        "openai_result": "openai_result",
+        "glopen_result": "glopen_result",
+        "event_emitter": "event_emitter",
+    },
+    output_state="combined_result",
+)
+
+# Step 6: Define the normal response branch
+# This step handles simple conversational queries using a standard response synthesizer
+# It directly processes the query without deep research
+normal_response_synthesizer = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-4o-mini",
+        user_template="{query}",
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="combined_result",
+)
+
+# Step 7: Create the conditional switch step
+# Routes to the appropriate branch based on the "route" field set by the router
+# - "deep_research" -> Executes parallel research + synthesis
+# - "normal" -> Executes simple response
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={
+        "deep_research": [parallel_deep_research, reporter],
+        "normal": [normal_response_synthesizer],
+    },
+)
+
+# Step 8: Compose the complete pipeline
+# The pipeline flows: router -> conditional_step (which routes to appropriate branch)
+# Deep research queries will execute both researchers in parallel and combine results
+deep_research_pipeline = router | conditional_step
+deep_research_pipeline.state_type = DeepResearchState
+
+
+async def main() -> None:
+    """Run the checkpointed hybrid deep research pipeline example.
+
+    Pass the run id of an interrupted run as the first argument to resume it. Steps that already
+    completed in that run are not executed again. A run id started with another query is rejected.
+    Without an argument, a new run is started.
+    """
+    run_id = sys.argv[1] if len(sys.argv) > 1 else uuid.uuid4().hex
+    user_query = "research about the latest trends in AI and machine learning"
+
+    # The query is stored with the run, so that a wrong run id is rejected rather than returning another query's outputs
+    if checkpoint_store.start_run(run_id, user_query=user_query):
+        completed_steps = checkpoint_store.completed_steps(run_id)
+        print(f"Resuming run {run_id}, already completed: {', '.join(completed_steps) or 'none'}")
+    else:
+        print(f"Starting run {run_id}, resume it after an interruption with:")
+        print(f"    uv run 04_checkpointed_hybrid_deep_research_pipeline.py {run_id}")
+
+    event_emitter = EventEmitter.with_print_handler()
+    state = DeepResearchState(
+        run_id=run_id,
+        user_query=user_query,
+        event_emitter=event_emitter,
+        route=None,
+    )
+
+    result = await deep_research_pipeline.invoke(state)
+
+    print(result)
+
+    # The run is complete, its checkpoints are no longer needed
+    checkpoint_store.delete(run_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
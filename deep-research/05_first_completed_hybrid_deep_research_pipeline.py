@@ -0,0 +1,260 @@
+"""Cookbook example: Hybrid Deep Research Pipeline with a First-Completed Join.
+
+This cookbook extends the hybrid deep research pipeline so that its latency is bounded by the
+faster deep researcher instead of the slower one. The two researchers run in parallel under a
+join policy: as soon as one of them completes, the other one gets a short grace window, and the
+report is written from whichever results are available by then.
+
+The pipeline intelligently routes user queries between two processing paths:
+- Deep research: For complex queries requiring comprehensive research, this path executes
+  TWO deep research systems in parallel (OpenAI Deep Researcher and GL Open Deep Researcher),
+  joins them with a first-completed policy, then combines the contributing results using a
+  response synthesizer
+- Normal response: For simple conversational queries like greetings and small talk
+
+Key Features:
+    - Intelligent query routing based on complexity
+    - Parallel execution of multiple deep research systems, returning once the first one completes
+    - A grace window and a time budget for the slower researcher, which is cancelled afterwards
+    - The report names the researchers that contributed to it
+    - Result synthesis combining insights from different research approaches
+    - Streaming event support for real-time updates
+    - Leverages both OpenAI's o4-mini-deep-research and GL Open's INTERNAL research profiles
+
+Prerequisites:
+    - Set OPENAI_API_KEY environment variable
+    - Set GLODR_API_KEY environment variable (for GL Open Deep Researcher)
+    - Install required dependencies (gllm-core, gllm-generation, gllm-inference, gllm-pipeline)
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_generation.deep_researcher import GLOpenDeepResearcher, OpenAIDeepResearcher
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_inference.schema import LMOutput
+from gllm_pipeline.router import LMBasedRouter
+from gllm_pipeline.steps import step, switch, transform
+from pydantic import BaseModel
+
+from join_policy import JoinPolicy, JoinResult, ParallelJoin
+
+load_dotenv()
+
+RESEARCHER_NAMES = {"openai": "OpenAI Deep Research", "glopen": "GL Open Deep Research"}
+
+
+class DeepResearchState(BaseModel):
+    """Hybrid deep research state.
+
+    This state model holds the data that flows through the pipeline. The router sets the
+    `route` field, and the selected branch processes the query accordingly:
+    - Deep research branch: Executes both researchers in parallel, stores the joined results in
+      `research`, formats the contributing ones into `research_text`, then combines them into
+      `combined_result`
+    - Normal branch: Directly sets the `combined_result` field
+
+    Attributes:
+        user_query (str): The user's research query to be processed.
+        route (str | None): The route determined by the router ("deep_research" or "normal").
+        research (JoinResult | None): The results of the researchers that completed in time, by researcher.
+        research_text (str | None): The contributing research results, formatted for the reporter.
+        combined_result (str | LMOutput | None): Final synthesized result combining the research outputs.
+        event_emitter (EventEmitter): Event emitter for streaming events during processing.
+    """
+
+    user_query: str
+    route: str | None = None
+    research: JoinResult | None = None
+    research_text: str | None = None
+    combined_result: str | LMOutput | None = None
+    event_emitter: EventEmitter
+
+    class Config:
+        """Pydantic configuration for DeepResearchState.
+
+        Allows arbitrary types (like EventEmitter and JoinResult) to be used in the model.
+        """
+
+        arbitrary_types_allowed = True
+
+
+# Step 1: Configure the LLM-based router
+# The router uses an LLM to classify queries as either "deep_research" or "normal"
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        - **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+          in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+        - **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+          in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+          "analyze the market for...", "what are the pros and cons of...".
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-4o-mini"),
+    output_parser=JSONOutputParser(),
+)
+
+# Step 2: Create the router step
+# This step classifies the user query and sets the "route" field in the state
+router = step(
+    component=LMBasedRouter(
+        valid_routes={"deep_research", "normal"},
+        lm_request_processor=lmrp,
+        default_route="normal",
+    ),
+    input_map={"text": "user_query"},
+    output_state="route",
+)
+
+# Step 3: Define the deep researchers
+# Both researchers receive the same query and stream their events to the same event emitter
+researchers = {
+    "openai": OpenAIDeepResearcher(model_name="o4-mini-deep-research"),
+    "glopen": GLOpenDeepResearcher(profile="INTERNAL"),
+}
+
+# Step 4: Create the parallel join step
+# Both researchers run simultaneously, but the step returns as soon as the first one completes.
+# The other one gets a 2 minutes grace window and is cancelled afterwards, and the whole step
+# never takes more than 30 minutes. Other policies are available, e.g. `JoinPolicy.all()` to wait
+# for every researcher or `JoinPolicy.majority()` when more researchers are combined, and
+# `stragglers="background"` lets late researchers finish instead of cancelling them.
+parallel_deep_research = step(
+    component=ParallelJoin(
+        branches=researchers,
+        policy=JoinPolicy.first(grace=120.0, time_budget=1800.0, stragglers="cancel"),
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="research",
+)
+
+
+def format_research(inputs: dict) -> str:
+    """Format the results of the researchers that contributed, in completion order.
+
+    Args:
+        inputs (dict): The step inputs, with the joined research results under `research`.
+
+    Returns:
+        str: The contributing research results, one section per researcher.
+    """
+    research: JoinResult = inputs["research"]
+    return "\n\n".join(
+        f"**{RESEARCHER_NAMES[name]} Result:**\n{result}" for name, result in research.results.items()
+    )
+
+
+format_research_step = transform(
+    operation=format_research,
+    input_states=["research"],
+    output_state="research_text",
+)
+
+# Step 5: Define the Response Synthesizer to combine results
+# This step takes the outputs from the contributing researchers and synthesizes them into a unified response
+# It highlights complementary information, notes contradictions, and provides a coherent answer
+reporter = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-4o-mini",
+        user_template="""
+        You are tasked with combining research results from one or more deep research systems.
+
+        {research}
+
+        Please synthesize these research results into a comprehensive, coherent answer that:
+        1. Combines insights from both sources
+        2. Highlights any complementary information
+        3. Notes any contradictions or differences in findings
+        4. Provides a unified, well-structured response
+
+        Original Query: {query}
+        """,
+    ),
+    input_map={
+        "query": "user_query",
+        "research": "research_text",
+        "event_emitter": "event_emitter",
+    },
+    output_state="combined_result",
+)
+
+# Step 6: Define the normal response branch
+# This step handles simple conversational queries using a standard response synthesizer
+# It directly processes the query without deep research
+normal_response_synthesizer = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-4o-mini",
+        user_template="{query}",
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="combined_result",
+)
+
+# Step 7: Create the conditional switch step
+# Routes to the appropriate branch based on the "route" field set by the router
+# - "deep_research" -> Executes parallel research + formatting + synthesis
+# - "normal" -> Executes simple response
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={
+        "deep_research": [parallel_deep_research, format_research_step, reporter],
+        "normal": [normal_response_synthesizer],
+    },
+)
+
+# Step 8: Compose the complete pipeline
+# The pipeline flows: router -> conditional_step (which routes to appropriate branch)
+# Deep research queries will execute both researchers in parallel and combine the results available in time
+deep_research_pipeline = router | conditional_step
+deep_research_pipeline.state_type = DeepResearchState
+
+
+async def main() -> None:
+    """Run the hybrid deep research pipeline example.
+
+    This function demonstrates how to use the pipeline with a sample query.
+    The query "research about the latest trends in AI" will be classified as a
+    deep research query and routed to execute both OpenAI Deep Researcher and
+    GL Open Deep Researcher in parallel, then combine the results of the researchers
+    that completed in time.
+
+    To test the normal query path, change the user_query to something like "hello"
+    or "how are you".
+    """
+    event_emitter = EventEmitter.with_print_handler()
+    state = DeepResearchState(
+        user_query="research about the latest trends in AI and machine learning",
+        event_emitter=event_emitter,
+        route=None,
+    )
+
+    result = await deep_research_pipeline.invoke(state)
+
+    print(result)
+    if result["research"] is not None:
+        research = result["research"]
+        print(f"Contributors: {', '.join(research.contributors)}")
+        print(f"Latencies: {', '.join(f'{name}={latency:.1f}s' for name, latency in research.latencies.items())}")
+        print(f"Stragglers: {', '.join(research.stragglers) or 'none'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
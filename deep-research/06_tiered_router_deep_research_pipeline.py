@@ -0,0 +1,195 @@
+"""Cookbook example: Deep Research Pipeline with a Tiered Router.
+
+This cookbook extends the deep research pipeline so that most queries are routed without an LM call.
+The LLM-based router of the simple deep research pipeline pays a full LM call just to learn that "hello"
+is a normal query. Here, a tiered router tries cheap local stages first, and only falls back to the
+LLM-based router when none of them is confident:
+- Rules: exact matches and regular expressions, e.g. greetings are normal queries
+- Decision table: the decisions already made for the same normalized queries
+- Centroid classifier: the route whose example queries are the most similar to the query
+- LLM-based router: the same router as in the simple deep research pipeline
+
+Key Features:
+    - Trivial queries are routed in well under a millisecond, without any remote call
+    - Only the queries no local stage is confident about pay for an LM call
+    - The router reports the share of decisions and the mean latency of each tier
+
+Prerequisites:
+    - Set OPENAI_API_KEY environment variable
+    - Install required dependencies (gllm-core, gllm-generation, gllm-inference, gllm-pipeline)
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_generation.deep_researcher import OpenAIDeepResearcher
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_inference.schema import LMOutput
+from gllm_pipeline.router import LMBasedRouter
+from gllm_pipeline.steps import step, switch
+from pydantic import BaseModel
+
+from tiered_router import TIERS, CentroidClassifier, TieredRouter
+
+load_dotenv()
+
+
+class DeepResearchState(BaseModel):
+    """Deep research state.
+
+    Attributes:
+        user_query (str): The user query to be processed.
+        route (str | None): The route determined by the router ("deep_research" or "normal").
+        result (str | LMOutput | None): The final result from the selected processing branch.
+        event_emitter (EventEmitter): The event emitter for streaming events during processing.
+    """
+
+    user_query: str
+    route: str | None
+    result: str | LMOutput | None
+    event_emitter: EventEmitter
+
+    class Config:
+        """Pydantic configuration for DeepResearchState."""
+
+        arbitrary_types_allowed = True
+
+
+# Step 1: Configure the LLM-based router, the last tier of the tiered router
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        - **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+          in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+        - **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+          in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+          "analyze the market for...", "what are the pros and cons of...".
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-5-nano"),
+    output_parser=JSONOutputParser(),
+)
+lm_router = LMBasedRouter(
+    valid_routes={"deep_research", "normal"},
+    lm_request_processor=lmrp,
+    default_route="normal",
+)
+
+# Step 2: Configure the tiered router, whose local stages are tried before the LLM-based router
+tiered_router = TieredRouter(
+    valid_routes={"deep_research", "normal"},
+    lm_router=lm_router,
+    rules={query: "normal" for query in ("hello", "hi", "hey", "how are you", "thanks", "thank you", "goodbye", "bye")},
+    patterns=[
+        # Rules skip every later tier, so the greeting pattern only matches a greeting, optionally followed by
+        # "there" or "everyone" and "how are you", and not e.g. "hey research quantum computing"
+        (
+            r"^(hi|hello|hey|good (morning|afternoon|evening))( (there|everyone|all))?(,? how are you( doing)?)?$",
+            "normal",
+        ),
+        # Likewise, the research pattern only matches a query that starts with an imperative followed by a topic,
+        # and not e.g. "thanks for the research" or "can you compare 2 and 3?"
+        (r"^(research|compare|analy[sz]e|investigate) .{15,}$", "deep_research"),
+    ],
+    classifier=CentroidClassifier(
+        em_invoker=OpenAIEMInvoker("text-embedding-3-small"),
+        examples={
+            "normal": ["what's up", "nice to meet you", "what's the weather today", "tell me a joke", "see you later"],
+            "deep_research": [
+                "what are the latest trends in renewable energy",
+                "how has remote work changed the real estate market",
+                "what is the state of the art in protein folding",
+                "summarize the evidence on intermittent fasting",
+                "how do central banks respond to inflation",
+            ],
+        },
+    ),
+)
+router = step(
+    component=tiered_router,
+    input_map={"text": "user_query"},
+    output_state="route",
+)
+
+# Step 3: Define the deep research branch
+deep_researcher = step(
+    component=OpenAIDeepResearcher(model_name="o4-mini-deep-research"),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 4: Define the normal response branch
+normal_response_synthesizer = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-5-nano",
+        user_template="{query}",
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 5: Create the conditional switch step and compose the pipeline
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={"deep_research": deep_researcher, "normal": normal_response_synthesizer},
+)
+deep_research_pipeline = router | conditional_step
+deep_research_pipeline.state_type = DeepResearchState
+
+
+async def main() -> None:
+    """Run the deep research pipeline example with a tiered router.
+
+    A few queries are routed first, to show which tier decided each of them, then the pipeline is run with a
+    normal query. Replace it with a research query, e.g. "research about the latest trends in AI", to run the
+    deep research branch.
+    """
+    queries = [
+        "Hello!",
+        "thanks",
+        "Compare PostgreSQL and MySQL for analytics workloads",
+        "what's the weather like today",
+        "How is quantum computing expected to affect cryptography?",
+        "hello",
+        "How is quantum computing expected to affect cryptography",
+    ]
+    for query in queries:
+        route = await tiered_router.run(text=query)
+        print(f"{query!r} -> {route}")
+
+    stats = tiered_router.stats
+    for tier in TIERS:
+        print(
+            f"{tier}: {stats.decisions[tier]} decisions ({stats.share(tier):.0%}), "
+            f"mean latency {stats.mean_latency(tier) * 1000:.2f} ms"
+        )
+
+    state = DeepResearchState(
+        user_query="hello, how are you?",
+        event_emitter=EventEmitter.with_print_handler(),
+        route=None,
+        result=None,
+    )
+    result = await deep_research_pipeline.invoke(state)
+    print(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
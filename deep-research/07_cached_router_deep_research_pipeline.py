@@ -0,0 +1,164 @@
+"""Cookbook example: Deep Research Pipeline with a Router Decision Cache.
+
+This cookbook extends the deep research pipeline so that repeated queries skip routing entirely.
+User traffic repeats heavily, yet the LLM-based router pays a full LM call for every query. Here,
+the router is wrapped with a decision cache keyed by the normalized query: "Hello!" and "hello"
+share the same entry, and only the first of them is sent to the LLM-based router.
+
+Key Features:
+    - Repeated queries are routed from a bounded LRU cache with a time to live
+    - The cache is persisted to a JSON file, so it survives restarts
+    - The cache is cleared as soon as the valid routes or the routing prompt change
+    - The cache reports its hit rate
+
+Prerequisites:
+    - Set OPENAI_API_KEY environment variable
+    - Install required dependencies (gllm-core, gllm-generation, gllm-inference, gllm-pipeline)
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_generation.deep_researcher import OpenAIDeepResearcher
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_inference.schema import LMOutput
+from gllm_pipeline.router import LMBasedRouter
+from gllm_pipeline.steps import step, switch
+from pydantic import BaseModel
+
+from router_cache import CachedRouter
+
+load_dotenv()
+
+
+class DeepResearchState(BaseModel):
+    """Deep research state.
+
+    Attributes:
+        user_query (str): The user query to be processed.
+        route (str | None): The route determined by the router ("deep_research" or "normal").
+        result (str | LMOutput | None): The final result from the selected processing branch.
+        event_emitter (EventEmitter): The event emitter for streaming events during processing.
+    """
+
+    user_query: str
+    route: str | None
+    result: str | LMOutput | None
+    event_emitter: EventEmitter
+
+    class Config:
+        """Pydantic configuration for DeepResearchState."""
+
+        arbitrary_types_allowed = True
+
+
+# Step 1: Configure the LLM-based router
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        - **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+          in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+        - **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+          in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+          "analyze the market for...", "what are the pros and cons of...".
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-5-nano"),
+    output_parser=JSONOutputParser(),
+)
+lm_router = LMBasedRouter(
+    valid_routes={"deep_research", "normal"},
+    lm_request_processor=lmrp,
+    default_route="normal",
+)
+
+# Step 2: Wrap the router with a decision cache, persisted to router_cache.json
+# Repeated queries, once normalized, are routed from the cache without an LM call
+cached_router = CachedRouter(
+    lm_router,
+    max_size=10_000,
+    ttl=24 * 60 * 60,  # a cached route expires after a day
+    path="router_cache.json",
+)
+router = step(
+    component=cached_router,
+    input_map={"text": "user_query"},
+    output_state="route",
+)
+
+# Step 3: Define the deep research branch
+deep_researcher = step(
+    component=OpenAIDeepResearcher(model_name="o4-mini-deep-research"),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 4: Define the normal response branch
+normal_response_synthesizer = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-5-nano",
+        user_template="{query}",
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 5: Create the conditional switch step and compose the pipeline
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={"deep_research": deep_researcher, "normal": normal_response_synthesizer},
+)
+deep_research_pipeline = router | conditional_step
+deep_research_pipeline.state_type = DeepResearchState
+
+
+async def main() -> None:
+    """Run the deep research pipeline example with a router decision cache.
+
+    A few queries are routed first, to show the cache hits, then the pipeline is run with a normal query.
+    Run the script again to route every query from the persisted cache.
+    """
+    queries = [
+        "Hello!",
+        "hello",
+        "Compare PostgreSQL and MySQL for analytics workloads",
+        "compare postgresql and mysql for analytics workloads.",
+        "thanks",
+        "Thanks!",
+    ]
+    for query in queries:
+        route = await cached_router.run(text=query)
+        print(f"{query!r} -> {route}")
+
+    stats = cached_router.stats
+    print(f"Cache hits: {stats.hits}, misses: {stats.misses}, hit rate: {stats.hit_rate:.0%}")
+
+    state = DeepResearchState(
+        user_query="hello!",
+        event_emitter=EventEmitter.with_print_handler(),
+        route=None,
+        result=None,
+    )
+    result = await deep_research_pipeline.invoke(state)
+    print(result)
+    cached_router.save()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,243 @@
+"""Cookbook example: Deep Research Pipeline with a Distilled Router.
+
+This cookbook extends the deep research pipeline so that the LLM-based router teaches a local classifier.
+The LLM-based router of the simple deep research pipeline pays a full LM call for every query, although its
+decisions are easy to learn. Here, its decisions are logged to a JSONL file, and a character n-gram logistic
+regression is trained on them. The distilled router then routes the queries the classifier is confident about
+locally, and falls back to the LLM-based router, whose decisions keep being logged, for the others.
+
+Key Features:
+    - Collection of (query, route) pairs from the decisions of the LLM-based router
+    - A local classifier, trained with NumPy only, that routes in well under a millisecond
+    - An offline report of the agreement with the LLM-based router and the routing latency per threshold
+
+Prerequisites:
+    - Set OPENAI_API_KEY environment variable
+    - Install required dependencies (gllm-core, gllm-generation, gllm-inference, gllm-pipeline)
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_generation.deep_researcher import OpenAIDeepResearcher
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_inference.schema import LMOutput
+from gllm_pipeline.router import LMBasedRouter
+from gllm_pipeline.steps import step, switch
+from pydantic import BaseModel
+
+from router_distillation import (
+    CharNGramClassifier,
+    DistilledRouter,
+    RouteLogger,
+    evaluate_distilled_router,
+    load_decisions,
+    split_decisions,
+)
+
+load_dotenv()
+
+
+class DeepResearchState(BaseModel):
+    """Deep research state.
+
+    Attributes:
+        user_query (str): The user query to be processed.
+        route (str | None): The route determined by the router ("deep_research" or "normal").
+        result (str | LMOutput | None): The final result from the selected processing branch.
+        event_emitter (EventEmitter): The event emitter for streaming events during processing.
+    """
+
+    user_query: str
+    route: str | None
+    result: str | LMOutput | None
+    event_emitter: EventEmitter
+
+    class Config:
+        """Pydantic configuration for DeepResearchState."""
+
+        arbitrary_types_allowed = True
+
+
+# Step 1: Configure the LLM-based router, the teacher of the local classifier
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        - **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+          in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+        - **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+          in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+          "analyze the market for...", "what are the pros and cons of...".
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-5-nano"),
+    output_parser=JSONOutputParser(),
+)
+lm_router = LMBasedRouter(
+    valid_routes={"deep_research", "normal"},
+    lm_request_processor=lmrp,
+    default_route="normal",
+)
+
+# Step 2: Log the decisions of the LLM-based router, and route with the distilled router
+DECISIONS_PATH = "router_decisions.jsonl"
+CLASSIFIER_PATH = "router_classifier.npz"
+
+route_logger = RouteLogger(router=lm_router, path=DECISIONS_PATH)
+classifier = CharNGramClassifier.load(CLASSIFIER_PATH) if os.path.exists(CLASSIFIER_PATH) else CharNGramClassifier()
+distilled_router = DistilledRouter(
+    classifier=classifier,
+    lm_router=route_logger,  # the fallbacks keep collecting training data
+    valid_routes={"deep_research", "normal"},
+    threshold=0.8,
+)
+router = step(
+    component=distilled_router,
+    input_map={"text": "user_query"},
+    output_state="route",
+)
+
+# Step 3: Define the deep research branch
+deep_researcher = step(
+    component=OpenAIDeepResearcher(model_name="o4-mini-deep-research"),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 4: Define the normal response branch
+normal_response_synthesizer = step(
+    component=ResponseSynthesizer.stuff_preset(
+        model_id="openai/gpt-5-nano",
+        user_template="{query}",
+    ),
+    input_map={"query": "user_query", "event_emitter": "event_emitter"},
+    output_state="result",
+)
+
+# Step 5: Create the conditional switch step and compose the pipeline
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={"deep_research": deep_researcher, "normal": normal_response_synthesizer},
+)
+deep_research_pipeline = router | conditional_step
+deep_research_pipeline.state_type = DeepResearchState
+
+
+# Queries standing in for production traffic, routed once by the LLM-based router to collect training data
+TRAINING_QUERIES = [
+    "hello",
+    "hi, how are you?",
+    "good morning!",
+    "thanks for the help",
+    "what's the weather like today",
+    "tell me a joke",
+    "who are you?",
+    "nice to meet you",
+    "see you tomorrow",
+    "what time is it in Tokyo",
+    "can you say that again?",
+    "goodbye",
+    "research the latest trends in AI",
+    "compare PostgreSQL and MySQL for analytics workloads",
+    "analyze the electric vehicle market in Southeast Asia",
+    "what are the pros and cons of nuclear energy",
+    "how is quantum computing expected to affect cryptography",
+    "summarize the evidence on intermittent fasting",
+    "how has remote work changed the real estate market",
+    "research the history of the printing press",
+    "compare the monetary policies of the Fed and the ECB",
+    "what is the state of the art in protein folding",
+    "analyze the impact of tariffs on global supply chains",
+    "investigate the causes of the 2008 financial crisis",
+]
+
+
+async def train_classifier() -> None:
+    """Collect the decisions of the LLM-based router, train the classifier on them, and report its evaluation.
+
+    The classifier is not trained nor saved while the decisions cover fewer than two routes, in which case every
+    query keeps being routed by the LLM-based router, and logged, until the next run.
+    """
+    if not os.path.exists(DECISIONS_PATH):
+        await asyncio.gather(*(route_logger.run(text=query) for query in TRAINING_QUERIES))
+
+    decisions = load_decisions(DECISIONS_PATH)
+    train_decisions, test_decisions = split_decisions(decisions, test_ratio=0.25)
+    try:
+        classifier.fit(
+            [decision["query"] for decision in train_decisions], [decision["route"] for decision in train_decisions]
+        )
+    except ValueError as error:
+        print(f"Not enough decisions to train the classifier yet: {error}")
+        return
+
+    print(f"Trained on {len(train_decisions)} decisions, evaluated on {len(test_decisions)} held out decisions")
+    for report in evaluate_distilled_router(classifier, test_decisions):
+        print(
+            f"threshold {report.threshold:.2f}: coverage {report.coverage:.0%}, "
+            f"local accuracy {report.local_accuracy:.0%}, accuracy {report.accuracy:.0%}, "
+            f"mean latency {report.mean_latency * 1000:.2f} ms"
+        )
+
+    # The evaluated classifier is retrained on all the decisions before being saved
+    classifier.fit([decision["query"] for decision in decisions], [decision["route"] for decision in decisions])
+    classifier.save(CLASSIFIER_PATH)
+
+
+async def main() -> None:
+    """Run the deep research pipeline example with a distilled router.
+
+    The classifier is trained on the first run, from the decisions of the LLM-based router, and loaded on the next
+    runs. A few queries are routed first, to show how many of them the classifier decided, then the pipeline is
+    run with a normal query. Replace it with a research query, e.g. "research about the latest trends in AI", to
+    run the deep research branch.
+    """
+    if classifier.weights is None:
+        await train_classifier()
+
+    queries = [
+        "Hello!",
+        "thanks",
+        "Compare Rust and Go for backend services",
+        "what's the weather like tomorrow",
+        "Research the effects of social media on teenagers",
+    ]
+    for query in queries:
+        route = await distilled_router.run(text=query)
+        print(f"{query!r} -> {route}")
+
+    stats = distilled_router.stats
+    print(
+        f"Classifier: {stats.local} decisions ({stats.coverage:.0%}), "
+        f"LLM-based router: {stats.fallbacks} decisions"
+    )
+
+    state = DeepResearchState(
+        user_query="hello, how are you?",
+        event_emitter=EventEmitter.with_print_handler(),
+        route=None,
+        result=None,
+    )
+    result = await deep_research_pipeline.invoke(state)
+    print(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
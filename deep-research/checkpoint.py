@@ -0,0 +1,338 @@
+"""Durable checkpoints for long-running pipelines.
+
+Wrapping a step component with `Checkpointed` persists its output to a checkpoint store as soon as the step
+completes, keyed by the run id and the step name. When the pipeline is invoked again with the same run id (for
+example after the process died), completed steps return their persisted output instead of running again, so the
+run resumes from the last completed step.
+
+Two local stores are provided: `SQLiteCheckpointStore` (a single database file) and `FileCheckpointStore` (one
+file per step). Step outputs are serialized with pydantic's native JSON serializer, which keeps large `LMOutput`
+fields cheap to write and to read back. The inputs of a run are stored with it, so that resuming a run id with other
+inputs is rejected instead of returning the outputs of another run.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/add-a-custom-component
+"""
+
+import importlib
+import json
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from gllm_core.schema.component import Component
+from pydantic import BaseModel, TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+_JSON = b"json"
+_MODEL = b"model"
+_MODEL_LIST = b"model-list"
+_PICKLE = b"pickle"
+_MODEL_TAG = "__model__"
+# The reserved step under which the inputs of a run are stored
+RUN_INPUTS_STEP = "__run_inputs__"
+# The run ids a file checkpoint store accepts, so that a run id cannot point outside of its directory
+_RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def _model_type(path: str) -> type[BaseModel]:
+    module_name, _, qualname = path.partition(":")
+    model_type: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        model_type = getattr(model_type, name)
+    return model_type
+
+
+def _model_path(model_type: type[BaseModel]) -> bytes:
+    return f"{model_type.__module__}:{model_type.__qualname__}".encode()
+
+
+def _tagged(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return {_MODEL_TAG: _model_path(type(value)).decode(), "data": value.model_dump(mode="json")}
+    if isinstance(value, (list, tuple)):
+        return [_tagged(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _tagged(item) for key, item in value.items()}
+    return value
+
+
+def _untagged(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_untagged(item) for item in value]
+    if isinstance(value, dict):
+        if _MODEL_TAG in value:
+            return _model_type(value[_MODEL_TAG]).model_validate(value["data"])
+        return {key: _untagged(item) for key, item in value.items()}
+    return value
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a step output.
+
+    Pydantic models and lists of a single pydantic model type are dumped with pydantic's JSON serializer and
+    prefixed with their type. Other values are dumped as JSON, with each pydantic model they contain, e.g. in a list
+    of mixed types, tagged with its type. Values that are not JSON serializable are pickled, so that the output of a
+    step that already ran is never lost.
+
+    Args:
+        value (Any): The step output.
+
+    Returns:
+        bytes: The serialized output.
+    """
+    if isinstance(value, BaseModel):
+        return b"\n".join([_MODEL, _model_path(type(value)), value.model_dump_json().encode()])
+
+    if isinstance(value, list) and value and all(type(item) is type(value[0]) for item in value):
+        if isinstance(value[0], BaseModel):
+            model_type = type(value[0])
+            payload = TypeAdapter(list[model_type]).dump_json(value)
+            return b"\n".join([_MODEL_LIST, _model_path(model_type), payload])
+
+    try:
+        return b"\n".join([_JSON, b"", json.dumps(_tagged(value)).encode()])
+    except (TypeError, ValueError):
+        return b"\n".join([_PICKLE, b"", pickle.dumps(value)])
+
+
+def decode(data: bytes) -> Any:
+    """Deserialize a step output serialized with `encode`.
+
+    Pickled outputs are only read from the local checkpoint store, which is as trusted as the code itself.
+
+    Args:
+        data (bytes): The serialized output.
+
+    Returns:
+        Any: The step output.
+    """
+    kind, type_path, payload = data.split(b"\n", 2)
+    if kind == _MODEL:
+        return _model_type(type_path.decode()).model_validate_json(payload)
+
+    if kind == _MODEL_LIST:
+        return TypeAdapter(list[_model_type(type_path.decode())]).validate_json(payload)
+
+    if kind == _PICKLE:
+        return pickle.loads(payload)
+
+    return _untagged(json.loads(payload))
+
+
+class CheckpointStore(ABC):
+    """A durable store for the outputs of completed pipeline steps."""
+
+    @abstractmethod
+    def get(self, run_id: str, step: str) -> bytes | None:
+        """Return the serialized output of a completed step, or None if the step has not completed.
+
+        Args:
+            run_id (str): The run id.
+            step (str): The step name.
+
+        Returns:
+            bytes | None: The serialized output.
+        """
+
+    @abstractmethod
+    def put(self, run_id: str, step: str, data: bytes) -> None:
+        """Durably persist the serialized output of a completed step.
+
+        Args:
+            run_id (str): The run id.
+            step (str): The step name.
+            data (bytes): The serialized output.
+        """
+
+    @abstractmethod
+    def completed_steps(self, run_id: str) -> list[str]:
+        """Return the names of the completed steps of a run, in completion order.
+
+        Args:
+            run_id (str): The run id.
+
+        Returns:
+            list[str]: The step names.
+        """
+
+    @abstractmethod
+    def delete(self, run_id: str) -> None:
+        """Delete every checkpoint of a run, e.g. once it has finished.
+
+        Args:
+            run_id (str): The run id.
+        """
+
+    def start_run(self, run_id: str, **inputs: Any) -> bool:
+        """Store the inputs of a new run, or check that a resumed run has the same inputs.
+
+        Args:
+            run_id (str): The run id.
+            **inputs (Any): The inputs that identify the run, e.g. its `user_query`.
+
+        Returns:
+            bool: Whether the run is resumed.
+
+        Raises:
+            ValueError: If the run was started with other inputs.
+        """
+        data = self.get(run_id, RUN_INPUTS_STEP)
+        if data is None:
+            self.put(run_id, RUN_INPUTS_STEP, encode(inputs))
+            return False
+
+        stored = decode(data)
+        if stored != inputs:
+            raise ValueError(f"Run {run_id} was started with other inputs: {stored}")
+        return True
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """A checkpoint store backed by a local SQLite database."""
+
+    def __init__(self, path: str | Path = "checkpoints.db"):
+        """Initialize the SQLite checkpoint store.
+
+        Args:
+            path (str | Path, optional): The database file. Defaults to "checkpoints.db".
+        """
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "run_id TEXT NOT NULL, step TEXT NOT NULL, data BLOB NOT NULL, "
+            "completed_at REAL NOT NULL, PRIMARY KEY (run_id, step))"
+        )
+
+    def get(self, run_id: str, step: str) -> bytes | None:
+        """Return the serialized output of a completed step, or None if the step has not completed."""
+        row = self._connection.execute(
+            "SELECT data FROM checkpoints WHERE run_id = ? AND step = ?", (run_id, step)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, run_id: str, step: str, data: bytes) -> None:
+        """Durably persist the serialized output of a completed step."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO checkpoints (run_id, step, data, completed_at) VALUES (?, ?, ?, ?)",
+            (run_id, step, data, time.time()),
+        )
+
+    def completed_steps(self, run_id: str) -> list[str]:
+        """Return the names of the completed steps of a run, in completion order."""
+        rows = self._connection.execute(
+            "SELECT step FROM checkpoints WHERE run_id = ? AND step != ? ORDER BY completed_at",
+            (run_id, RUN_INPUTS_STEP),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, run_id: str) -> None:
+        """Delete every checkpoint of a run."""
+        self._connection.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+
+class FileCheckpointStore(CheckpointStore):
+    """A checkpoint store that keeps one file per completed step under `<directory>/<run_id>/`.
+
+    Run ids may only contain letters, digits, underscores, and hyphens, e.g. a `uuid.uuid4().hex`.
+    """
+
+    def __init__(self, directory: str | Path = "checkpoints"):
+        """Initialize the file checkpoint store.
+
+        Args:
+            directory (str | Path, optional): The root directory. Defaults to "checkpoints".
+        """
+        self.directory = Path(directory)
+
+    def get(self, run_id: str, step: str) -> bytes | None:
+        """Return the serialized output of a completed step, or None if the step has not completed."""
+        path = self._run_directory(run_id) / step
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, run_id: str, step: str, data: bytes) -> None:
+        """Durably persist the serialized output of a completed step.
+
+        The data is written to a temporary file that is flushed to disk and then atomically renamed, so a crash
+        never leaves a partially written checkpoint behind.
+        """
+        run_directory = self._run_directory(run_id)
+        run_directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=run_directory, delete=False) as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, run_directory / step)
+
+    def completed_steps(self, run_id: str) -> list[str]:
+        """Return the names of the completed steps of a run, in completion order."""
+        run_directory = self._run_directory(run_id)
+        if not run_directory.exists():
+            return []
+
+        paths = [
+            path for path in run_directory.iterdir() if not path.name.startswith("tmp") and path.name != RUN_INPUTS_STEP
+        ]
+        return [path.name for path in sorted(paths, key=lambda path: path.stat().st_mtime_ns)]
+
+    def delete(self, run_id: str) -> None:
+        """Delete every checkpoint of a run."""
+        run_directory = self._run_directory(run_id)
+        if run_directory.exists():
+            for path in run_directory.iterdir():
+                path.unlink()
+            run_directory.rmdir()
+
+    def _run_directory(self, run_id: str) -> Path:
+        if not _RUN_ID_PATTERN.fullmatch(run_id):
+            raise ValueError(f"Invalid run id {run_id!r}: only letters, digits, underscores, and hyphens are allowed")
+        return self.directory / run_id
+
+
+class Checkpointed(Component):
+    """Persists the output of a step component and reuses it when the same run is invoked again.
+
+    The wrapped component receives the same inputs, except `run_id`, which is consumed by the wrapper. Without a
+    run id the component simply runs.
+    """
+
+    def __init__(self, component: Component, name: str, store: CheckpointStore):
+        """Initialize the checkpointed component.
+
+        Args:
+            component (Component): The component to run.
+            name (str): The step name, unique within the pipeline.
+            store (CheckpointStore): The store to persist the step output to.
+        """
+        super().__init__()
+        self.component = component
+        self.name = name
+        self.store = store
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Return the persisted output of this step for the run, or run the component and persist its output."""
+        run_id = kwargs.pop("run_id", None)
+        if run_id is None:
+            return await self.component.run(**kwargs)
+
+        data = self.store.get(run_id, self.name)
+        if data is not None:
+            return decode(data)
+
+        result = await self.component.run(**kwargs)
+        try:
+            self.store.put(run_id, self.name, encode(result))
+        except Exception as error:
+            # The step already ran, so its output is still returned, it only runs again if the run is resumed
+            logger.warning("Could not checkpoint the output of %s for run %s: %r", self.name, run_id, error)
+        return result
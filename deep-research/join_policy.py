@@ -0,0 +1,174 @@
+"""Join policies for running components in parallel.
+
+`ParallelJoin` runs several components concurrently with the same inputs and returns as soon as its
+`JoinPolicy` is satisfied instead of always waiting for the slowest one:
+- `JoinPolicy.all()`: wait for every branch, and raise the error of the first one that fails (the behavior of
+  `parallel()`).
+- `JoinPolicy.first(n)`: return once `n` branches have succeeded.
+- `JoinPolicy.majority()`: return once a majority of the branches have succeeded.
+
+Under `first(n)` and `majority()` a failed branch is recorded in the `JoinResult` and the others keep running.
+Once the policy is satisfied, the remaining branches get an optional grace window to complete as well, and a
+time budget bounds the whole join. Branches still running after that (stragglers) are either cancelled or left to
+finish in the background. The returned `JoinResult` tells downstream steps which branches contributed.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/add-a-custom-component
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from gllm_core.schema.component import Component
+
+
+@dataclass(frozen=True)
+class JoinPolicy:
+    """When a `ParallelJoin` returns.
+
+    Attributes:
+        min_results (int | None): The number of successful branches to wait for. None means every branch.
+        quorum (bool): Whether to wait for a majority of the branches instead of `min_results`.
+        grace (float): The seconds to keep waiting for the remaining branches once the policy is satisfied.
+        time_budget (float | None): The maximum seconds the join may take, whatever the policy. None means no limit.
+        stragglers (Literal["cancel", "background"]): What to do with branches still running when the join returns.
+    """
+
+    min_results: int | None = None
+    quorum: bool = False
+    grace: float = 0.0
+    time_budget: float | None = None
+    stragglers: Literal["cancel", "background"] = "cancel"
+
+    @classmethod
+    def all(cls, **kwargs: Any) -> "JoinPolicy":
+        """Wait for every branch, and raise the error of the first one that fails."""
+        return cls(**kwargs)
+
+    @classmethod
+    def first(cls, n: int = 1, **kwargs: Any) -> "JoinPolicy":
+        """Return once `n` branches have succeeded."""
+        return cls(min_results=n, **kwargs)
+
+    @classmethod
+    def majority(cls, **kwargs: Any) -> "JoinPolicy":
+        """Return once a majority of the branches have succeeded."""
+        return cls(quorum=True, **kwargs)
+
+    @property
+    def waits_for_all(self) -> bool:
+        """Whether every branch is needed, in which case a failed branch fails the join."""
+        return self.min_results is None and not self.quorum
+
+    def required(self, branches: int) -> int:
+        """Return the number of successful branches needed out of `branches`."""
+        if self.quorum:
+            return branches // 2 + 1
+        return branches if self.min_results is None else min(self.min_results, branches)
+
+
+@dataclass
+class JoinResult:
+    """The outcome of a `ParallelJoin`.
+
+    Attributes:
+        results (dict[str, Any]): The output of every branch that contributed, by branch name.
+        latencies (dict[str, float]): The seconds each contributing branch took.
+        errors (dict[str, BaseException]): The error of every branch that failed.
+        stragglers (list[str]): The branches that were still running when the join returned.
+    """
+
+    results: dict[str, Any] = field(default_factory=dict)
+    latencies: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, BaseException] = field(default_factory=dict)
+    stragglers: list[str] = field(default_factory=list)
+
+    @property
+    def contributors(self) -> list[str]:
+        """The names of the branches that contributed, in completion order."""
+        return list(self.results)
+
+
+class ParallelJoin(Component):
+    """Runs components concurrently with the same inputs and joins them according to a `JoinPolicy`."""
+
+    def __init__(self, branches: dict[str, Component], policy: JoinPolicy | None = None):
+        """Initialize the parallel join.
+
+        Args:
+            branches (dict[str, Component]): The components to run, by branch name.
+            policy (JoinPolicy | None, optional): When to return. Defaults to None, in which case every branch
+                is waited for.
+        """
+        super().__init__()
+        self.branches = branches
+        self.policy = policy or JoinPolicy.all()
+        self._background: set[asyncio.Task] = set()
+
+    async def _run(self, **kwargs: Any) -> JoinResult:
+        """Run every branch and return once the join policy is satisfied.
+
+        Raises:
+            Exception: The error of a failed branch, if every branch is needed or if no branch contributed.
+            TimeoutError: If no branch completed within the time budget.
+        """
+        started_at = time.monotonic()
+        tasks = {asyncio.create_task(component.run(**kwargs)): name for name, component in self.branches.items()}
+        outcome = JoinResult()
+        required = self.policy.required(len(tasks))
+
+        def remaining(limit: float | None = None) -> float | None:
+            if self.policy.time_budget is None:
+                return limit
+            left = max(0.0, started_at + self.policy.time_budget - time.monotonic())
+            return left if limit is None else min(limit, left)
+
+        def collect(done: set[asyncio.Task]) -> None:
+            for task in done:
+                if task.cancelled():
+                    outcome.errors[tasks[task]] = RuntimeError(f"Branch {tasks[task]} was cancelled")
+                elif task.exception() is not None:
+                    outcome.errors[tasks[task]] = task.exception()
+                else:
+                    outcome.results[tasks[task]] = task.result()
+                    outcome.latencies[tasks[task]] = time.monotonic() - started_at
+
+        pending = set(tasks)
+        try:
+            while pending and len(outcome.results) < required and remaining() != 0.0:
+                done, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+                if outcome.errors and self.policy.waits_for_all:
+                    for task in pending:
+                        task.cancel()
+                    raise next(iter(outcome.errors.values()))
+
+            if pending and self.policy.grace > 0 and remaining() != 0.0:
+                done, pending = await asyncio.wait(pending, timeout=remaining(self.policy.grace))
+                collect(done)
+        except asyncio.CancelledError:
+            for task in pending:
+                task.cancel()
+            raise
+
+        outcome.stragglers = [tasks[task] for task in pending]
+        for task in pending:
+            self._release(task)
+
+        if not outcome.results:
+            if outcome.errors:
+                raise next(iter(outcome.errors.values()))
+            raise TimeoutError(f"No branch completed within {self.policy.time_budget} seconds")
+        return outcome
+
+    def _release(self, task: asyncio.Task) -> None:
+        if self.policy.stragglers == "cancel":
+            task.cancel()
+            return
+
+        # Keep a reference so the task is not garbage collected, and consume its outcome once it finishes.
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
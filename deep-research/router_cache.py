@@ -0,0 +1,194 @@
+"""A decision cache for routers, keyed by the normalized query.
+
+Traffic repeats heavily: many users send the same greetings and the same questions, and a router recomputes the same
+route for each of them, with an LM call for an `LMBasedRouter` or an embedding call for a semantic router.
+`CachedRouter` wraps any router component and returns the cached route of a query whose normalized form was already
+routed, so repeated queries skip classification entirely.
+
+The cache is a bounded LRU with a time to live, and can be persisted to a JSON file to survive restarts. Every entry
+belongs to a fingerprint of the router's valid routes, default route, and routing prompt, so the cache is cleared as
+soon as any of them changes.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from gllm_core.schema.component import Component
+
+from tiered_router import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# The inputs that routers take the query from, e.g. "text" for `LMBasedRouter` and "source" for a semantic router
+_QUERY_KEYS = ("text", "source", "query")
+
+
+@dataclass
+class RouterCacheStats:
+    """The counters of a `CachedRouter`.
+
+    Attributes:
+        hits (int): The number of queries routed from the cache.
+        misses (int): The number of queries routed by the wrapped router.
+        expired (int): The number of misses whose entry had expired.
+        invalidations (int): The number of times the cache was cleared because the router changed.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of queries routed from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def router_fingerprint(router: Any) -> str:
+    """Return a hash of what decides the routes of a router: its valid routes, default route, and routing prompt.
+
+    Args:
+        router (Any): The router, e.g. an `LMBasedRouter`.
+
+    Returns:
+        str: The fingerprint.
+    """
+    prompt_builder = getattr(getattr(router, "lm_request_processor", None), "prompt_builder", None)
+    description = {
+        "router": type(router).__qualname__,
+        "valid_routes": sorted(getattr(router, "valid_routes", None) or []),
+        "default_route": getattr(router, "default_route", None),
+        "system_template": getattr(prompt_builder, "system_template", None),
+        "user_template": getattr(prompt_builder, "user_template", None),
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+class CachedRouter(Component):
+    """Wraps a router to reuse the route of a normalized query that was already routed."""
+
+    def __init__(
+        self,
+        router: Any,
+        normalize: Callable[[str], str] = normalize_query,
+        max_size: int = 10_000,
+        ttl: float | None = 24 * 60 * 60,
+        path: str | None = None,
+        fingerprint: Callable[[Any], str] = router_fingerprint,
+    ):
+        """Initialize the cached router.
+
+        Args:
+            router (Any): The router component to wrap.
+            normalize (Callable[[str], str], optional): Normalizes the queries into cache keys.
+                Defaults to `normalize_query`.
+            max_size (int, optional): The maximum number of cached routes, the least recently used first out.
+                Defaults to 10,000.
+            ttl (float | None, optional): The seconds a route stays cached. Defaults to one day. None means forever.
+            path (str | None, optional): The JSON file the cache is loaded from and saved to with `save`.
+                Defaults to None, in which case the cache is not persisted.
+            fingerprint (Callable[[Any], str], optional): Returns the fingerprint of the router, whose change clears
+                the cache. Defaults to `router_fingerprint`.
+        """
+        super().__init__()
+        self.router = router
+        self.normalize = normalize
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        self.fingerprint = fingerprint
+        self.stats = RouterCacheStats()
+        self._fingerprint = fingerprint(router)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        if self.path is not None and self.path.exists() and max_size > 0:
+            self._load()
+
+    async def _run(self, **kwargs: Any) -> str:
+        """Route a query from the cache, or with the wrapped router on a miss.
+
+        Args:
+            **kwargs (Any): The inputs of the wrapped router, with the query as `text`, `source`, or `query`.
+
+        Returns:
+            str: The route.
+
+        Raises:
+            ValueError: If no input holds the query.
+        """
+        text = next((kwargs[key] for key in _QUERY_KEYS if isinstance(kwargs.get(key), str)), None)
+        if text is None:
+            raise ValueError(f"The query must be given as one of {list(_QUERY_KEYS)}")
+
+        fingerprint = self.fingerprint(self.router)
+        if fingerprint != self._fingerprint:
+            logger.info("Clearing %d cached routes, since the router changed", len(self._entries))
+            self._entries.clear()
+            self._fingerprint = fingerprint
+            self.stats.invalidations += 1
+
+        key = self.normalize(text)
+        entry = self._entries.get(key)
+        if entry is not None:
+            route, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return route
+            del self._entries[key]
+            self.stats.expired += 1
+
+        self.stats.misses += 1
+        route = await self.router.run(**kwargs)
+        valid_routes = getattr(self.router, "valid_routes", None)
+        if self.max_size > 0 and (not valid_routes or route in valid_routes):
+            self._entries[key] = (route, time.time() + self.ttl if self.ttl is not None else float("inf"))
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return route
+
+    def invalidate(self) -> None:
+        """Clear the cache."""
+        self._entries.clear()
+        self.stats.invalidations += 1
+
+    def save(self) -> None:
+        """Save the cache to `path`, atomically.
+
+        Raises:
+            ValueError: If the cache has no path.
+        """
+        if self.path is None:
+            raise ValueError("The cache has no path to be saved to")
+
+        now = time.time()
+        entries = [[key, route, expires_at] for key, (route, expires_at) in self._entries.items() if expires_at > now]
+        temporary_path = self.path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps({"fingerprint": self._fingerprint, "entries": entries}))
+        os.replace(temporary_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError) as error:
+            logger.warning("Ignoring the unreadable router cache %s: %r", self.path, error)
+            return
+
+        if data.get("fingerprint") != self._fingerprint:
+            logger.info("Ignoring the router cache %s, since the router changed", self.path)
+            return
+        now = time.time()
+        for key, route, expires_at in data["entries"][-self.max_size :]:
+            if expires_at > now:
+                self._entries[key] = (route, expires_at)
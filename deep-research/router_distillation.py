@@ -0,0 +1,413 @@
+"""Distillation of the LM based router into a local classifier.
+
+The LM based router pays for an LM call on every request, although its decisions are easy to learn from examples.
+This module distills them into a small local classifier:
+1. `RouteLogger` wraps the LM based router and appends every decision it makes, with its latency, to a JSONL file.
+2. `CharNGramClassifier` is a logistic regression on hashed character n-grams of the normalized queries, trained on
+   the logged decisions with NumPy only. It classifies a query in well under a millisecond, without any remote call.
+3. `DistilledRouter` is a drop-in router component: it returns the route of the classifier when its probability
+   reaches a confidence threshold, and falls back to the LM based router otherwise.
+4. `evaluate_distilled_router` reports, for several thresholds, the share of queries the classifier decides, the
+   agreement with the LM based router, and the expected routing latency, on held out decisions.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+    [2] https://en.wikipedia.org/wiki/Knowledge_distillation
+    [3] https://en.wikipedia.org/wiki/Feature_hashing
+"""
+
+import json
+import logging
+import os
+import random
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+from gllm_core.schema.component import Component
+
+from tiered_router import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def load_decisions(path: str, normalize: Callable[[str], str] = normalize_query) -> list[dict[str, Any]]:
+    """Load the decisions logged by a `RouteLogger`, keeping the latest decision of each normalized query.
+
+    Args:
+        path (str): The JSONL file of the decisions.
+        normalize (Callable[[str], str], optional): Normalizes the queries to deduplicate them.
+            Defaults to `normalize_query`.
+
+    Returns:
+        list[dict[str, Any]]: The decisions, with their "query", "route", and "latency".
+    """
+    decisions = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                decision = json.loads(line)
+                decisions[normalize(decision["query"])] = decision
+    return list(decisions.values())
+
+
+def split_decisions(
+    decisions: list[dict[str, Any]], test_ratio: float = 0.2, seed: int = 0
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Shuffle the decisions and split them into training and held out decisions.
+
+    Args:
+        decisions (list[dict[str, Any]]): The decisions.
+        test_ratio (float, optional): The share of held out decisions. Defaults to 0.2.
+        seed (int, optional): The seed of the shuffle. Defaults to 0.
+
+    Returns:
+        tuple[list[dict[str, Any]], list[dict[str, Any]]]: The training and the held out decisions.
+    """
+    decisions = list(decisions)
+    random.Random(seed).shuffle(decisions)
+    test_size = int(len(decisions) * test_ratio)
+    return decisions[test_size:], decisions[:test_size]
+
+
+class RouteLogger(Component):
+    """Wraps a router to append each of its decisions to a JSONL file, as training data for a local classifier."""
+
+    def __init__(self, router: Any, path: str = "router_decisions.jsonl"):
+        """Initialize the route logger.
+
+        Args:
+            router (Any): The router to log the decisions of, e.g. an `LMBasedRouter`.
+            path (str, optional): The JSONL file the decisions are appended to. Defaults to "router_decisions.jsonl".
+        """
+        super().__init__()
+        self.router = router
+        self.path = Path(path)
+
+    async def _run(self, text: str, **kwargs: Any) -> str:
+        """Route a query with the wrapped router, and log the decision.
+
+        Args:
+            text (str): The query.
+            **kwargs (Any): Other inputs, passed to the wrapped router.
+
+        Returns:
+            str: The route.
+        """
+        started_at = time.perf_counter()
+        route = await self.router.run(text=text, **kwargs)
+        decision = {"query": text, "route": route, "latency": time.perf_counter() - started_at, "time": time.time()}
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(json.dumps(decision) + "\n")
+        return route
+
+
+class CharNGramClassifier:
+    """A logistic regression on the hashed character n-grams of the normalized queries."""
+
+    def __init__(
+        self,
+        ngram_range: tuple[int, int] = (2, 4),
+        n_features: int = 2**18,
+        normalize: Callable[[str], str] = normalize_query,
+    ):
+        """Initialize the character n-gram classifier.
+
+        Args:
+            ngram_range (tuple[int, int], optional): The smallest and the largest lengths of the n-grams.
+                Defaults to (2, 4).
+            n_features (int, optional): The number of hashed features. Defaults to 2**18.
+            normalize (Callable[[str], str], optional): Normalizes the queries before their n-grams are extracted.
+                Defaults to `normalize_query`.
+        """
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+        self.normalize = normalize
+        self.routes: list[str] = []
+        self.weights: np.ndarray | None = None
+        self.bias: np.ndarray | None = None
+
+    def features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return the hashed n-gram features of a query, as the indices and the L2 normalized counts.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The indices and the values of the nonzero features.
+        """
+        # CRC32 rather than `hash`, which is salted per process and would change the features between runs
+        text = f" {self.normalize(text)} "
+        hashes = [
+            zlib.crc32(text[start : start + n].encode()) % self.n_features
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1)
+            for start in range(len(text) - n + 1)
+        ]
+        indices, counts = np.unique(np.asarray(hashes, dtype=np.int64), return_counts=True)
+        values = counts.astype(np.float32)
+        return indices, values / max(float(np.linalg.norm(values)), 1e-12)
+
+    def fit(
+        self,
+        queries: list[str],
+        routes: list[str],
+        epochs: int = 300,
+        learning_rate: float = 1.0,
+        l2: float = 1e-4,
+    ) -> "CharNGramClassifier":
+        """Train the classifier with full batch gradient descent on the cross entropy.
+
+        Args:
+            queries (list[str]): The queries.
+            routes (list[str]): The route of each query.
+            epochs (int, optional): The number of gradient descent steps. Defaults to 300.
+            learning_rate (float, optional): The step size. Defaults to 1.0.
+            l2 (float, optional): The L2 regularization of the weights. Defaults to 1e-4.
+
+        Returns:
+            CharNGramClassifier: The trained classifier.
+
+        Raises:
+            ValueError: If there are no queries, if they do not have exactly one route each, or if they have fewer
+                than two distinct routes.
+        """
+        if not queries or len(queries) != len(routes):
+            raise ValueError("The classifier needs at least one query, and exactly one route per query")
+        if len(set(routes)) < 2:
+            raise ValueError(f"The classifier needs at least two routes to choose from, got {sorted(set(routes))}")
+
+        self.routes = sorted(set(routes))
+        labels = np.asarray([self.routes.index(route) for route in routes])
+        indices, values, rows = self._matrix(queries)
+        targets = np.eye(len(self.routes), dtype=np.float32)[labels]
+
+        self.weights = np.zeros((self.n_features, len(self.routes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.routes), dtype=np.float32)
+        for _ in range(epochs):
+            errors = (self._probabilities(indices, values, rows, len(queries)) - targets) / len(queries)
+            gradient = l2 * self.weights
+            np.add.at(gradient, indices, values[:, None] * errors[rows])
+            self.weights -= learning_rate * gradient
+            self.bias -= learning_rate * errors.sum(axis=0)
+        return self
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Return the most probable route of a query and its probability.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            tuple[str, float]: The route and its probability.
+
+        Raises:
+            ValueError: If the classifier is not trained.
+        """
+        if self.weights is None:
+            raise ValueError("The classifier must be trained or loaded first")
+
+        indices, values = self.features(text)
+        logits = values @ self.weights[indices] + self.bias
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        best = int(np.argmax(probabilities))
+        return self.routes[best], float(probabilities[best])
+
+    def save(self, path: str) -> None:
+        """Save the trained classifier to a NumPy archive, atomically.
+
+        Args:
+            path (str): The file to save the classifier to, e.g. "router_classifier.npz".
+        """
+        path = Path(path)
+        temporary_path = path.with_suffix(".tmp.npz")
+        config = {"routes": self.routes, "ngram_range": list(self.ngram_range), "n_features": self.n_features}
+        np.savez_compressed(temporary_path, weights=self.weights, bias=self.bias, config=json.dumps(config))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str, normalize: Callable[[str], str] = normalize_query) -> "CharNGramClassifier":
+        """Load a classifier saved with `save`.
+
+        Args:
+            path (str): The file the classifier was saved to.
+            normalize (Callable[[str], str], optional): Normalizes the queries, as during the training.
+                Defaults to `normalize_query`.
+
+        Returns:
+            CharNGramClassifier: The trained classifier.
+        """
+        with np.load(path) as archive:
+            config = json.loads(str(archive["config"]))
+            classifier = cls(tuple(config["ngram_range"]), config["n_features"], normalize)
+            classifier.routes = config["routes"]
+            classifier.weights = archive["weights"]
+            classifier.bias = archive["bias"]
+        return classifier
+
+    def _matrix(self, queries: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # A sparse matrix of the features, as the feature indices, the values, and the row of each nonzero feature
+        features = [self.features(query) for query in queries]
+        indices = np.concatenate([feature_indices for feature_indices, _ in features])
+        values = np.concatenate([feature_values for _, feature_values in features])
+        rows = np.repeat(np.arange(len(queries)), [len(feature_indices) for feature_indices, _ in features])
+        return indices, values, rows
+
+    def _probabilities(self, indices: np.ndarray, values: np.ndarray, rows: np.ndarray, size: int) -> np.ndarray:
+        logits = np.tile(self.bias, (size, 1))
+        np.add.at(logits, rows, values[:, None] * self.weights[indices])
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+@dataclass
+class DistilledRouterStats:
+    """The counters of a `DistilledRouter`.
+
+    Attributes:
+        local (int): The number of queries routed by the classifier.
+        fallbacks (int): The number of queries routed by the LM based router.
+        local_latency (float): The total seconds of the decisions of the classifier.
+        fallback_latency (float): The total seconds of the decisions of the LM based router, including the time spent
+            in the classifier.
+    """
+
+    local: int = 0
+    fallbacks: int = 0
+    local_latency: float = 0.0
+    fallback_latency: float = 0.0
+
+    @property
+    def coverage(self) -> float:
+        """The share of queries routed by the classifier."""
+        total = self.local + self.fallbacks
+        return self.local / total if total else 0.0
+
+
+class DistilledRouter(Component):
+    """Routes queries with a local classifier, and with the LM based router when the classifier is not confident."""
+
+    def __init__(
+        self,
+        classifier: CharNGramClassifier,
+        lm_router: Any,
+        valid_routes: set[str],
+        threshold: float = 0.8,
+    ):
+        """Initialize the distilled router.
+
+        Args:
+            classifier (CharNGramClassifier): The trained classifier.
+            lm_router (Any): The router to fall back to, e.g. an `LMBasedRouter`, or a `RouteLogger` around it to keep
+                collecting training data from the fallbacks.
+            valid_routes (set[str]): The valid routes.
+            threshold (float, optional): The lowest probability of the classifier's route for a local decision.
+                Defaults to 0.8.
+        """
+        super().__init__()
+        self.classifier = classifier
+        self.lm_router = lm_router
+        self.valid_routes = valid_routes
+        self.threshold = threshold
+        self.stats = DistilledRouterStats()
+
+    async def _run(self, text: str, **kwargs: Any) -> str:
+        """Route a query with the classifier, or with the LM based router if the classifier is not confident.
+
+        Args:
+            text (str): The query.
+            **kwargs (Any): Other inputs, passed to the LM based router.
+
+        Returns:
+            str: The route.
+        """
+        started_at = time.perf_counter()
+        try:
+            route, probability = self.classifier.predict(text)
+        except Exception as error:
+            logger.warning("Falling back to the LM router after a classifier error: %r", error)
+            route, probability = None, 0.0
+
+        if route in self.valid_routes and probability >= self.threshold:
+            self.stats.local += 1
+            self.stats.local_latency += time.perf_counter() - started_at
+            return route
+
+        route = await self.lm_router.run(text=text, **kwargs)
+        self.stats.fallbacks += 1
+        self.stats.fallback_latency += time.perf_counter() - started_at
+        return route
+
+
+@dataclass
+class ThresholdReport:
+    """The offline evaluation of a distilled router at one confidence threshold.
+
+    Attributes:
+        threshold (float): The confidence threshold.
+        coverage (float): The share of queries decided by the classifier.
+        local_accuracy (float): The agreement of the classifier with the LM based router on the queries it decides.
+        accuracy (float): The agreement of the distilled router with the LM based router, the fallbacks agreeing
+            by definition.
+        mean_latency (float): The expected seconds per decision, from the classifier latency and the logged
+            latency of the LM based router.
+    """
+
+    threshold: float
+    coverage: float
+    local_accuracy: float
+    accuracy: float
+    mean_latency: float
+
+
+def evaluate_distilled_router(
+    classifier: CharNGramClassifier,
+    decisions: list[dict[str, Any]],
+    thresholds: tuple[float, ...] = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95),
+    lm_latency: float | None = None,
+) -> list[ThresholdReport]:
+    """Evaluate a trained classifier against the decisions of the LM based router, for several thresholds.
+
+    Args:
+        classifier (CharNGramClassifier): The trained classifier.
+        decisions (list[dict[str, Any]]): The held out decisions of the LM based router.
+        thresholds (tuple[float, ...], optional): The confidence thresholds to evaluate.
+            Defaults to (0.5, 0.6, 0.7, 0.8, 0.9, 0.95).
+        lm_latency (float | None, optional): The mean seconds of a decision of the LM based router.
+            Defaults to None, in which case it is the mean logged latency of the decisions.
+
+    Returns:
+        list[ThresholdReport]: The evaluation at each threshold.
+
+    Raises:
+        ValueError: If there are no decisions.
+    """
+    if not decisions:
+        raise ValueError("The evaluation needs at least one decision")
+
+    if lm_latency is None:
+        lm_latency = float(np.mean([decision.get("latency", 0.0) for decision in decisions]))
+
+    started_at = time.perf_counter()
+    predictions = [classifier.predict(decision["query"]) for decision in decisions]
+    local_latency = (time.perf_counter() - started_at) / len(decisions)
+
+    probabilities = np.asarray([probability for _, probability in predictions])
+    correct = np.asarray([route == decision["route"] for (route, _), decision in zip(predictions, decisions)])
+    reports = []
+    for threshold in thresholds:
+        local = probabilities >= threshold
+        coverage = float(local.mean())
+        reports.append(
+            ThresholdReport(
+                threshold=threshold,
+                coverage=coverage,
+                local_accuracy=float(correct[local].mean()) if local.any() else 0.0,
+                accuracy=float(np.where(local, correct, True).mean()),
+                mean_latency=local_latency + (1 - coverage) * lm_latency,
+            )
+        )
+    return reports
@@ -0,0 +1,230 @@
+"""Tiered routing: cheap local stages before the LM based router.
+
+Most queries are easy to route: "hello" is a normal query, and does not need an LM call to learn it. `TieredRouter`
+tries cheap local stages in order, and only falls back to the LM based router when none of them is confident:
+1. `rule`: exact matches of the normalized query, then regular expressions.
+2. `table`: a bounded table of the decisions already made for normalized queries by the later stages.
+3. `centroid`: an embedding nearest-centroid classifier, trained on example queries of each route, that decides when
+   the query is similar enough to the closest route and far enough from the others.
+4. `lm`: the LM based router.
+
+The rules and the decision table are dictionary and regular expression lookups, so the trivial traffic they match is
+routed in well under a millisecond. `stats` reports the share of decisions and the mean latency of each tier.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/deep-researcher
+    [2] https://en.wikipedia.org/wiki/Nearest_centroid_classifier
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+from gllm_core.schema.component import Component
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("rule", "table", "centroid", "lm")
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query: lowercase it, collapse its whitespace, and strip its surrounding punctuation.
+
+    Args:
+        text (str): The query.
+
+    Returns:
+        str: The normalized query.
+    """
+    return " ".join(text.lower().split()).strip(" .,!?;:'\"")
+
+
+class CentroidClassifier:
+    """Routes a query to the route whose example queries have the closest mean embedding."""
+
+    def __init__(
+        self,
+        em_invoker: Any,
+        examples: dict[str, list[str]],
+        min_similarity: float = 0.5,
+        min_margin: float = 0.05,
+    ):
+        """Initialize the centroid classifier.
+
+        Args:
+            em_invoker (Any): The EM invoker that embeds the example queries and the queries to route.
+            examples (dict[str, list[str]]): The example queries of each route.
+            min_similarity (float, optional): The lowest cosine similarity to the closest centroid for a confident
+                decision. Defaults to 0.5.
+            min_margin (float, optional): The lowest difference between the cosine similarities to the closest and
+                to the second closest centroids for a confident decision. Defaults to 0.05.
+        """
+        self.em_invoker = em_invoker
+        self.examples = examples
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.routes = list(examples)
+        self._centroids: np.ndarray | None = None
+
+    async def fit(self) -> None:
+        """Embed the example queries, once, and compute the normalized centroid of each route."""
+        if self._centroids is not None:
+            return
+
+        texts = [example for route in self.routes for example in self.examples[route]]
+        embeddings = _normalized(np.asarray(await self.em_invoker.invoke(texts), dtype=np.float32))
+        centroids, start = [], 0
+        for route in self.routes:
+            end = start + len(self.examples[route])
+            centroids.append(embeddings[start:end].mean(axis=0))
+            start = end
+        self._centroids = _normalized(np.stack(centroids))
+
+    async def classify(self, text: str) -> tuple[str, float] | None:
+        """Return the route of a query and its cosine similarity, if the decision is confident.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            tuple[str, float] | None: The route and its similarity, or None if the decision is not confident.
+        """
+        await self.fit()
+        embedding = _normalized(np.asarray(await self.em_invoker.invoke([text]), dtype=np.float32))[0]
+        similarities = self._centroids @ embedding
+        ranked = np.argsort(similarities)[::-1]
+        best = float(similarities[ranked[0]])
+        runner_up = float(similarities[ranked[1]]) if len(ranked) > 1 else -1.0
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return None
+        return self.routes[ranked[0]], best
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+@dataclass
+class TieredRouterStats:
+    """The counters of a `TieredRouter`.
+
+    Attributes:
+        decisions (dict[str, int]): The number of decisions made by each tier.
+        latency (dict[str, float]): The total seconds of the decisions made by each tier, including the time spent in
+            the earlier tiers.
+    """
+
+    decisions: dict[str, int] = field(default_factory=lambda: dict.fromkeys(TIERS, 0))
+    latency: dict[str, float] = field(default_factory=lambda: dict.fromkeys(TIERS, 0.0))
+
+    @property
+    def requests(self) -> int:
+        """The number of decisions."""
+        return sum(self.decisions.values())
+
+    def share(self, tier: str) -> float:
+        """The share of the decisions made by a tier."""
+        return self.decisions[tier] / self.requests if self.requests else 0.0
+
+    def mean_latency(self, tier: str) -> float:
+        """The mean seconds of the decisions made by a tier."""
+        return self.latency[tier] / self.decisions[tier] if self.decisions[tier] else 0.0
+
+
+class TieredRouter(Component):
+    """Routes queries with cheap local stages first, and with the LM based router when they are not confident."""
+
+    def __init__(
+        self,
+        valid_routes: set[str],
+        lm_router: Any,
+        rules: dict[str, str] | None = None,
+        patterns: list[tuple[str, str]] | None = None,
+        classifier: CentroidClassifier | None = None,
+        max_table_size: int = 10_000,
+        normalize: Callable[[str], str] = normalize_query,
+    ):
+        """Initialize the tiered router.
+
+        Args:
+            valid_routes (set[str]): The valid routes.
+            lm_router (Any): The router to fall back to, e.g. an `LMBasedRouter`.
+            rules (dict[str, str] | None, optional): The route of exact normalized queries, e.g. {"hello": "normal"}.
+                Defaults to None.
+            patterns (list[tuple[str, str]] | None, optional): The regular expressions matched against the
+                normalized query, in order, with their route. Defaults to None.
+            classifier (CentroidClassifier | None, optional): The embedding classifier. Defaults to None.
+            max_table_size (int, optional): The number of decisions kept in the decision table, the least recently
+                used first out. 0 disables the table. Defaults to 10,000.
+            normalize (Callable[[str], str], optional): Normalizes the queries before the rules and the decision
+                table. Defaults to `normalize_query`.
+
+        Raises:
+            ValueError: If a rule or a pattern has an invalid route.
+        """
+        super().__init__()
+        rules = {normalize(query): route for query, route in (rules or {}).items()}
+        patterns = [(re.compile(pattern), route) for pattern, route in (patterns or [])]
+        invalid = ({*rules.values()} | {route for _, route in patterns}) - valid_routes
+        if invalid:
+            raise ValueError(f"Invalid routes in the rules: {sorted(invalid)}")
+
+        self.valid_routes = valid_routes
+        self.lm_router = lm_router
+        self.rules = rules
+        self.patterns = patterns
+        self.classifier = classifier
+        self.max_table_size = max_table_size
+        self.normalize = normalize
+        self.decision_table: OrderedDict[str, str] = OrderedDict()
+        self.stats = TieredRouterStats()
+
+    async def _run(self, text: str, **kwargs: Any) -> str:
+        """Route a query with the first confident tier.
+
+        Args:
+            text (str): The query.
+            **kwargs (Any): Other inputs, passed to the LM based router.
+
+        Returns:
+            str: The route.
+        """
+        started_at = time.perf_counter()
+        route, tier = await self._route(text, **kwargs)
+        self.stats.decisions[tier] += 1
+        self.stats.latency[tier] += time.perf_counter() - started_at
+        return route
+
+    async def _route(self, text: str, **kwargs: Any) -> tuple[str, str]:
+        query = self.normalize(text)
+        route = self.rules.get(query)
+        if route is None:
+            route = next((route for pattern, route in self.patterns if pattern.search(query)), None)
+        if route is not None:
+            return route, "rule"
+
+        route = self.decision_table.get(query)
+        if route is not None:
+            self.decision_table.move_to_end(query)
+            return route, "table"
+
+        decision = None
+        if self.classifier is not None:
+            try:
+                decision = await self.classifier.classify(text)
+            except Exception as error:
+                logger.warning("Falling back to the LM router after a classifier error: %r", error)
+        if decision is not None:
+            route, tier = decision[0], "centroid"
+        else:
+            route, tier = await self.lm_router.run(text=text, **kwargs), "lm"
+
+        if route in self.valid_routes and self.max_table_size > 0:
+            self.decision_table[query] = route
+            if len(self.decision_table) > self.max_table_size:
+                self.decision_table.popitem(last=False)
+        return route, tier
@@ -0,0 +1,254 @@
+"""Benchmark the cold start of cookbook entry points with `python -X importtime` breakdowns.
+
+Every entry point is executed in a fresh interpreter up to (but not including) its `main()` call, which is
+the time a serverless handler or CLI spends before it can serve its first request. For each entry point the
+script reports the median time-to-ready, the share of it spent importing modules, and the top-level packages
+that dominate the import time.
+
+Usage:
+    uv run import_time_benchmark.py                       # every entry point in the cookbook
+    uv run import_time_benchmark.py lm_invoker_lazy.py    # a single script
+    uv run import_time_benchmark.py --module gllm_inference --module gllm_pipeline
+    uv run import_time_benchmark.py --save baseline.json  # then compare later with --baseline baseline.json
+
+References:
+    [1] https://docs.python.org/3/using/cmdline.html#cmdoption-X
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+COOKBOOK_ROOT = Path(__file__).resolve().parents[3]
+EXCLUDED_DIRS = {".venv", "venv", "node_modules", "__pycache__", ".git"}
+BEGIN_MARKER = "__cold_start_begin__"
+READY_MARKER = "__cold_start_ready_us__="
+
+# Executes a script up to its `if __name__ == "__main__":` block, the same way `python script.py` would.
+SCRIPT_RUNNER = f"""
+import runpy, sys, time
+path = sys.argv[1]
+sys.path.insert(0, sys.argv[2])
+sys.argv = [path]
+sys.stderr.write("{BEGIN_MARKER}\\n")
+started_at = time.perf_counter()
+runpy.run_path(path, run_name="__cold_start__")
+print("{READY_MARKER}" + str(int((time.perf_counter() - started_at) * 1e6)))
+"""
+MODULE_RUNNER = f"""
+import importlib, sys, time
+sys.stderr.write("{BEGIN_MARKER}\\n")
+started_at = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print("{READY_MARKER}" + str(int((time.perf_counter() - started_at) * 1e6)))
+"""
+
+
+@dataclass
+class ColdStartResult:
+    """The cold start measurements of a single entry point.
+
+    Attributes:
+        target (str): The script path or module name that was measured.
+        process_ms (float): The median wall time of the whole interpreter process, in milliseconds.
+        ready_ms (float): The median time from the first line of the entry point until it is ready to serve.
+        import_ms (float): The median cumulative time spent importing top-level packages.
+        packages (dict[str, float]): The median cumulative import time per top-level package, in milliseconds.
+        error (str | None): The error output if the entry point failed to load.
+    """
+
+    target: str
+    process_ms: float = 0.0
+    ready_ms: float = 0.0
+    import_ms: float = 0.0
+    packages: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Sum the cumulative `-X importtime` timings per top-level package.
+
+    Imports done by the interpreter startup itself (`site`, `encodings`, ...) are skipped, only the imports
+    after the runner's begin marker are counted.
+
+    Args:
+        stderr (str): The stderr of a process started with `-X importtime`.
+
+    Returns:
+        dict[str, float]: The cumulative import time per top-level package, in milliseconds.
+    """
+    packages: dict[str, float] = {}
+    lines = stderr.splitlines()
+    if BEGIN_MARKER in lines:
+        lines = lines[lines.index(BEGIN_MARKER) + 1 :]
+
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+
+        # Nested imports are indented by two spaces per level after the separator's own space.
+        if name[1:] != name[1:].lstrip():
+            continue
+
+        package = name.strip().split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + int(cumulative) / 1000
+    return packages
+
+
+def measure_once(command: list[str], cwd: Path) -> tuple[float, float, dict[str, float]]:
+    """Run a single cold start and collect its timings.
+
+    Args:
+        command (list[str]): The command to run.
+        cwd (Path): The working directory, so that relative data paths resolve as in a normal run.
+
+    Returns:
+        tuple[float, float, dict[str, float]]: The process time, the ready time, and the per-package import
+            times, all in milliseconds.
+
+    Raises:
+        RuntimeError: If the entry point fails to load.
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    started_at = time.perf_counter()
+    completed = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+    process_ms = (time.perf_counter() - started_at) * 1000
+
+    ready_lines = [line for line in completed.stdout.splitlines() if line.startswith(READY_MARKER)]
+    if completed.returncode != 0 or not ready_lines:
+        errors = [
+            line
+            for line in completed.stderr.splitlines()
+            if not line.startswith("import time:") and line != BEGIN_MARKER
+        ]
+        raise RuntimeError("\n".join(errors[-5:]) or f"exited with code {completed.returncode}")
+
+    ready_ms = int(ready_lines[-1].removeprefix(READY_MARKER)) / 1000
+    return process_ms, ready_ms, parse_importtime(completed.stderr)
+
+
+def benchmark(target: str, command: list[str], cwd: Path, repeat: int) -> ColdStartResult:
+    """Measure the cold start of a target several times and keep the medians.
+
+    Args:
+        target (str): The name to report the result under.
+        command (list[str]): The command that loads the target.
+        cwd (Path): The working directory for the command.
+        repeat (int): The number of fresh processes to measure.
+
+    Returns:
+        ColdStartResult: The median measurements, or the error if the target failed to load.
+    """
+    runs = []
+    for _ in range(repeat):
+        try:
+            runs.append(measure_once(command, cwd))
+        except RuntimeError as error:
+            return ColdStartResult(target=target, error=str(error))
+
+    package_names = {name for _, _, packages in runs for name in packages}
+    packages = {name: statistics.median(run[2].get(name, 0.0) for run in runs) for name in package_names}
+    return ColdStartResult(
+        target=target,
+        process_ms=statistics.median(run[0] for run in runs),
+        ready_ms=statistics.median(run[1] for run in runs),
+        import_ms=sum(packages.values()),
+        packages=dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+    )
+
+
+def discover_entry_points(paths: list[Path]) -> list[Path]:
+    """Find the Python entry points under the given files and directories.
+
+    Args:
+        paths (list[Path]): Script files or directories to search recursively.
+
+    Returns:
+        list[Path]: The sorted script paths.
+    """
+    scripts = set()
+    for path in paths:
+        if path.is_file():
+            scripts.add(path.resolve())
+            continue
+
+        for script in path.rglob("*.py"):
+            if not EXCLUDED_DIRS.intersection(script.relative_to(path).parts):
+                scripts.add(script.resolve())
+    return sorted(scripts)
+
+
+def build_command(interpreter: list[str], runner: str, *args: str) -> list[str]:
+    """Build the `-X importtime` command for a runner snippet."""
+    return [*interpreter, "-X", "importtime", "-c", runner, *args]
+
+
+def print_report(results: list[ColdStartResult], top: int, baseline: dict[str, dict] | None) -> None:
+    """Print the benchmark results as a table followed by the heaviest packages of each target."""
+    width = max(len(result.target) for result in results)
+    print(f"{'entry point':<{width}}  {'process':>9}  {'ready':>9}  {'imports':>9}  {'vs baseline':>11}")
+    for result in results:
+        if result.error:
+            print(f"{result.target:<{width}}  failed: {result.error.splitlines()[-1]}")
+            continue
+
+        delta = ""
+        if baseline and result.target in baseline and not baseline[result.target].get("error"):
+            delta = f"{result.ready_ms - baseline[result.target]['ready_ms']:+.0f} ms"
+        print(
+            f"{result.target:<{width}}  {result.process_ms:>6.0f} ms  {result.ready_ms:>6.0f} ms  "
+            f"{result.import_ms:>6.0f} ms  {delta:>11}"
+        )
+
+    for result in results:
+        if result.error or not result.packages:
+            continue
+
+        print(f"\n{result.target}")
+        for name, import_ms in list(result.packages.items())[:top]:
+            print(f"  {name:<32} {import_ms:>8.1f} ms  {import_ms / result.ready_ms:>6.1%}")
+
+
+def main() -> None:
+    """Run the cold start benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="Scripts or directories (default: whole cookbook).")
+    parser.add_argument("--module", action="append", default=[], help="Measure `import MODULE` instead.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per entry point (default: 5).")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest packages to show per entry point.")
+    parser.add_argument("--uv", action="store_true", help="Run each script in its own example's uv project.")
+    parser.add_argument("--save", type=Path, help="Write the results to a JSON file.")
+    parser.add_argument("--baseline", type=Path, help="Compare against results saved with --save.")
+    args = parser.parse_args()
+
+    jobs = []
+    for module in args.module:
+        jobs.append((module, build_command([sys.executable], MODULE_RUNNER, module), Path.cwd()))
+
+    if args.paths or not args.module:
+        for script in discover_entry_points(args.paths or [COOKBOOK_ROOT]):
+            interpreter = ["uv", "run", "--project", str(script.parent), "python"] if args.uv else [sys.executable]
+            command = build_command(interpreter, SCRIPT_RUNNER, str(script), str(script.parent))
+            target = os.path.relpath(script, COOKBOOK_ROOT) if script.is_relative_to(COOKBOOK_ROOT) else str(script)
+            jobs.append((target, command, script.parent))
+
+    results = [benchmark(target, command, cwd, args.repeat) for target, command, cwd in jobs]
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(results, args.top, baseline)
+
+    if args.save:
+        args.save.write_text(json.dumps({result.target: asdict(result) for result in results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
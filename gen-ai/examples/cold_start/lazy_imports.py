@@ -0,0 +1,74 @@
+"""Helpers to defer loading heavy SDK modules until they are actually used.
+
+References:
+    [1] https://docs.python.org/3/library/importlib.html#implementing-lazy-imports
+"""
+
+import importlib
+import importlib.util
+import sys
+from functools import cache
+from types import ModuleType
+from typing import Any, Callable
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Return a module whose body only runs on first attribute access.
+
+    Only the module spec is resolved here (which locates the file but does not execute it), so provider SDKs
+    such as `openai` or `chromadb` that are imported by the module are not loaded until the module is used.
+
+    Args:
+        name (str): The fully qualified module name, e.g. `gllm_inference.lm_invoker.openai_lm_invoker`.
+
+    Returns:
+        ModuleType: The lazily loaded module.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def lazy_attr(module_name: str, attr: str) -> Callable[[], Any]:
+    """Return a cached accessor that imports `module_name` and fetches `attr` on the first call.
+
+    Args:
+        module_name (str): The module that defines the attribute.
+        attr (str): The attribute name, e.g. a component class.
+
+    Returns:
+        Callable[[], Any]: A zero-argument function returning the attribute.
+    """
+
+    @cache
+    def _load() -> Any:
+        return getattr(importlib.import_module(module_name), attr)
+
+    return _load
+
+
+def lazy_component(factory: Callable[[], Any]) -> Callable[[], Any]:
+    """Build a component on first use and reuse it afterwards.
+
+    Component constructors usually import and initialize provider clients, so building them at module level
+    makes every entry point pay for every branch. Wrapping the constructor keeps that cost on the first
+    request that needs the component.
+
+    Args:
+        factory (Callable[[], Any]): A zero-argument function that imports and builds the component.
+
+    Returns:
+        Callable[[], Any]: A zero-argument function returning the shared component instance.
+    """
+    return cache(factory)
+
@@ -0,0 +1,49 @@
+"""An example of an LM invoker script that only loads the provider it actually uses.
+
+Nothing from the SDK is imported at module level. The provider invoker module is resolved from the model id
+and imported on the first request, so the other providers' SDKs never enter the process.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/tutorials/inference/lm-invoker
+"""
+
+import time
+
+STARTED_AT = time.perf_counter()
+
+import asyncio  # noqa: E402
+import os  # noqa: E402
+
+from dotenv import load_dotenv  # noqa: E402
+
+from lazy_imports import lazy_attr, lazy_component  # noqa: E402
+
+load_dotenv()
+
+# Only the selected provider's module is imported, e.g. `anthropic` is never loaded for an OpenAI model.
+PROVIDER_INVOKERS = {
+    "openai": lazy_attr("gllm_inference.lm_invoker.openai_lm_invoker", "OpenAILMInvoker"),
+    "anthropic": lazy_attr("gllm_inference.lm_invoker.anthropic_lm_invoker", "AnthropicLMInvoker"),
+    "google": lazy_attr("gllm_inference.lm_invoker.google_lm_invoker", "GoogleLMInvoker"),
+}
+
+model_id = os.getenv("LANGUAGE_MODEL", "openai/gpt-5-nano")
+
+
+@lazy_component
+def get_lm_invoker():
+    """Build the LM invoker for `model_id` on first use."""
+    provider, model_name = model_id.split("/", 1)
+    return PROVIDER_INVOKERS[provider]()(model_name)
+
+
+async def main():
+    print(f"Ready to serve in: {time.perf_counter() - STARTED_AT:.3f} seconds")
+
+    response = await get_lm_invoker().invoke("What is France's capital?")
+    print(f"Response: {response}")
+    print(f"Time to first response: {time.perf_counter() - STARTED_AT:.3f} seconds")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""An example of a routed pipeline whose router and branch components are built on first use.
+
+The pipeline graph is declared at import time as usual, but every step wraps a factory instead of a built
+component. The router, the deep researcher, and the response synthesizer (and the provider SDKs behind them)
+are only imported when a request actually reaches them, so a "hello" request never loads the deep research
+stack.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/add-a-custom-component
+    [2] https://gdplabs.gitbook.io/sdk/deep-researcher
+"""
+
+import time
+
+STARTED_AT = time.perf_counter()
+
+import asyncio  # noqa: E402
+from functools import cache  # noqa: E402
+from typing import Any, Callable  # noqa: E402
+
+from dotenv import load_dotenv  # noqa: E402
+from gllm_core.schema.component import Component  # noqa: E402
+from gllm_pipeline.steps import step, switch  # noqa: E402
+
+load_dotenv()
+
+ROUTER_TEMPLATE = """
+Based on the following user query, determine if it is a deep research query or a normal query.
+
+- **normal**: Casual greetings, small talk, or simple conversational queries.
+- **deep_research**: Queries that require comprehensive research or multi-source analysis.
+
+Output the answer in JSON format with "route" as the key. For example:
+{{"route": "deep_research"}} or {{"route": "normal"}}
+
+Query: {text}
+"""
+
+
+class LazyComponent(Component):
+    """A component that builds the wrapped component on its first run and forwards every run to it."""
+
+    def __init__(self, factory: Callable[[], Component]):
+        """Initialize the lazy component.
+
+        Args:
+            factory (Callable[[], Component]): A zero-argument function that imports and builds the component.
+        """
+        super().__init__()
+        self._factory = cache(factory)
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Build the wrapped component if needed, then run it with the given inputs."""
+        return await self._factory().run(**kwargs)
+
+
+def build_router() -> Component:
+    """Build the LM based router."""
+    from gllm_inference.builder import build_lm_request_processor
+    from gllm_pipeline.router import LMBasedRouter
+
+    return LMBasedRouter(
+        valid_routes={"deep_research", "normal"},
+        lm_request_processor=build_lm_request_processor(
+            model_id="openai/gpt-5-nano",
+            user_template=ROUTER_TEMPLATE,
+            output_parser_type="json",
+        ),
+        default_route="normal",
+    )
+
+
+def build_deep_researcher() -> Component:
+    """Build the deep researcher."""
+    from gllm_generation.deep_researcher import OpenAIDeepResearcher
+
+    return OpenAIDeepResearcher(model_name="o4-mini-deep-research")
+
+
+def build_response_synthesizer() -> Component:
+    """Build the response synthesizer for normal queries."""
+    from gllm_generation.response_synthesizer import ResponseSynthesizer
+
+    return ResponseSynthesizer.stuff_preset(model_id="openai/gpt-5-nano", user_template="{query}")
+
+
+router = step(
+    component=LazyComponent(build_router),
+    input_map={"text": "user_query"},
+    output_state="route",
+)
+conditional_step = switch(
+    condition=lambda input: input["route"],
+    branches={
+        "deep_research": step(
+            component=LazyComponent(build_deep_researcher),
+            input_map={"query": "user_query"},
+            output_state="result",
+        ),
+        "normal": step(
+            component=LazyComponent(build_response_synthesizer),
+            input_map={"query": "user_query"},
+            output_state="result",
+        ),
+    },
+)
+pipeline = router | conditional_step
+
+
+async def main():
+    print(f"Ready to serve in: {time.perf_counter() - STARTED_AT:.3f} seconds")
+
+    state = {"user_query": "hello", "route": None, "result": None}
+    result = await pipeline.invoke(state)
+    print(f"Pipeline result: {result['result']}")
+    print(f"Time to first response: {time.perf_counter() - STARTED_AT:.3f} seconds")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,7 +7,6 @@ References:
 """
 
 import asyncio
-import json
 import os
 
 from dotenv import load_dotenv
@@ -15,13 +14,13 @@ from gllm_datastore.vector_data_store import ChromaVectorDataStore
 from gllm_generation.response_synthesizer import ResponseSynthesizer
 from gllm_inference.builder import build_lm_request_processor
 from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
-from gllm_misc.router import AurelioSemanticRouter
-from gllm_misc.router.aurelio_semantic_router.encoders import EMInvokerEncoder
 from gllm_pipeline.pipeline.pipeline import Pipeline
 from gllm_pipeline.pipeline.states import RAGState
 from gllm_pipeline.steps import step, switch
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from route_embeddings import PrecomputedSemanticRouter, RouteEmbeddingStore
+
 load_dotenv()
 
 class RouterState(RAGState):
@@ -50,17 +49,14 @@ response_synthesizer_general = ResponseSynthesizer.stuff(
 
 )
 
-with open("route_examples.json", "r", encoding="utf-8") as f:
-    route_examples = json.load(f)
-
-semantic_router = AurelioSemanticRouter(
-    default_route = "general",
+# The embeddings of the route examples are persisted in route_embeddings/, and are only computed again for the
+# examples that change in route_examples.json
+semantic_router = PrecomputedSemanticRouter(
+    em_invoker = em_invoker,
+    store = RouteEmbeddingStore("route_examples.json", model_id = "text-embedding-3-small"),
     valid_routes = set({"knowledge_base", "general"}),
-    encoder = EMInvokerEncoder(
-        em_invoker = em_invoker,
-        score_threshold = 0.3,
-    ),
-    routes = route_examples,
+    default_route = "general",
+    score_threshold = 0.3,
 )
 
 # Create the pipeline
@@ -0,0 +1,197 @@
+"""Semantic routing with persisted, precomputed route example embeddings.
+
+A semantic router embeds the example utterances of every route when it starts, so each process start pays for
+embedding calls, even though the routes rarely change. `RouteEmbeddingStore` persists the normalized embeddings of the
+examples next to a hash of the routes file and of the embedding model. When they are unchanged, the embeddings are
+reloaded memory-mapped, without any embedding call. When they changed, only the examples that are new are embedded,
+and the embeddings of the others are reused.
+
+`PrecomputedSemanticRouter` routes a query with the store: it embeds the query, scores it against every example of
+every route with one matrix product, and returns the route of the most similar example, or the default route if no
+example is similar enough.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+    [2] https://numpy.org/doc/stable/reference/generated/numpy.load.html
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from gllm_core.schema.component import Component
+
+logger = logging.getLogger(__name__)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class RouteEmbeddingStore:
+    """Persists the embeddings of the example utterances of the routes, and reloads them memory-mapped."""
+
+    def __init__(self, routes_path: str, directory: str = "route_embeddings", model_id: str = ""):
+        """Initialize the route embedding store.
+
+        Args:
+            routes_path (str): The JSON file with the example utterances of each route.
+            directory (str, optional): The directory of the persisted embeddings. Defaults to "route_embeddings".
+            model_id (str, optional): The embedding model, part of the hash, so that changing the model embeds the
+                examples again. Defaults to "".
+        """
+        self.routes_path = Path(routes_path)
+        self.directory = Path(directory)
+        self.model_id = model_id
+        self.routes: list[str] = []
+        self.offsets: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.embeddings: np.ndarray | None = None
+
+    @property
+    def index_path(self) -> Path:
+        """The path of the index, with the hash and the example utterances of the persisted embeddings."""
+        return self.directory / "index.json"
+
+    @property
+    def embeddings_path(self) -> Path:
+        """The path of the persisted embeddings."""
+        return self.directory / "embeddings.npy"
+
+    def routes_hash(self) -> str:
+        """Return the hash of the routes file and of the embedding model."""
+        digest = hashlib.sha256(self.model_id.encode() + b"\0")
+        digest.update(self.routes_path.read_bytes())
+        return digest.hexdigest()
+
+    async def load(self, em_invoker: Any) -> int:
+        """Load the embeddings of the examples, embedding only the examples that were not embedded yet.
+
+        Args:
+            em_invoker (Any): The EM invoker that embeds the new examples.
+
+        Returns:
+            int: The number of examples embedded, 0 when the routes are unchanged.
+
+        Raises:
+            ValueError: If the routes file has no example utterance.
+        """
+        routes_hash = self.routes_hash()
+        index = json.loads(self.index_path.read_text()) if self.index_path.exists() else None
+        if index is not None and index["routes_hash"] == routes_hash and self.embeddings_path.exists():
+            self._open(index)
+            logger.info("Loaded %d route example embeddings without embedding calls", len(index["examples"]))
+            return 0
+
+        routes = json.loads(self.routes_path.read_text(encoding="utf-8"))
+        examples = [[route, text] for route, texts in routes.items() for text in texts]
+        if not examples:
+            raise ValueError(f"{self.routes_path} has no example utterance for any route")
+        texts = list(dict.fromkeys(text for _, text in examples))
+
+        # The embeddings of the examples that were already embedded with the same model are reused
+        rows = {}
+        if index is not None and index.get("model_id") == self.model_id and self.embeddings_path.exists():
+            # Read in memory rather than memory-mapped, since the file is replaced below
+            previous = np.load(self.embeddings_path)
+            rows = {text: previous[row] for row, (_, text) in enumerate(index["examples"])}
+        missing = [text for text in texts if text not in rows]
+        if missing:
+            embeddings = _normalized(np.asarray(await em_invoker.invoke(missing), dtype=np.float32))
+            rows.update(zip(missing, embeddings))
+
+        matrix = np.stack([np.asarray(rows[text], dtype=np.float32) for _, text in examples])
+        index = {"routes_hash": routes_hash, "model_id": self.model_id, "examples": examples}
+        self.embeddings = None
+        self._save(matrix, index)
+        self._open(index)
+        logger.info("Embedded %d new of %d route examples", len(missing), len(examples))
+        return len(missing)
+
+    def _save(self, matrix: np.ndarray, index: dict[str, Any]) -> None:
+        # Both files are replaced atomically, the embeddings first, so a crash never leaves a stale index behind
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary_embeddings_path = self.embeddings_path.with_suffix(".tmp.npy")
+        np.save(temporary_embeddings_path, matrix)
+        os.replace(temporary_embeddings_path, self.embeddings_path)
+        temporary_index_path = self.index_path.with_suffix(".tmp")
+        temporary_index_path.write_text(json.dumps(index))
+        os.replace(temporary_index_path, self.index_path)
+
+    def _open(self, index: dict[str, Any]) -> None:
+        self.embeddings = np.load(self.embeddings_path, mmap_mode="r")
+        labels = [route for route, _ in index["examples"]]
+        self.routes = list(dict.fromkeys(labels))
+        self.offsets = np.asarray([labels.index(route) for route in self.routes], dtype=np.int64)
+
+
+class PrecomputedSemanticRouter(Component):
+    """Routes a query to the route of its most similar example utterance, with precomputed example embeddings."""
+
+    def __init__(
+        self,
+        em_invoker: Any,
+        store: RouteEmbeddingStore,
+        valid_routes: set[str],
+        default_route: str,
+        score_threshold: float = 0.3,
+    ):
+        """Initialize the precomputed semantic router.
+
+        Args:
+            em_invoker (Any): The EM invoker that embeds the queries, and the new examples.
+            store (RouteEmbeddingStore): The store of the example embeddings, loaded on the first query.
+            valid_routes (set[str]): The valid routes.
+            default_route (str): The route of the queries that are not similar enough to any example.
+            score_threshold (float, optional): The lowest cosine similarity to an example to select its route.
+                Defaults to 0.3.
+        """
+        super().__init__()
+        self.em_invoker = em_invoker
+        self.store = store
+        self.valid_routes = valid_routes
+        self.default_route = default_route
+        self.score_threshold = score_threshold
+        self._lock = asyncio.Lock()
+
+    async def route_scores(self, source: str) -> dict[str, float]:
+        """Return the similarity of a query to the most similar example of each route.
+
+        Args:
+            source (str): The query.
+
+        Returns:
+            dict[str, float]: The score of each route.
+        """
+        if self.store.embeddings is None:
+            async with self._lock:
+                if self.store.embeddings is None:
+                    await self.store.load(self.em_invoker)
+
+        query = _normalized(np.asarray(await self.em_invoker.invoke(source), dtype=np.float32))
+        # The examples of each route are contiguous, so the best score of each route is a segmented maximum
+        similarities = self.store.embeddings @ query
+        scores = np.maximum.reduceat(similarities, self.store.offsets)
+        return dict(zip(self.store.routes, scores.tolist()))
+
+    async def _run(self, source: str, **kwargs: Any) -> str:
+        """Route a query.
+
+        Args:
+            source (str): The query.
+            **kwargs (Any): Other inputs, ignored.
+
+        Returns:
+            str: The route of the most similar example, or the default route if no valid route scores above the
+                threshold.
+        """
+        scores = await self.route_scores(source)
+        scores = {route: score for route, score in scores.items() if route in self.valid_routes}
+        route = max(scores, key=scores.get, default=None)
+        if route is None or scores[route] < self.score_threshold:
+            return self.default_route
+        return route
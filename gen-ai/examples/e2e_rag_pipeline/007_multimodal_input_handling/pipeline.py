@@ -58,8 +58,10 @@ response_synthesizer = ResponseSynthesizer.stuff(
     lm_request_processor=build_lm_request_processor(
         model_id=os.getenv("LANGUAGE_MODEL"),
         credentials=os.getenv("OPENAI_API_KEY"),
-        system_template="""Create an imaginary animal that is similar to the animal in the picture. Context: {context}""",
-        user_template="Question: {query}",
+        # The system template has no variables and the variable contents come last, the layout prompt caching needs.
+        # This short template is below the minimum cacheable prefix, so it only shows the layout
+        system_template="Create an imaginary animal that is similar to the animal in the picture.",
+        user_template="Context: {context}\n\nQuestion: {query}",
     )
 )
 
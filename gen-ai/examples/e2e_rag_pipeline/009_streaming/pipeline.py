@@ -0,0 +1,81 @@
+"""Example script to build and run a RAG pipeline that streams its events and response tokens.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+"""
+
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.em_invoker import OpenAIEMInvoker
+from gllm_pipeline.steps import step
+from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
+
+from streaming import ChunksRetrieved, FinalState, Observed, StepFinished, StepStarted, TokenDelta, stream
+
+load_dotenv()
+
+# Create components
+em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+data_store = ChromaVectorDataStore(
+    collection_name="documents",
+    client_type="persistent",
+    persist_directory="data",
+    embedding=em_invoker,
+)
+retriever = BasicVectorRetriever(data_store)
+response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
+
+# Create the pipeline
+# Wrapping a component with `Observed` makes the step report its start, end, and retrieved chunks.
+retrieve_step = step(
+    component=Observed(retriever, name="retrieve"),
+    input_map={"query": "user_query", "top_k": "top_k"},
+    output_state="chunks",
+)
+# Mapping the event emitter lets the synthesizer stream its tokens while it generates.
+synthesize_step = step(
+    component=Observed(response_synthesizer, name="synthesize"),
+    input_map={"query": "user_query", "chunks": "chunks", "event_emitter": "event_emitter"},
+    output_state="response",
+)
+e2e_pipeline = retrieve_step | synthesize_step
+
+# Run the pipeline
+
+
+async def main():
+    state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
+    config = {"top_k": 5}
+
+    started_at = time.perf_counter()
+    time_to_first_token = None
+    async for event in stream(e2e_pipeline, state, config):
+        match event:
+            case StepStarted(step=name):
+                print(f"[{name}] started")
+            case ChunksRetrieved(step=name, chunks=chunks):
+                print(f"[{name}] retrieved {len(chunks)} chunks")
+            case StepFinished(step=name, duration=duration):
+                print(f"\n[{name}] finished in {duration:.2f} seconds")
+            case TokenDelta(text=text):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started_at
+                print(text, end="", flush=True)
+            case FinalState(state=result):
+                print(f"Final state keys: {sorted(result)}")
+
+    # A stream may end without any token, e.g. when the synthesizer streams no token events
+    if time_to_first_token is None:
+        print("Time to first token: no token received")
+    else:
+        print(f"Time to first token: {time_to_first_token:.2f} seconds")
+    print(f"Total time: {time.perf_counter() - started_at:.2f} seconds")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
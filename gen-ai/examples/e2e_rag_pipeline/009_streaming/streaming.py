@@ -0,0 +1,199 @@
+"""Streaming invocation for pipelines.
+
+`stream(pipeline, state, config)` runs `pipeline.invoke` in the background and yields typed events while the
+pipeline is running: step start and end, retrieved chunks, and the synthesizer's token deltas as soon as the
+language model produces them. The final state is always the last event.
+
+Steps report their start, end, and retrieved chunks when their component is wrapped with `Observed`. Token
+deltas come from the event emitter that `stream` puts in the config under `event_emitter`, so the synthesizer
+step only has to map it in its `input_map`.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline
+"""
+
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from gllm_core.event import EventEmitter
+from gllm_core.schema import Chunk
+from gllm_core.schema.component import Component
+from gllm_pipeline.pipeline import Pipeline
+
+RESPONSE_EVENT_TYPE = "response"
+
+
+@dataclass(frozen=True)
+class StepStarted:
+    """Emitted when an observed step starts running."""
+
+    step: str
+
+
+@dataclass(frozen=True)
+class StepFinished:
+    """Emitted when an observed step finishes running."""
+
+    step: str
+    duration: float
+
+
+@dataclass(frozen=True)
+class ChunksRetrieved:
+    """Emitted when an observed step returns retrieved chunks."""
+
+    step: str
+    chunks: list[Chunk]
+
+
+@dataclass(frozen=True)
+class TokenDelta:
+    """Emitted for every piece of response text streamed by a component."""
+
+    text: str
+
+
+@dataclass(frozen=True)
+class ComponentEvent:
+    """Emitted for any other event a component sends through the event emitter (thinking, status, ...)."""
+
+    type: str
+    value: Any
+    raw: dict[str, Any] = field(repr=False)
+
+
+@dataclass(frozen=True)
+class FinalState:
+    """The last event of a stream, holding the state returned by `Pipeline.invoke`."""
+
+    state: dict[str, Any]
+
+
+PipelineEvent = StepStarted | StepFinished | ChunksRetrieved | TokenDelta | ComponentEvent | FinalState
+
+_event_queue: ContextVar[asyncio.Queue | None] = ContextVar("pipeline_event_queue", default=None)
+
+
+class Observed(Component):
+    """Wraps a step component so that it reports its start, end, and retrieved chunks to the active stream.
+
+    Outside of `stream` the wrapper is transparent, so the same pipeline can still be used with `invoke`.
+    """
+
+    def __init__(self, component: Component, name: str | None = None):
+        """Initialize the observed component.
+
+        Args:
+            component (Component): The component to wrap.
+            name (str | None, optional): The step name used in the events. Defaults to None, in which case the
+                class name of the component is used.
+        """
+        super().__init__()
+        self.component = component
+        self.name = name or type(component).__name__
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Run the wrapped component and publish its events."""
+        queue = _event_queue.get()
+        if queue is None:
+            return await self.component.run(**kwargs)
+
+        queue.put_nowait(StepStarted(self.name))
+        started_at = time.perf_counter()
+        result = await self.component.run(**kwargs)
+
+        if isinstance(result, list) and result and all(isinstance(item, Chunk) for item in result):
+            queue.put_nowait(ChunksRetrieved(self.name, result))
+
+        queue.put_nowait(StepFinished(self.name, time.perf_counter() - started_at))
+        return result
+
+
+def _to_pipeline_event(raw_event: str | dict[str, Any]) -> PipelineEvent:
+    event = json.loads(raw_event) if isinstance(raw_event, str) else raw_event
+    if event.get("type") == RESPONSE_EVENT_TYPE:
+        return TokenDelta(str(event.get("value", "")))
+    return ComponentEvent(event.get("type", ""), event.get("value"), event)
+
+
+async def _forward_emitter_events(event_emitter: EventEmitter, queue: asyncio.Queue) -> None:
+    async for raw_event in event_emitter.stream():
+        queue.put_nowait(_to_pipeline_event(raw_event))
+
+
+async def stream(
+    pipeline: Pipeline, state: dict[str, Any], config: dict[str, Any] | None = None
+) -> AsyncIterator[PipelineEvent]:
+    """Invoke a pipeline and yield its events as they happen.
+
+    Args:
+        pipeline (Pipeline): The pipeline to invoke.
+        state (dict[str, Any]): The initial state, as for `Pipeline.invoke`.
+        config (dict[str, Any] | None, optional): The runtime config, as for `Pipeline.invoke`. An event emitter
+            with a stream handler is added under `event_emitter` and closed at the end of the run, unless one is
+            already set, in which case it must have a stream handler too and is left open. Defaults to None.
+
+    Yields:
+        PipelineEvent: The events of the run, ending with a `FinalState`.
+
+    Raises:
+        Exception: Any exception raised by the pipeline, after the events emitted before it were yielded.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    config = dict(config or {})
+    # Only an event emitter created here is closed here, one passed by the caller stays open for its owner
+    owns_emitter = config.get("event_emitter") is None
+    if owns_emitter:
+        config["event_emitter"] = EventEmitter.with_stream_handler()
+    event_emitter = config["event_emitter"]
+
+    async def run() -> None:
+        # Whatever happens, the queue ends with the final state or an error, so the consumer never waits forever
+        outcome: PipelineEvent | BaseException = RuntimeError("The pipeline run ended without a result")
+        forwarder = asyncio.create_task(_forward_emitter_events(event_emitter, queue))
+        try:
+            result = await pipeline.invoke(state, config)
+            if owns_emitter:
+                # Drain the emitter before publishing the final state so that no token arrives after it.
+                await event_emitter.close()
+                await forwarder
+            else:
+                # The caller's emitter is not closed, so the forwarder only gets a turn to forward pending events
+                await asyncio.sleep(0)
+            outcome = FinalState(result)
+        except BaseException as error:
+            outcome = error
+            if not isinstance(error, Exception):
+                raise
+        finally:
+            if not forwarder.done():
+                forwarder.cancel()
+                if owns_emitter:
+                    try:
+                        await event_emitter.close()
+                    except Exception:  # the outcome of the run is reported, not a failure to clean up after it
+                        pass
+            queue.put_nowait(outcome)
+
+    token = _event_queue.set(queue)
+    try:
+        runner = asyncio.create_task(run())  # the task copies the context, so the steps see the queue
+    finally:
+        _event_queue.reset(token)
+
+    try:
+        while True:
+            event = await queue.get()
+            if isinstance(event, BaseException):
+                raise event
+
+            yield event
+            if isinstance(event, FinalState):
+                return
+    finally:
+        if not runner.done():
+            runner.cancel()
@@ -0,0 +1,215 @@
+"""Request deadlines, per step timeout budgets, and fallbacks for pipelines.
+
+A `Deadline` is created per request and passed in the pipeline config under `deadline`. Steps whose component is
+wrapped with `Budgeted` map it in their `input_map`; each of them runs with a timeout of the smaller of its own
+budget and the time left until the deadline, and runs its fallback when that timeout expires. The deadline is
+also made available to the invokers used inside the step, so wrapping an invoker with `DeadlineBoundInvoker`
+bounds every call it makes, including calls made by components that are not budgeted themselves.
+
+Every budgeted step records how much of the request budget was left before and after it ran.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/add-a-custom-component
+"""
+
+import asyncio
+import inspect
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from gllm_core.schema.component import Component
+
+_current_deadline: ContextVar["Deadline | None"] = ContextVar("current_deadline", default=None)
+
+
+@dataclass
+class StepBudgetRecord:
+    """The remaining budget telemetry of a single budgeted step.
+
+    Attributes:
+        step (str): The step name.
+        budget (float | None): The step's own timeout budget in seconds, if any.
+        remaining_before (float): The seconds left until the deadline when the step started.
+        elapsed (float): The seconds the step took, including its fallback.
+        remaining_after (float): The seconds left until the deadline when the step finished.
+        timed_out (bool): Whether the step hit its timeout.
+        fell_back (bool): Whether the step's result came from its fallback.
+    """
+
+    step: str
+    budget: float | None
+    remaining_before: float
+    elapsed: float
+    remaining_after: float
+    timed_out: bool
+    fell_back: bool
+
+
+@dataclass
+class Deadline:
+    """A request level deadline.
+
+    Attributes:
+        expires_at (float): The `time.monotonic()` value at which the request must be answered.
+        records (list[StepBudgetRecord]): The telemetry of the budgeted steps that ran under this deadline.
+    """
+
+    expires_at: float
+    records: list[StepBudgetRecord] = field(default_factory=list)
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """Create a deadline that expires `seconds` from now.
+
+        Args:
+            seconds (float): The total time budget of the request.
+
+        Returns:
+            Deadline: The deadline.
+        """
+        return cls(expires_at=time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Return the seconds left until the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, budget: float | None = None) -> float:
+        """Return the timeout for an operation with the given budget under this deadline.
+
+        Args:
+            budget (float | None, optional): The operation's own budget in seconds. Defaults to None.
+
+        Returns:
+            float: The smaller of the budget and the remaining time.
+        """
+        return self.remaining() if budget is None else min(budget, self.remaining())
+
+    def report(self) -> str:
+        """Format the budget telemetry of the steps that ran under this deadline."""
+        lines = [f"{'step':<20} {'budget':>7} {'before':>7} {'elapsed':>8} {'after':>7}  outcome"]
+        for record in self.records:
+            outcome = "fallback" if record.fell_back else "timeout" if record.timed_out else "ok"
+            budget = "-" if record.budget is None else f"{record.budget:.2f}"
+            lines.append(
+                f"{record.step:<20} {budget:>7} {record.remaining_before:>7.2f} {record.elapsed:>8.2f} "
+                f"{record.remaining_after:>7.2f}  {outcome}"
+            )
+        return "\n".join(lines)
+
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline of the request being processed in the current task, if any."""
+    return _current_deadline.get()
+
+
+class Budgeted(Component):
+    """Runs a step component within its timeout budget and the request deadline, with a fallback on timeout.
+
+    The wrapped component receives the same inputs, except `deadline`, which is consumed by the wrapper.
+    """
+
+    def __init__(
+        self,
+        component: Component,
+        name: str | None = None,
+        budget: float | None = None,
+        fallback: Component | Callable[..., Any] | None = None,
+        fallback_budget: float | None = None,
+    ):
+        """Initialize the budgeted component.
+
+        Args:
+            component (Component): The component to run.
+            name (str | None, optional): The step name used in the telemetry. Defaults to None, in which case the
+                class name of the component is used.
+            budget (float | None, optional): The step's own timeout in seconds. Defaults to None, in which case
+                the step may use all the time left until the deadline.
+            fallback (Component | Callable[..., Any] | None, optional): What to run on timeout, with the same
+                inputs as the component, e.g. a cached answer lookup. It usually runs once the deadline has already
+                expired, so it is not bounded by the deadline. Defaults to None, in which case the `TimeoutError` is
+                raised.
+            fallback_budget (float | None, optional): The fallback's own timeout in seconds. Defaults to None, in
+                which case the fallback is not bounded.
+        """
+        super().__init__()
+        self.component = component
+        self.name = name or type(component).__name__
+        self.budget = budget
+        self.fallback = fallback
+        self.fallback_budget = fallback_budget
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Run the component under the deadline and fall back on timeout."""
+        deadline = kwargs.pop("deadline", None) or current_deadline()
+        if deadline is None:
+            return await self.component.run(**kwargs)
+
+        token = _current_deadline.set(deadline)
+        remaining_before = deadline.remaining()
+        started_at = time.monotonic()
+        timed_out = fell_back = False
+        try:
+            async with asyncio.timeout(deadline.timeout(self.budget)):
+                return await self.component.run(**kwargs)
+        except TimeoutError:
+            timed_out = True
+            if self.fallback is None:
+                raise
+
+            fell_back = True
+            return await self._run_fallback(kwargs)
+        finally:
+            _current_deadline.reset(token)
+            deadline.records.append(
+                StepBudgetRecord(
+                    step=self.name,
+                    budget=self.budget,
+                    remaining_before=remaining_before,
+                    elapsed=time.monotonic() - started_at,
+                    remaining_after=deadline.remaining(),
+                    timed_out=timed_out,
+                    fell_back=fell_back,
+                )
+            )
+
+    async def _run_fallback(self, inputs: dict[str, Any]) -> Any:
+        # The deadline has usually expired, so the fallback and the invokers it calls run without it
+        token = _current_deadline.set(None)
+        try:
+            async with asyncio.timeout(self.fallback_budget):
+                if isinstance(self.fallback, Component):
+                    return await self.fallback.run(**inputs)
+                result = self.fallback(**inputs)
+                return await result if inspect.isawaitable(result) else result
+        finally:
+            _current_deadline.reset(token)
+
+
+class DeadlineBoundInvoker:
+    """Wraps an LM or EM invoker so that every invocation is bounded by the current request deadline.
+
+    All other attributes are forwarded to the wrapped invoker, so it can be passed wherever the invoker is used.
+    """
+
+    def __init__(self, invoker: Any):
+        """Initialize the deadline bound invoker.
+
+        Args:
+            invoker (Any): The LM or EM invoker to wrap.
+        """
+        self.invoker = invoker
+
+    async def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the wrapped invoker, raising `TimeoutError` when the request deadline expires first."""
+        deadline = current_deadline()
+        if deadline is None:
+            return await self.invoker.invoke(*args, **kwargs)
+
+        async with asyncio.timeout(deadline.remaining()):
+            return await self.invoker.invoke(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped invoker."""
+        return getattr(self.invoker, name)
@@ -0,0 +1,146 @@
+"""Example script to build and run a RAG pipeline with a request deadline and per step timeout budgets.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import asyncio
+import json
+import os
+from typing import Any
+
+from dotenv import load_dotenv
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.builder import build_lm_request_processor
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+from gllm_misc.router import AurelioSemanticRouter
+from gllm_misc.router.aurelio_semantic_router.encoders import EMInvokerEncoder
+from gllm_pipeline.pipeline.pipeline import Pipeline
+from gllm_pipeline.pipeline.states import RAGState
+from gllm_pipeline.steps import step, switch
+from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
+
+from deadline import Budgeted, Deadline, DeadlineBoundInvoker
+
+load_dotenv()
+
+FALLBACK_ANSWER = "Sorry, I could not answer in time. Please try again."
+
+
+class DeadlineState(RAGState):
+    """State for the router."""
+    route: str
+    source: str
+
+
+# Answers of previous requests, served when a synthesizer runs out of time
+cached_answers: dict[str, str] = {}
+
+
+def cached_answer(**inputs: Any) -> str:
+    """Return the previous answer to the same query, if any.
+
+    Args:
+        inputs (Any): The synthesizer inputs.
+
+    Returns:
+        str: The cached answer, or an apology if the query was never answered.
+    """
+    return cached_answers.get(inputs["query"], FALLBACK_ANSWER)
+
+
+# Create components
+em_invoker = OpenAIEMInvoker("text-embedding-3-small")
+data_store = ChromaVectorDataStore(
+    collection_name="documents",
+    client_type="persistent",
+    persist_directory="data",
+    embedding=em_invoker,
+)
+retriever = BasicVectorRetriever(data_store)
+response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
+
+general_lm_request_processor = build_lm_request_processor(
+    model_id=os.getenv("LANGUAGE_MODEL"),
+    credentials=os.getenv("OPENAI_API_KEY"),
+    system_template="You are a helpful assistant that answers general knowledge questions.",
+    user_template="{query}",
+)
+# Every LM call of this processor is bounded by the request deadline, wherever it is made from
+general_lm_request_processor.lm_invoker = DeadlineBoundInvoker(general_lm_request_processor.lm_invoker)
+response_synthesizer_general = ResponseSynthesizer.stuff(lm_request_processor=general_lm_request_processor)
+
+with open("route_examples.json", "r", encoding="utf-8") as f:
+    route_examples = json.load(f)
+
+semantic_router = AurelioSemanticRouter(
+    default_route = "general",
+    valid_routes = set({"knowledge_base", "general"}),
+    encoder = EMInvokerEncoder(
+        em_invoker = em_invoker,
+        score_threshold = 0.3,
+    ),
+    routes = route_examples,
+)
+
+# Create the pipeline
+# Each budgeted step maps the request deadline from the config and declares what to do on timeout
+retrieve_step = step(
+    component=Budgeted(retriever, name="retrieve", budget=2.0, fallback=lambda **_: []),  # skip retrieval
+    input_map={"query": "user_query", "top_k": "top_k", "deadline": "deadline"},
+    output_state="chunks",
+)
+synthesize_step = step(
+    component=Budgeted(response_synthesizer, name="synthesize", fallback=cached_answer),
+    input_map={"query": "user_query", "chunks": "chunks", "deadline": "deadline"},
+    output_state="response",
+)
+synthesize_general_step = step(
+    component=Budgeted(response_synthesizer_general, name="synthesize_general", fallback=cached_answer),
+    input_map={"query": "user_query", "deadline": "deadline"},
+    output_state="response",
+)
+# When retrieval was skipped, answer from general knowledge instead of from an empty context
+answer_step = switch(
+    condition=lambda input: "grounded" if input["chunks"] else "general",
+    branches={"grounded": synthesize_step, "general": synthesize_general_step},
+)
+conditional_step = switch(
+    condition=Budgeted(semantic_router, name="route", budget=1.0, fallback=lambda **_: "general"),
+    branches={
+        "knowledge_base": [retrieve_step, answer_step],
+        "general": synthesize_general_step,
+    },
+    default=synthesize_general_step,
+    input_map={"source": "user_query", "deadline": "deadline"},
+    output_state="route",
+)
+
+
+e2e_pipeline = Pipeline(steps=[conditional_step], state_type=DeadlineState)
+
+
+# Run the pipeline
+
+async def answer(query: str, timeout: float) -> None:
+    """Answer a query within `timeout` seconds and print the remaining budget telemetry."""
+    deadline = Deadline.after(timeout)
+    state = {"user_query": query}
+    config = {"top_k": 5, "deadline": deadline}
+    result = await e2e_pipeline.invoke(state, config)
+    if result["response"] != FALLBACK_ANSWER:
+        cached_answers[query] = result["response"]
+
+    print(f"Pipeline result ({timeout} seconds deadline): {result['response']}")
+    print(f"{deadline.report()}\n")
+
+
+async def main():
+    query = "Give me nocturnal creatures from the dataset"  # Replace with your actual query
+    await answer(query, timeout=15.0)
+    await answer(query, timeout=0.5)  # too tight: the cached answer is served
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
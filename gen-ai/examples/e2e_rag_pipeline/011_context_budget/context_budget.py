@@ -0,0 +1,318 @@
+"""Local token counting and context budget packing for stuff response synthesizers.
+
+A stuff synthesizer puts every retrieved chunk into its prompt. `ContextBudget` is a step placed between the
+retriever and the synthesizer that keeps the chunks within a token budget: it packs the chunks with the highest
+scores first, and then truncates, summarizes, or drops the chunks that do not fit. Every request records how many
+context tokens were saved.
+
+`TokenCounter` counts tokens locally with a `tiktoken` encoding, so no request is sent to count tokens. `tiktoken`
+would download the vocabulary of an encoding the first time it is used, so the encoding is only used once it is
+cached on disk, in `TIKTOKEN_CACHE_DIR` or else in the `tiktoken_cache` directory next to this file, where the setup
+scripts cache it. Otherwise, tokens are estimated from the words and punctuation of the text instead.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+    [2] https://cookbook.openai.com/examples/how_to_count_tokens_with_tiktoken
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal
+
+from gllm_core.schema import Chunk
+from gllm_core.schema.component import Component
+
+logger = logging.getLogger(__name__)
+
+# Tokens added to every message of a chat prompt and to prime the reply, as counted by OpenAI chat models
+_MESSAGE_OVERHEAD = 3
+_REPLY_OVERHEAD = 3
+# Tokens of the separator between two chunks in the context
+_CHUNK_SEPARATOR_TOKENS = 2
+# Without the tokenizer, a word or a run of punctuation counts a token per 4 characters, a slight overestimate
+_ESTIMATE_PIECES = re.compile(r"\s?\w+|\s?[^\w\s]+|\s+")
+# Where the setup scripts cache the encodings, and where `tiktoken` downloads them from
+TIKTOKEN_CACHE_DIR = Path(__file__).with_name("tiktoken_cache")
+_ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+
+def _is_encoding_cached(encoding_name: str, cache_dir: str) -> bool:
+    # `tiktoken` caches a downloaded file under the SHA-1 of its URL
+    cache_key = hashlib.sha1(_ENCODING_URL.format(encoding_name).encode()).hexdigest()
+    return (Path(cache_dir) / cache_key).is_file()
+
+
+class TokenCounter:
+    """Counts the tokens of texts and prompts locally."""
+
+    def __init__(self, encoding_name: str = "o200k_base", cache_size: int = 8192):
+        """Initialize the token counter.
+
+        Args:
+            encoding_name (str, optional): The `tiktoken` encoding. Defaults to "o200k_base", the encoding of the
+                GPT-4o, GPT-4.1, and GPT-5 models.
+            cache_size (int, optional): The number of texts whose counts are cached, since the same chunks are
+                retrieved again and again. Defaults to 8192.
+        """
+        # The encoding is only loaded from the cache, since `tiktoken` would download it otherwise
+        cache_dir = os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(TIKTOKEN_CACHE_DIR))
+        self._encoding = None
+        if not _is_encoding_cached(encoding_name, cache_dir):
+            logger.warning(
+                "Estimating token counts, since the %s encoding is not cached in %s, run the setup script to cache it",
+                encoding_name,
+                cache_dir,
+            )
+        else:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as error:
+                logger.warning(
+                    "Estimating token counts, since the %s encoding is unavailable: %r", encoding_name, error
+                )
+        self._cached_count = lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether the counts come from the tokenizer, rather than an estimate."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Count the tokens of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return self._cached_count(text)
+
+    def _count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(math.ceil(len(piece.strip() or piece) / 4) for piece in _ESTIMATE_PIECES.findall(text))
+
+    def count_messages(self, messages: list[Any]) -> int:
+        """Count the tokens of a rendered chat prompt.
+
+        Args:
+            messages (list[Any]): The messages, e.g. made by a prompt builder, or their texts.
+
+        Returns:
+            int: The number of tokens.
+        """
+        total = _REPLY_OVERHEAD
+        for message in messages:
+            contents = getattr(message, "contents", getattr(message, "content", message))
+            if not isinstance(contents, list):
+                contents = [contents]
+            total += _MESSAGE_OVERHEAD + sum(self.count(content) for content in contents if isinstance(content, str))
+        return total
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Truncate a text to at most `max_tokens` tokens.
+
+        Args:
+            text (str): The text.
+            max_tokens (int): The maximum number of tokens.
+
+        Returns:
+            str: The text, cut after its first `max_tokens` tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return self._encoding.decode(tokens[:max_tokens]).rstrip("�")  # drop a cut multi-byte character
+
+        used, end = 0, 0
+        for match in _ESTIMATE_PIECES.finditer(text):
+            used += math.ceil(len(match.group().strip() or match.group()) / 4)
+            if used > max_tokens:
+                break
+            end = match.end()
+        return text[:end]
+
+
+@dataclass
+class BudgetStats:
+    """The counters of a `ContextBudget`.
+
+    Attributes:
+        requests (int): The number of requests.
+        original_tokens (int): The context tokens of every retrieved chunk.
+        packed_tokens (int): The context tokens of the chunks passed to the synthesizer.
+        kept (int): The number of chunks passed whole.
+        truncated (int): The number of chunks truncated.
+        summarized (int): The number of chunks replaced by a summary.
+        dropped (int): The number of chunks dropped.
+    """
+
+    requests: int = 0
+    original_tokens: int = 0
+    packed_tokens: int = 0
+    kept: int = 0
+    truncated: int = 0
+    summarized: int = 0
+    dropped: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        """The context tokens saved by the budget."""
+        return self.original_tokens - self.packed_tokens
+
+    @property
+    def mean_saved_tokens(self) -> float:
+        """The context tokens saved per request."""
+        return self.saved_tokens / self.requests if self.requests else 0.0
+
+
+class ContextBudget(Component):
+    """Packs the retrieved chunks into a token budget, the chunks with the highest scores first."""
+
+    def __init__(
+        self,
+        max_context_tokens: int | None = None,
+        max_prompt_tokens: int | None = None,
+        prompt_builder: Any | None = None,
+        overflow: Literal["truncate", "summarize", "drop"] = "truncate",
+        summarizer: Any | None = None,
+        min_chunk_tokens: int = 32,
+        max_summary_input_tokens: int = 8000,
+        counter: TokenCounter | None = None,
+    ):
+        """Initialize the context budget.
+
+        Args:
+            max_context_tokens (int | None, optional): The maximum tokens of the chunks. Defaults to None.
+            max_prompt_tokens (int | None, optional): The maximum tokens of the whole rendered prompt. The tokens of
+                the prompt without the chunks are counted with `prompt_builder`, or are the tokens of the query if
+                there is none. Defaults to None.
+            prompt_builder (Any | None, optional): The prompt builder of the synthesizer, whose templates use the
+                `query` and `context` variables. Defaults to None.
+            overflow (Literal["truncate", "summarize", "drop"], optional): What to do with the chunks that do not
+                fit: truncate the first one into the remaining budget, replace them with a summary that fits it, or
+                drop them. Defaults to "truncate".
+            summarizer (Any | None, optional): The LM request processor that summarizes the chunks that do not fit,
+                with the `query` and `context` variables. Required when `overflow` is "summarize". Defaults to None.
+            min_chunk_tokens (int, optional): The smallest remaining budget worth filling with a truncated chunk or a
+                summary. Defaults to 32.
+            max_summary_input_tokens (int, optional): The maximum tokens of the chunks sent to the summarizer.
+                Defaults to 8000.
+            counter (TokenCounter | None, optional): The token counter. Defaults to None, in which case a counter
+                with the default encoding is used.
+
+        Raises:
+            ValueError: If there is no budget, or no summarizer to summarize with.
+        """
+        super().__init__()
+        if max_context_tokens is None and max_prompt_tokens is None:
+            raise ValueError("Either max_context_tokens or max_prompt_tokens must be set")
+        if overflow == "summarize" and summarizer is None:
+            raise ValueError("A summarizer is required to summarize the chunks that do not fit")
+
+        self.max_context_tokens = max_context_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.prompt_builder = prompt_builder
+        self.overflow = overflow
+        self.summarizer = summarizer
+        self.min_chunk_tokens = min_chunk_tokens
+        self.max_summary_input_tokens = max_summary_input_tokens
+        self.counter = counter or TokenCounter()
+        self.stats = BudgetStats()
+
+    def budget(self, query: str) -> int:
+        """Return the tokens available for the chunks of a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            int: The token budget of the chunks.
+        """
+        budgets = [self.max_context_tokens] if self.max_context_tokens is not None else []
+        if self.max_prompt_tokens is not None:
+            if self.prompt_builder is not None:
+                prompt_tokens = self.counter.count_messages(self.prompt_builder.format(query=query, context=""))
+            else:
+                prompt_tokens = self.counter.count(query)
+            budgets.append(self.max_prompt_tokens - prompt_tokens)
+        return max(0, min(budgets))
+
+    async def _run(self, query: str, chunks: list[Chunk], **kwargs: Any) -> list[Chunk]:
+        """Pack the chunks into the token budget of the query.
+
+        Args:
+            query (str): The query.
+            chunks (list[Chunk]): The retrieved chunks.
+            **kwargs (Any): Other inputs, ignored.
+
+        Returns:
+            list[Chunk]: The chunks that fit, from the highest score to the lowest, followed by a truncated chunk or
+                a summary if there is room for one.
+        """
+        remaining = self.budget(query)
+        ranked = sorted(chunks, key=lambda chunk: chunk.score if chunk.score is not None else -math.inf, reverse=True)
+        sizes = [self.counter.count(chunk.content) + _CHUNK_SEPARATOR_TOKENS for chunk in ranked]
+
+        packed: list[Chunk] = []
+        overflow: list[Chunk] = []
+        for chunk, size in zip(ranked, sizes):
+            # A chunk that does not fit is skipped, and the next, smaller chunks may still fit
+            if size <= remaining:
+                packed.append(chunk)
+                remaining -= size
+            else:
+                overflow.append(chunk)
+        self.stats.kept += len(packed)
+
+        if overflow and remaining - _CHUNK_SEPARATOR_TOKENS >= self.min_chunk_tokens:
+            if self.overflow == "truncate":
+                packed.append(self._truncated(overflow.pop(0), remaining - _CHUNK_SEPARATOR_TOKENS))
+                self.stats.truncated += 1
+            elif self.overflow == "summarize":
+                packed.append(await self._summary(query, overflow, remaining - _CHUNK_SEPARATOR_TOKENS))
+                self.stats.summarized += len(overflow)
+                overflow = []
+        self.stats.dropped += len(overflow)
+
+        original_tokens = sum(sizes)
+        packed_tokens = sum(self.counter.count(chunk.content) + _CHUNK_SEPARATOR_TOKENS for chunk in packed)
+        self.stats.requests += 1
+        self.stats.original_tokens += original_tokens
+        self.stats.packed_tokens += packed_tokens
+        logger.info(
+            "Packed %d of %d chunks into %d context tokens, saving %d tokens",
+            len(packed),
+            len(chunks),
+            packed_tokens,
+            original_tokens - packed_tokens,
+        )
+        return packed
+
+    def _truncated(self, chunk: Chunk, max_tokens: int) -> Chunk:
+        return chunk.model_copy(
+            update={
+                "content": self.counter.truncate(chunk.content, max_tokens),
+                "metadata": {**chunk.metadata, "truncated": True},
+            }
+        )
+
+    async def _summary(self, query: str, chunks: list[Chunk], max_tokens: int) -> Chunk:
+        context = self.counter.truncate("\n\n".join(chunk.content for chunk in chunks), self.max_summary_input_tokens)
+        summary = await self.summarizer.process(query=query, context=context)
+        summary = summary if isinstance(summary, str) else str(getattr(summary, "response", summary))
+        return Chunk(
+            content=self.counter.truncate(summary, max_tokens),
+            metadata={"summary_of": [chunk.id for chunk in chunks]},
+            score=chunks[0].score,
+        )
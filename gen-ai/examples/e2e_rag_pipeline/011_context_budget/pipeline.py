@@ -0,0 +1,83 @@
+"""Example script to build and run a RAG pipeline that packs the retrieved chunks into a token budget.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.builder import build_lm_request_processor
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+from gllm_pipeline.steps import step
+from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
+
+from context_budget import ContextBudget, TokenCounter
+
+load_dotenv()
+
+# Create components
+em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+data_store = ChromaVectorDataStore(
+    collection_name="documents",
+    client_type="persistent",
+    persist_directory="data",
+    embedding=em_invoker,
+)
+retriever = BasicVectorRetriever(data_store)
+response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
+
+# Summarizes the chunks that do not fit, when overflow="summarize"
+summarizer = build_lm_request_processor(
+    model_id=os.getenv("LANGUAGE_MODEL"),
+    system_template="Summarize the documents below, keeping only what helps to answer the question.",
+    user_template="Question: {query}\n\nDocuments:\n{context}",
+)
+# Counts tokens locally with the tokenizer of the language model
+token_counter = TokenCounter("o200k_base")
+context_budget = ContextBudget(
+    max_context_tokens=1000,
+    overflow="truncate",  # or "summarize", or "drop"
+    summarizer=summarizer,
+    counter=token_counter,
+)
+
+# Create the pipeline
+retrieve_step = step(
+    component=retriever,
+    input_map={"query": "user_query", "top_k": "top_k"},
+    output_state="chunks",
+)
+budget_step = step(
+    component=context_budget,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="chunks",
+)
+synthesize_step = step(
+    component=response_synthesizer,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="response",
+)
+e2e_pipeline = retrieve_step | budget_step | synthesize_step
+
+# Run the pipeline
+
+async def main():
+    state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
+    config = {"top_k": 20}  # a large top_k, kept within the budget
+    result = await e2e_pipeline.invoke(state, config)
+    print(f"Pipeline result: {result['response']}")
+
+    stats = context_budget.stats
+    print(
+        f"Context tokens: {stats.original_tokens} retrieved, {stats.packed_tokens} sent, {stats.saved_tokens} saved "
+        f"({'counted' if token_counter.is_exact else 'estimated'} locally)"
+    )
+    print(f"Chunks: {stats.kept} kept, {stats.truncated} truncated, {stats.summarized} summarized, {stats.dropped} dropped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,18 @@
+@echo off
+
+REM Setup script for Windows systems
+REM This script sets up UV authentication and installs dependencies
+
+echo Setting up UV authentication...
+set UV_INDEX_GEN_AI_INTERNAL_USERNAME=oauth2accesstoken
+for /f "delims=" %%i in ('gcloud auth print-access-token') do set UV_INDEX_GEN_AI_INTERNAL_PASSWORD=%%i
+
+echo Installing dependencies via UV...
+uv lock
+uv sync
+
+echo Caching the tokenizer vocabulary...
+set TIKTOKEN_CACHE_DIR=tiktoken_cache
+uv run python -c "import tiktoken; tiktoken.get_encoding('o200k_base')"
+
+echo Setup completed successfully!
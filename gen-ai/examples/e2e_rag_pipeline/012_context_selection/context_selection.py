@@ -0,0 +1,326 @@
+"""Maximal Marginal Relevance context selection and extractive compression for stuff response synthesizers.
+
+A vector retriever returns the `top_k` chunks most similar to the query, and they often repeat each other, while a
+stuff synthesizer puts every one of them into its prompt. `ContextSelector` is a step placed between the retriever
+and the synthesizer that sends fewer, more diverse, and shorter chunks within a token budget:
+1. Selection: the chunks are ranked with Maximal Marginal Relevance (MMR), which trades the similarity of a chunk to
+   the query against its similarity to the chunks already selected, so a near duplicate of a selected chunk ranks
+   low. The similarities are computed at once, as matrix products of the normalized embeddings.
+2. Compression: only the sentences of a chunk that are similar enough to the query are kept, in their order, and the
+   most similar sentence is always kept.
+3. Budget: the compressed chunks are added in MMR order while they fit in the token budget. A chunk too similar to a
+   chunk already added, or with the same compressed content, is dropped. The top ranked chunk is always added,
+   truncated to the budget if it does not fit, so the synthesizer never runs without context.
+
+The embeddings of the chunks are read from their metadata when the data store returns them, and are otherwise
+embedded and cached, together with the query and the sentences, in a single embedding call per request.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+    [2] https://www.cs.cmu.edu/~jgc/publication/The_Use_MMR_Diversity_Based_LTMIR_1998.pdf
+"""
+
+import logging
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+from gllm_core.schema import Chunk
+from gllm_core.schema.component import Component
+
+logger = logging.getLogger(__name__)
+
+# Tokens of the separator between two chunks in the context
+_CHUNK_SEPARATOR_TOKENS = 2
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=\S)")
+
+
+def default_token_counter(encoding_name: str = "o200k_base") -> Callable[[str], int]:
+    """Return a function that counts the tokens of a text locally.
+
+    Args:
+        encoding_name (str, optional): The `tiktoken` encoding. Defaults to "o200k_base", the encoding of the
+            GPT-4o, GPT-4.1, and GPT-5 models.
+
+    Returns:
+        Callable[[str], int]: The token counter, which estimates a token per 4 characters if the encoding cannot
+            be loaded.
+    """
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as error:
+        logger.warning("Estimating token counts, since the %s encoding is unavailable: %r", encoding_name, error)
+        return lambda text: math.ceil(len(text) / 4)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split a text into its sentences.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list[str]: The sentences.
+    """
+    return [sentence for sentence in _SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray, embeddings: np.ndarray, lambda_mult: float = 0.5
+) -> list[int]:
+    """Rank embeddings with Maximal Marginal Relevance.
+
+    Each step selects the embedding with the highest `lambda_mult * sim(query) - (1 - lambda_mult) * max sim(selected)`,
+    with the cosine similarities computed at once and the maximum similarity to the selected embeddings updated with
+    the row of each selected embedding.
+
+    Args:
+        query_embedding (np.ndarray): The embedding of the query.
+        embeddings (np.ndarray): The embeddings to rank, one per row.
+        lambda_mult (float, optional): The weight of the relevance, from 0 for the most diverse ranking to 1 for the
+            ranking by similarity to the query. Defaults to 0.5.
+
+    Returns:
+        list[int]: The indices of the embeddings, in MMR order.
+    """
+    embeddings = _normalized(np.asarray(embeddings, dtype=np.float32))
+    relevance = embeddings @ _normalized(np.asarray(query_embedding, dtype=np.float32))
+    similarities = embeddings @ embeddings.T
+    redundancy = np.full(len(embeddings), -np.inf, dtype=np.float32)
+    available = np.ones(len(embeddings), dtype=bool)
+
+    ranking = []
+    for _ in range(len(embeddings)):
+        # Before any selection there is no redundancy, so the first pick is the most relevant embedding
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        ranking.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarities[best])
+    return ranking
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+@dataclass
+class SelectionStats:
+    """The counters of a `ContextSelector`.
+
+    Attributes:
+        requests (int): The number of requests.
+        retrieved_chunks (int): The number of retrieved chunks.
+        selected_chunks (int): The number of chunks passed to the synthesizer.
+        compressed_chunks (int): The number of selected chunks with sentences removed.
+        original_tokens (int): The context tokens of every retrieved chunk.
+        selected_tokens (int): The context tokens of the chunks passed to the synthesizer.
+        embedded_texts (int): The number of texts embedded, the query and the sentences included.
+    """
+
+    requests: int = 0
+    retrieved_chunks: int = 0
+    selected_chunks: int = 0
+    compressed_chunks: int = 0
+    original_tokens: int = 0
+    selected_tokens: int = 0
+    embedded_texts: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        """The context tokens saved by the selection and the compression."""
+        return self.original_tokens - self.selected_tokens
+
+    @property
+    def mean_saved_tokens(self) -> float:
+        """The context tokens saved per request."""
+        return self.saved_tokens / self.requests if self.requests else 0.0
+
+
+class ContextSelector(Component):
+    """Selects diverse chunks with MMR and compresses them to their relevant sentences, within a token budget."""
+
+    def __init__(
+        self,
+        em_invoker: Any,
+        max_context_tokens: int = 1000,
+        lambda_mult: float = 0.5,
+        max_chunks: int | None = None,
+        max_redundancy: float = 0.95,
+        compress: bool = True,
+        min_sentence_similarity: float = 0.3,
+        embedding_key: str = "embedding",
+        cache_size: int = 8192,
+        counter: Callable[[str], int] | None = None,
+    ):
+        """Initialize the context selector.
+
+        Args:
+            em_invoker (Any): The EM invoker of the retriever, that embeds the query, the sentences, and the chunks
+                returned without their embedding.
+            max_context_tokens (int, optional): The maximum tokens of the selected chunks. Defaults to 1000.
+            lambda_mult (float, optional): The MMR weight of the relevance, from 0 for the most diverse chunks to 1
+                for the chunks most similar to the query. Defaults to 0.5.
+            max_chunks (int | None, optional): The maximum number of selected chunks. Defaults to None.
+            max_redundancy (float, optional): The highest cosine similarity of a selected chunk to a chunk selected
+                before it, above which it is dropped as a near duplicate. Defaults to 0.95.
+            compress (bool, optional): Whether to keep only the sentences of the chunks that are similar to the
+                query. Defaults to True.
+            min_sentence_similarity (float, optional): The lowest cosine similarity to the query of a kept sentence.
+                Defaults to 0.3.
+            embedding_key (str, optional): The metadata key of the chunk embeddings, when the data store returns
+                them. Defaults to "embedding".
+            cache_size (int, optional): The number of chunk and sentence embeddings cached, since the same chunks
+                are retrieved again and again. Defaults to 8192.
+            counter (Callable[[str], int] | None, optional): Counts the tokens of a text. Defaults to None, in which
+                case the tokens are counted locally with `tiktoken`.
+        """
+        super().__init__()
+        self.em_invoker = em_invoker
+        self.max_context_tokens = max_context_tokens
+        self.lambda_mult = lambda_mult
+        self.max_chunks = max_chunks
+        self.max_redundancy = max_redundancy
+        self.compress = compress
+        self.min_sentence_similarity = min_sentence_similarity
+        self.embedding_key = embedding_key
+        self.cache_size = cache_size
+        self.counter = counter or default_token_counter()
+        self.stats = SelectionStats()
+        self._embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    async def _run(self, query: str, chunks: list[Chunk], **kwargs: Any) -> list[Chunk]:
+        """Select and compress the chunks of the query within the token budget.
+
+        Args:
+            query (str): The query.
+            chunks (list[Chunk]): The retrieved chunks.
+            **kwargs (Any): Other inputs, ignored.
+
+        Returns:
+            list[Chunk]: The selected chunks, in MMR order, with only their relevant sentences if compressed.
+        """
+        if not chunks:
+            return []
+
+        sentences = [split_sentences(chunk.content) if self.compress else [] for chunk in chunks]
+        stored = [chunk.metadata.get(self.embedding_key) for chunk in chunks]
+        texts = [chunk.content for chunk, embedding in zip(chunks, stored) if embedding is None]
+        # Only the chunks with more than one sentence can be compressed
+        for chunk_sentences in sentences:
+            if len(chunk_sentences) > 1:
+                texts.extend(chunk_sentences)
+        embeddings = await self._embed([query, *texts])
+
+        query_embedding = embeddings[query]
+        chunk_embeddings = np.stack(
+            [
+                np.asarray(embedding, dtype=np.float32) if embedding is not None else embeddings[chunk.content]
+                for chunk, embedding in zip(chunks, stored)
+            ]
+        )
+        ranking = maximal_marginal_relevance(query_embedding, chunk_embeddings, self.lambda_mult)
+        normalized_embeddings = _normalized(chunk_embeddings)
+        similarities = normalized_embeddings @ normalized_embeddings.T
+
+        selected: list[Chunk] = []
+        selected_indices: list[int] = []
+        contents: set[str] = set()
+        remaining = self.max_context_tokens
+        for index in ranking:
+            if self.max_chunks is not None and len(selected) >= self.max_chunks:
+                break
+            # MMR only ranks the near duplicates last, so they are dropped here rather than sent when they fit
+            if selected_indices and similarities[index, selected_indices].max() > self.max_redundancy:
+                continue
+            chunk = self._compressed(chunks[index], sentences[index], query_embedding, embeddings)
+            if chunk.content in contents:
+                continue
+            size = self.counter(chunk.content) + _CHUNK_SEPARATOR_TOKENS
+            if size > remaining and not selected:
+                chunk = self._truncated(chunk, remaining - _CHUNK_SEPARATOR_TOKENS)
+                size = self.counter(chunk.content) + _CHUNK_SEPARATOR_TOKENS
+            if size <= remaining:
+                selected.append(chunk)
+                selected_indices.append(index)
+                contents.add(chunk.content)
+                remaining -= size
+
+        original_tokens = sum(self.counter(chunk.content) + _CHUNK_SEPARATOR_TOKENS for chunk in chunks)
+        selected_tokens = self.max_context_tokens - remaining
+        self.stats.requests += 1
+        self.stats.retrieved_chunks += len(chunks)
+        self.stats.selected_chunks += len(selected)
+        self.stats.compressed_chunks += sum(1 for chunk in selected if chunk.metadata.get("compressed"))
+        self.stats.original_tokens += original_tokens
+        self.stats.selected_tokens += selected_tokens
+        logger.info(
+            "Selected %d of %d chunks in %d context tokens, saving %d tokens",
+            len(selected),
+            len(chunks),
+            selected_tokens,
+            original_tokens - selected_tokens,
+        )
+        return selected
+
+    def _truncated(self, chunk: Chunk, max_tokens: int) -> Chunk:
+        # The longest prefix of whole words that fits, found by bisection since the counter only counts
+        words = chunk.content.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.counter(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return chunk.model_copy(
+            update={"content": " ".join(words[:low]), "metadata": {**chunk.metadata, "truncated": True}}
+        )
+
+    def _compressed(
+        self,
+        chunk: Chunk,
+        sentences: list[str],
+        query_embedding: np.ndarray,
+        embeddings: dict[str, np.ndarray],
+    ) -> Chunk:
+        if len(sentences) <= 1:
+            return chunk
+
+        similarities = _normalized(np.stack([embeddings[sentence] for sentence in sentences])) @ query_embedding
+        keep = similarities >= self.min_sentence_similarity
+        keep[int(np.argmax(similarities))] = True
+        if keep.all():
+            return chunk
+        return chunk.model_copy(
+            update={
+                "content": " ".join(sentence for sentence, kept in zip(sentences, keep) if kept),
+                "metadata": {**chunk.metadata, "compressed": True},
+            }
+        )
+
+    async def _embed(self, texts: list[str]) -> dict[str, np.ndarray]:
+        # The query is embedded on every request, the chunks and the sentences only when they are not cached
+        query, *texts = texts
+        missing = [query, *dict.fromkeys(text for text in texts if text not in self._embeddings and text != query)]
+        vectors = _normalized(np.asarray(await self.em_invoker.invoke(missing), dtype=np.float32))
+        self.stats.embedded_texts += len(missing)
+
+        embeddings = {text: self._embeddings[text] for text in texts if text in self._embeddings}
+        for text, vector in zip(missing, vectors):
+            embeddings[text] = vector
+            if text != query and self.cache_size > 0:
+                self._embeddings[text] = vector
+        for text in embeddings:
+            if text in self._embeddings:
+                self._embeddings.move_to_end(text)
+        while len(self._embeddings) > self.cache_size:
+            self._embeddings.popitem(last=False)
+        return embeddings
@@ -0,0 +1,76 @@
+"""Example script to build and run a RAG pipeline that selects and compresses the retrieved chunks before synthesis.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+from gllm_pipeline.steps import step
+from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
+
+from context_selection import ContextSelector
+
+load_dotenv()
+
+# Create components
+em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+data_store = ChromaVectorDataStore(
+    collection_name="documents",
+    client_type="persistent",
+    persist_directory="data",
+    embedding=em_invoker,
+)
+retriever = BasicVectorRetriever(data_store)
+response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
+
+# Selects diverse chunks, keeps their sentences relevant to the query, and fits them into the budget
+context_selector = ContextSelector(
+    em_invoker=em_invoker,  # the same embedding model as the retriever
+    max_context_tokens=600,
+    lambda_mult=0.5,  # 1 ranks by relevance only, lower values favor diverse chunks
+    min_sentence_similarity=0.3,
+)
+
+# Create the pipeline
+retrieve_step = step(
+    component=retriever,
+    input_map={"query": "user_query", "top_k": "top_k"},
+    output_state="chunks",
+)
+select_step = step(
+    component=context_selector,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="chunks",
+)
+synthesize_step = step(
+    component=response_synthesizer,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="response",
+)
+e2e_pipeline = retrieve_step | select_step | synthesize_step
+
+# Run the pipeline
+
+async def main():
+    state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
+    config = {"top_k": 20}  # a large top_k, narrowed down by the selector
+    result = await e2e_pipeline.invoke(state, config)
+    print(f"Pipeline result: {result['response']}")
+
+    stats = context_selector.stats
+    print(
+        f"Context tokens: {stats.original_tokens} retrieved, {stats.selected_tokens} sent, {stats.saved_tokens} saved"
+    )
+    print(
+        f"Chunks: {stats.selected_chunks} of {stats.retrieved_chunks} selected, {stats.compressed_chunks} compressed"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
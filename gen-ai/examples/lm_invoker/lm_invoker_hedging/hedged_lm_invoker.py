@@ -0,0 +1,169 @@
+"""An LM invoker wrapper that hedges slow requests to cut tail latency.
+
+When a request has not completed after the hedge delay, a duplicate request is sent, optionally to an alternate
+model or provider, and whichever response arrives first is returned while the other request is cancelled. The
+hedge delay is either fixed or the observed percentile (p95 by default) of a rolling latency window, and the
+share of requests that may be hedged is capped to bound the extra cost.
+
+References:
+    [1] https://research.google/pubs/the-tail-at-scale/
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class HedgeStats:
+    """The hedging counters of a `HedgedLMInvoker`.
+
+    Attributes:
+        requests (int): The number of invocations.
+        hedges (int): The number of duplicate requests sent.
+        hedge_wins (int): The number of hedged invocations answered by the duplicate request.
+        skipped (int): The number of invocations that were slow enough to hedge but hit the hedge ratio cap.
+    """
+
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    skipped: int = 0
+
+    @property
+    def hedge_ratio(self) -> float:
+        """The share of invocations that sent a duplicate request."""
+        return self.hedges / self.requests if self.requests else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """The share of duplicate requests that answered first."""
+        return self.hedge_wins / self.hedges if self.hedges else 0.0
+
+
+class HedgedLMInvoker:
+    """Wraps an LM invoker to send a duplicate request when the first one is slow.
+
+    All other attributes are forwarded to the primary invoker, so it can be passed wherever the invoker is used,
+    e.g. as the `lm_invoker` of an `LMRequestProcessor`.
+
+    Streaming invocations (with an `event_emitter`) are never hedged, since both requests would stream their
+    tokens to the same emitter.
+    """
+
+    def __init__(
+        self,
+        lm_invoker: Any,
+        hedge_lm_invoker: Any | None = None,
+        delay: float | None = None,
+        percentile: float = 0.95,
+        initial_delay: float = 2.0,
+        window_size: int = 500,
+        min_samples: int = 20,
+        max_hedge_ratio: float = 0.1,
+    ):
+        """Initialize the hedged LM invoker.
+
+        Args:
+            lm_invoker (Any): The primary LM invoker.
+            hedge_lm_invoker (Any | None, optional): The LM invoker for the duplicate request, e.g. an alternate
+                model or provider. Defaults to None, in which case the primary invoker is used.
+            delay (float | None, optional): A fixed hedge delay in seconds. Defaults to None, in which case the
+                delay is the `percentile` of the rolling latency window.
+            percentile (float, optional): The latency percentile used as hedge delay. Defaults to 0.95.
+            initial_delay (float, optional): The hedge delay in seconds until `min_samples` latencies have been
+                observed. Defaults to 2.0.
+            window_size (int, optional): The number of recent latencies to keep. Defaults to 500.
+            min_samples (int, optional): The number of latencies needed before the percentile is used.
+                Defaults to 20.
+            max_hedge_ratio (float, optional): The maximum share of invocations that may be hedged.
+                Defaults to 0.1.
+        """
+        self.lm_invoker = lm_invoker
+        self.hedge_lm_invoker = hedge_lm_invoker or lm_invoker
+        self.delay = delay
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.stats = HedgeStats()
+        self._latencies: deque[float] = deque(maxlen=window_size)
+
+    def hedge_delay(self) -> float:
+        """Return the current hedge delay in seconds."""
+        if self.delay is not None:
+            return self.delay
+
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, math.ceil(self.percentile * len(latencies)) - 1)]
+
+    async def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the primary LM invoker, hedging the request if it is slower than the hedge delay.
+
+        Args:
+            *args (Any): The positional arguments of the wrapped invoker's `invoke`.
+            **kwargs (Any): The keyword arguments of the wrapped invoker's `invoke`.
+
+        Returns:
+            Any: The output of whichever request completed first.
+
+        Raises:
+            Exception: The error of the last request to fail, if no request succeeded.
+        """
+        self.stats.requests += 1
+        if kwargs.get("event_emitter") is not None:
+            return await self.lm_invoker.invoke(*args, **kwargs)
+
+        started_at = time.perf_counter()
+        primary = asyncio.create_task(self.lm_invoker.invoke(*args, **kwargs))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+
+        if done or not self._can_hedge():
+            result = await primary
+            self._latencies.append(time.perf_counter() - started_at)
+            return result
+
+        self.stats.hedges += 1
+        hedge = asyncio.create_task(self.hedge_lm_invoker.invoke(*args, **kwargs))
+        try:
+            winner = await self._first_successful(primary, hedge)
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+        self._latencies.append(time.perf_counter() - started_at)
+        if winner is hedge:
+            self.stats.hedge_wins += 1
+        return winner.result()
+
+    def _can_hedge(self) -> bool:
+        if self.stats.hedges + 1 <= self.max_hedge_ratio * self.stats.requests:
+            return True
+
+        self.stats.skipped += 1
+        return False
+
+    @staticmethod
+    async def _first_successful(*tasks: asyncio.Task) -> asyncio.Task:
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+            if not pending:
+                return done.pop()  # every request failed, so `result()` raises the last error
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the primary LM invoker."""
+        return getattr(self.lm_invoker, name)
@@ -0,0 +1,35 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_invoker
+from gllm_inference.model import OpenAILM
+from gllm_inference.schema import ModelProvider
+
+from hedged_lm_invoker import HedgedLMInvoker
+
+load_dotenv()
+
+questions = [f"What is the capital of country number {i} in alphabetical order? Answer briefly." for i in range(1, 41)]
+
+
+async def main():
+    lm_invoker = HedgedLMInvoker(
+        build_lm_invoker(model_id=f"{ModelProvider.OPENAI}/{OpenAILM.GPT_5_NANO}"),
+        # Optionally send the duplicate request to an alternate model or provider
+        hedge_lm_invoker=build_lm_invoker(model_id="openai/gpt-4.1-mini"),
+        percentile=0.95,  # hedge requests slower than the observed p95 latency
+        min_samples=10,
+        max_hedge_ratio=0.1,  # never hedge more than 10% of the requests
+    )
+
+    responses = await asyncio.gather(*(lm_invoker.invoke(question) for question in questions))
+    print(f"Response: {responses[0]}")
+    print(f"Hedge delay: {lm_invoker.hedge_delay():.2f} seconds")
+    print(
+        f"Requests: {lm_invoker.stats.requests}, hedged: {lm_invoker.stats.hedges} "
+        f"({lm_invoker.stats.hedge_ratio:.0%}), hedge win rate: {lm_invoker.stats.win_rate:.0%}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_inference.model import AnthropicLM, GoogleLM, OpenAILM
+from gllm_inference.schema import ModelProvider
+
+from load_balancer import build_load_balanced_lm_invoker
+
+load_dotenv()
+
+# Equivalent models on several providers
+MODEL_IDS = [
+    f"{ModelProvider.OPENAI}/{OpenAILM.GPT_5_NANO}",
+    f"{ModelProvider.ANTHROPIC}/{AnthropicLM.CLAUDE_SONNET_4}",
+    f"{ModelProvider.GOOGLE}/{GoogleLM.GEMINI_2_5_FLASH_LITE}",
+]
+
+questions = [f"What is the capital of country number {i} in alphabetical order? Answer briefly." for i in range(1, 41)]
+
+
+async def main():
+    lm_invoker = build_load_balanced_lm_invoker(
+        MODEL_IDS,
+        requests_per_minute={MODEL_IDS[1]: 50},  # prefer the other providers as this quota runs out
+        cooldown=30.0,  # probe an ejected provider again after 30 seconds
+    )
+
+    responses = await asyncio.gather(*(lm_invoker.invoke(question) for question in questions))
+    print(f"Response: {responses[0]}")
+
+    stats = lm_invoker.stats
+    print(f"Requests: {stats.requests}, failovers: {stats.failovers}, failures: {stats.failures}")
+    print(f"p50 latency: {stats.percentile(0.5):.2f} seconds, p95 latency: {stats.percentile(0.95):.2f} seconds")
+    for backend in stats.backends:
+        print(
+            f"{backend.model_id}: {backend.calls} calls, {backend.errors} errors, "
+            f"EWMA latency {backend.latency:.2f} seconds, circuit {backend.state.value}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
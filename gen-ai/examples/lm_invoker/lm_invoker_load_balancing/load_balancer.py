@@ -0,0 +1,383 @@
+"""Latency-aware load balancing and failover across equivalent models and providers.
+
+`LoadBalancedLMInvoker` spreads the requests across a pool of LM invokers of equivalent models, e.g. the same model
+on several providers or regions. Each request picks the better of two random available backends ("power of two
+choices"), scored by:
+- the EWMA (exponentially weighted moving average) of its latency, times the requests already in flight on it,
+- the EWMA of its error rate, and
+- its remaining requests per minute quota, if it has one.
+
+A circuit breaker ejects a backend whose error rate or consecutive failures exceed a threshold, and sends it a single
+probe request after a cooldown: the backend is closed back in if the probe succeeds, and ejected again otherwise. A
+backend without a successful request yet, new or probed, is sent a request directly rather than scored, since its
+latency and error rate are not known. A request that fails with a retryable error fails over to another backend, so a
+provider incident costs a few slow requests instead of a steady share of failures, and the p95 latency stays steady.
+
+References:
+    [1] https://en.wikipedia.org/wiki/Exponential_smoothing
+    [2] https://www.eecs.harvard.edu/~michaelm/postscripts/tpds2001.pdf
+    [3] https://martinfowler.com/bliki/CircuitBreaker.html
+"""
+
+import logging
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Sequence
+
+from gllm_inference.builder import build_lm_invoker
+
+logger = logging.getLogger(__name__)
+
+# Client errors that another backend would answer the same way are not failed over
+_RETRYABLE_CLIENT_ERRORS = frozenset({408, 409, 429})
+
+
+class CircuitState(str, Enum):
+    """The states of the circuit breaker of a backend."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def _status_code(error: Exception) -> int | None:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Return whether a request that failed with an error may succeed on another backend.
+
+    Args:
+        error (Exception): The error.
+
+    Returns:
+        bool: False for client errors such as an invalid request, and True otherwise.
+    """
+    status_code = _status_code(error)
+    if not isinstance(status_code, int):
+        return True
+    return not 400 <= status_code < 500 or status_code in _RETRYABLE_CLIENT_ERRORS
+
+
+@dataclass
+class BackendStats:
+    """The counters of one backend of a `LoadBalancedLMInvoker`.
+
+    Attributes:
+        model_id (str): The model id.
+        calls (int): The number of requests sent to the backend.
+        errors (int): The number of requests that failed on the backend.
+        ejections (int): The number of times the circuit breaker ejected the backend.
+        latency (float): The EWMA of the latency of its successful requests, in seconds.
+        error_rate (float): The EWMA of its error rate.
+        state (CircuitState): The state of its circuit breaker.
+    """
+
+    model_id: str
+    calls: int = 0
+    errors: int = 0
+    ejections: int = 0
+    latency: float = 0.0
+    error_rate: float = 0.0
+    state: CircuitState = CircuitState.CLOSED
+
+
+@dataclass
+class LoadBalancerStats:
+    """The counters of a `LoadBalancedLMInvoker`.
+
+    Attributes:
+        requests (int): The number of invocations.
+        failovers (int): The number of requests retried on another backend after an error.
+        failures (int): The number of invocations that failed on every backend they tried.
+        latencies (deque[float]): The latencies of the recent invocations, in seconds, including failovers.
+        backends (list[BackendStats]): The counters of each backend.
+    """
+
+    requests: int = 0
+    failovers: int = 0
+    failures: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    backends: list[BackendStats] = field(default_factory=list)
+
+    def percentile(self, percentile: float) -> float:
+        """Return a percentile of the recent latencies, e.g. 0.95 for the p95, in seconds."""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, math.ceil(percentile * len(latencies)) - 1)]
+
+
+class _Backend:
+    """An LM invoker with its health, load, and quota."""
+
+    def __init__(self, lm_invoker: Any, stats: BackendStats, requests_per_minute: float | None):
+        self.lm_invoker = lm_invoker
+        self.stats = stats
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.measured = False
+        self.paused_until = 0.0
+        self.capacity = requests_per_minute
+        self.quota = requests_per_minute
+        self._refilled_at = time.monotonic()
+
+    def remaining_quota(self) -> float:
+        """Return the share of the requests per minute quota that is left, 1.0 without a quota."""
+        if self.capacity is None:
+            return 1.0
+        now = time.monotonic()
+        self.quota = min(self.capacity, self.quota + (now - self._refilled_at) * self.capacity / 60.0)
+        self._refilled_at = now
+        return max(0.0, self.quota / self.capacity)
+
+
+class LoadBalancedLMInvoker:
+    """Spreads requests across equivalent LM invokers by latency, error rate, and remaining quota, with failover.
+
+    All other attributes are forwarded to the first LM invoker.
+
+    Streaming invocations (with an `event_emitter`) only fail over while no event has been emitted, so that a
+    response is never streamed twice.
+    """
+
+    def __init__(
+        self,
+        lm_invokers: Sequence[Any],
+        model_ids: Sequence[str] | None = None,
+        requests_per_minute: dict[str, float] | None = None,
+        max_attempts: int | None = None,
+        smoothing: float = 0.2,
+        initial_latency: float = 1.0,
+        failure_threshold: float = 0.5,
+        max_consecutive_failures: int = 5,
+        min_requests: int = 10,
+        cooldown: float = 30.0,
+        default_retry_after: float = 5.0,
+    ):
+        """Initialize the load balanced LM invoker.
+
+        Args:
+            lm_invokers (Sequence[Any]): The LM invokers of equivalent models.
+            model_ids (Sequence[str] | None, optional): The model id of each invoker, for the stats and
+                `requests_per_minute`. Defaults to None, in which case the invokers' `model_id` is used.
+            requests_per_minute (dict[str, float] | None, optional): The requests per minute quota of each model id.
+                Backends without a quota are never considered exhausted. Defaults to None.
+            max_attempts (int | None, optional): The maximum number of backends a request tries. Defaults to None,
+                in which case every backend may be tried.
+            smoothing (float, optional): The weight of the latest request in the latency and error rate EWMAs.
+                Defaults to 0.2.
+            initial_latency (float, optional): The latency in seconds assumed for a backend without a successful
+                request yet, while one is in flight. Defaults to 1.0.
+            failure_threshold (float, optional): The error rate EWMA above which a backend is ejected.
+                Defaults to 0.5.
+            max_consecutive_failures (int, optional): The consecutive failures after which a backend is ejected.
+                Defaults to 5.
+            min_requests (int, optional): The number of requests a backend needs before its error rate can eject it.
+                Defaults to 10.
+            cooldown (float, optional): The seconds an ejected backend waits before a probe request. Defaults to 30.0.
+            default_retry_after (float, optional): The seconds a backend is skipped after a 429 that does not say how
+                long to wait. Defaults to 5.0.
+
+        Raises:
+            ValueError: If no LM invoker is given.
+        """
+        if not lm_invokers:
+            raise ValueError("A load balancer needs at least one LM invoker")
+
+        if model_ids is None:
+            model_ids = [str(getattr(lm_invoker, "model_id", index)) for index, lm_invoker in enumerate(lm_invokers)]
+        requests_per_minute = requests_per_minute or {}
+        self.stats = LoadBalancerStats()
+        self._backends = []
+        for lm_invoker, model_id in zip(lm_invokers, model_ids):
+            backend_stats = BackendStats(model_id, latency=initial_latency)
+            self.stats.backends.append(backend_stats)
+            self._backends.append(_Backend(lm_invoker, backend_stats, requests_per_minute.get(model_id)))
+
+        self.max_attempts = min(max_attempts or len(self._backends), len(self._backends))
+        self.smoothing = smoothing
+        self.initial_latency = initial_latency
+        self.failure_threshold = failure_threshold
+        self.max_consecutive_failures = max_consecutive_failures
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.default_retry_after = default_retry_after
+
+    def score(self, backend: _Backend) -> float:
+        """Return the expected cost of sending a request to a backend; lower is better."""
+        latency = backend.stats.latency * (backend.in_flight + 1)
+        return latency / max(1.0 - backend.stats.error_rate, 0.01) / max(backend.remaining_quota(), 0.01)
+
+    def _available(self, backend: _Backend, now: float) -> bool:
+        if now < backend.paused_until:
+            return False
+        if backend.stats.state is CircuitState.OPEN and now - backend.opened_at >= self.cooldown:
+            # The EWMAs describe the backend before its ejection, so they are reset for the probe to measure it again
+            backend.stats.state = CircuitState.HALF_OPEN
+            backend.stats.error_rate = 0.0
+            backend.stats.latency = self.initial_latency
+            backend.measured = False
+            logger.info("Probing %s", backend.stats.model_id)
+        if backend.stats.state is CircuitState.HALF_OPEN:
+            return not backend.probing
+        return backend.stats.state is CircuitState.CLOSED
+
+    def _select(self, tried: set[int]) -> _Backend:
+        now = time.monotonic()
+        untried = [backend for index, backend in enumerate(self._backends) if index not in tried]
+        candidates = [backend for backend in untried if self._available(backend, now)]
+        if not candidates:
+            # Every backend is unhealthy: rather than failing, try the one whose circuit opened first
+            candidates = sorted(
+                untried, key=lambda backend: (backend.stats.state is not CircuitState.CLOSED, backend.opened_at)
+            )[:1]
+        # A backend to probe would lose every comparison on its stale or assumed scores, so it is sent the request
+        for backend in candidates:
+            if backend.stats.state is CircuitState.HALF_OPEN or (not backend.measured and backend.in_flight == 0):
+                return backend
+        if len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=self.score)
+
+    async def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the best available backend, failing over to the next one on a retryable error.
+
+        Args:
+            *args (Any): The positional arguments of the wrapped invokers' `invoke`.
+            **kwargs (Any): The keyword arguments of the wrapped invokers' `invoke`.
+
+        Returns:
+            Any: The output of the first backend that succeeded.
+
+        Raises:
+            Exception: The error of the last backend tried, if none succeeded.
+        """
+        self.stats.requests += 1
+        started_at = time.perf_counter()
+        event_emitter = kwargs.pop("event_emitter", None)
+        tracking_emitter = _TrackingEmitter(event_emitter) if event_emitter is not None else None
+        tried: set[int] = set()
+        try:
+            while True:
+                backend = self._select(tried)
+                tried.add(self._backends.index(backend))
+                try:
+                    if tracking_emitter is not None:
+                        return await self._invoke(backend, *args, event_emitter=tracking_emitter, **kwargs)
+                    return await self._invoke(backend, *args, **kwargs)
+                except Exception as error:
+                    streamed = tracking_emitter is not None and tracking_emitter.emitted
+                    if len(tried) >= self.max_attempts or streamed or not is_retryable_error(error):
+                        self.stats.failures += 1
+                        raise
+                    self.stats.failovers += 1
+                    logger.warning("Failing over from %s after an error: %r", backend.stats.model_id, error)
+        finally:
+            self.stats.latencies.append(time.perf_counter() - started_at)
+
+    async def _invoke(self, backend: _Backend, *args: Any, **kwargs: Any) -> Any:
+        stats = backend.stats
+        stats.calls += 1
+        backend.in_flight += 1
+        if backend.capacity is not None:
+            backend.remaining_quota()
+            backend.quota -= 1
+        if stats.state is CircuitState.HALF_OPEN:
+            backend.probing = True
+
+        started_at = time.perf_counter()
+        try:
+            output = await backend.lm_invoker.invoke(*args, **kwargs)
+        except Exception as error:
+            self._record_failure(backend, error)
+            raise
+        finally:
+            backend.in_flight -= 1
+            backend.probing = False
+
+        latency = time.perf_counter() - started_at
+        # The first successful request replaces the assumed latency rather than being averaged with it
+        stats.latency = stats.latency + self.smoothing * (latency - stats.latency) if backend.measured else latency
+        backend.measured = True
+        stats.error_rate -= self.smoothing * stats.error_rate
+        backend.consecutive_failures = 0
+        if stats.state is not CircuitState.CLOSED:
+            stats.state = CircuitState.CLOSED
+            logger.info("Closed %s back in", stats.model_id)
+        return output
+
+    def _record_failure(self, backend: _Backend, error: Exception) -> None:
+        stats = backend.stats
+        if _status_code(error) == 429:
+            # The quota is exhausted, which says nothing about the health of the backend
+            backend.paused_until = time.monotonic() + (_retry_after(error) or self.default_retry_after)
+            return
+        if not is_retryable_error(error):
+            return
+
+        stats.errors += 1
+        stats.error_rate += self.smoothing * (1.0 - stats.error_rate)
+        backend.consecutive_failures += 1
+        unhealthy = stats.calls >= self.min_requests and stats.error_rate > self.failure_threshold
+        if stats.state is CircuitState.HALF_OPEN or unhealthy or (
+            backend.consecutive_failures >= self.max_consecutive_failures
+        ):
+            if stats.state is not CircuitState.OPEN:
+                stats.ejections += 1
+                logger.warning("Ejected %s for %s seconds", stats.model_id, self.cooldown)
+            stats.state = CircuitState.OPEN
+            backend.opened_at = time.monotonic()
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the first LM invoker."""
+        return getattr(self._backends[0].lm_invoker, name)
+
+
+class _TrackingEmitter:
+    """Forwards events to an event emitter and records whether any was emitted."""
+
+    def __init__(self, event_emitter: Any):
+        self.event_emitter = event_emitter
+        self.emitted = False
+
+    async def emit(self, *args: Any, **kwargs: Any) -> None:
+        self.emitted = True
+        await self.event_emitter.emit(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.event_emitter, name)
+
+
+def _retry_after(error: Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_load_balanced_lm_invoker(
+    model_ids: Sequence[str],
+    requests_per_minute: dict[str, float] | None = None,
+    **kwargs: Any,
+) -> LoadBalancedLMInvoker:
+    """Build a load balanced LM invoker from the model ids of equivalent models.
+
+    Args:
+        model_ids (Sequence[str]): The model ids, e.g. "openai/gpt-4.1-mini" and "anthropic/claude-sonnet-4".
+        requests_per_minute (dict[str, float] | None, optional): The requests per minute quota of each model id.
+            Defaults to None.
+        **kwargs (Any): The other arguments of `LoadBalancedLMInvoker`, e.g. `cooldown`.
+
+    Returns:
+        LoadBalancedLMInvoker: The load balanced LM invoker.
+    """
+    lm_invokers = [build_lm_invoker(model_id=model_id) for model_id in model_ids]
+    return LoadBalancedLMInvoker(lm_invokers, model_ids, requests_per_minute, **kwargs)
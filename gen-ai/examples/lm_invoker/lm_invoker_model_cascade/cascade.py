@@ -0,0 +1,286 @@
+"""An LM invoker that tries cheap models first and escalates to stronger ones when unsure.
+
+`build_cascade_lm_invoker` builds one LM invoker per model id with `build_lm_invoker`, ordered from the cheapest to
+the strongest. Each request goes to the cheapest model first. Its output is scored by confidence signals, and when the
+lowest score falls below the threshold, or the model fails, the request escalates to the next model. The strongest
+model's output is always accepted, and an output that no signal could score counts as not confident. Easy requests
+are answered by the cheap models, so the average latency and cost drop, while hard requests still reach the strongest
+model.
+
+Three confidence signals are provided:
+- `logprob_confidence`: the geometric mean of the token probabilities, for invokers that return log probabilities.
+- `validator_confidence`: a function of the response text, returning a score or whether the response is valid.
+- `parser_confidence`: whether an output parser, e.g. `JSONOutputParser`, parses the response.
+
+References:
+    [1] https://arxiv.org/abs/2305.05176
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from gllm_inference.builder import build_lm_invoker
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_EVENT_TYPE = "response"
+
+ConfidenceSignal = Callable[[Any], float | None]
+
+
+def _text(output: Any) -> str:
+    return output if isinstance(output, str) else str(getattr(output, "response", output))
+
+
+def logprob_confidence(output: Any) -> float | None:
+    """Score an output by the geometric mean of its token probabilities.
+
+    Args:
+        output (Any): The LM output. Its `logprobs` are either numbers or objects with a `logprob`.
+
+    Returns:
+        float | None: The score between 0 and 1, or None if the output has no log probabilities.
+    """
+    logprobs = getattr(output, "logprobs", None)
+    if not logprobs:
+        return None
+    values = [getattr(logprob, "logprob", logprob) for logprob in logprobs]
+    return math.exp(sum(values) / len(values))
+
+
+def validator_confidence(validator: Callable[[str], bool | float]) -> ConfidenceSignal:
+    """Return a confidence signal that scores the response text with a validator.
+
+    Args:
+        validator (Callable[[str], bool | float]): Returns whether the response is valid, or a score between 0 and 1.
+            An exception counts as a score of 0.
+
+    Returns:
+        ConfidenceSignal: The confidence signal.
+    """
+
+    def confidence(output: Any) -> float:
+        try:
+            return float(validator(_text(output)))
+        except Exception:
+            return 0.0
+
+    return confidence
+
+
+def parser_confidence(output_parser: Any) -> ConfidenceSignal:
+    """Return a confidence signal that scores 1 if an output parser parses the response, and 0 otherwise.
+
+    Args:
+        output_parser (Any): The output parser, e.g. `JSONOutputParser()`.
+
+    Returns:
+        ConfidenceSignal: The confidence signal.
+    """
+    return validator_confidence(lambda text: output_parser.parse(text) is not None)
+
+
+@dataclass
+class TierStats:
+    """The counters of one model of a `CascadeLMInvoker`.
+
+    Attributes:
+        model_id (str): The model id.
+        calls (int): The number of requests sent to the model.
+        answers (int): The number of requests answered by the model.
+        escalations (int): The number of requests escalated from the model for a low confidence.
+        errors (int): The number of requests escalated from the model, or failed, for an error.
+        latency (float): The total seconds spent waiting for the model.
+        cost (float): The total cost of the model's calls, if its prices are known.
+    """
+
+    model_id: str
+    calls: int = 0
+    answers: int = 0
+    escalations: int = 0
+    errors: int = 0
+    latency: float = 0.0
+    cost: float = 0.0
+
+    @property
+    def escalation_rate(self) -> float:
+        """The share of the model's calls that escalated to the next model."""
+        return (self.escalations + self.errors) / self.calls if self.calls else 0.0
+
+
+@dataclass
+class CascadeStats:
+    """The counters of a `CascadeLMInvoker`.
+
+    Attributes:
+        requests (int): The number of invocations.
+        latency (float): The total seconds of the invocations, across all the models they tried.
+        tiers (list[TierStats]): The counters of each model, from the cheapest to the strongest.
+    """
+
+    requests: int = 0
+    latency: float = 0.0
+    tiers: list[TierStats] = field(default_factory=list)
+
+    @property
+    def escalation_rate(self) -> float:
+        """The share of invocations not answered by the cheapest model."""
+        return 1 - self.tiers[0].answers / self.requests if self.requests else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        """The mean seconds per invocation."""
+        return self.latency / self.requests if self.requests else 0.0
+
+    @property
+    def cost(self) -> float:
+        """The total cost of every model's calls, if their prices are known."""
+        return sum(tier.cost for tier in self.tiers)
+
+
+class CascadeLMInvoker:
+    """Invokes LM invokers from the cheapest to the strongest until an output is confident enough.
+
+    All other attributes are forwarded to the strongest invoker.
+
+    Streaming invocations (with an `event_emitter`) only stream the strongest model's tokens. A cheaper model's
+    accepted response is sent to the event emitter at once, since it is only known to be accepted once it is complete.
+    """
+
+    def __init__(
+        self,
+        lm_invokers: Sequence[Any],
+        confidence: Sequence[ConfidenceSignal],
+        threshold: float = 0.8,
+        model_ids: Sequence[str] | None = None,
+        prices: dict[str, tuple[float, float]] | None = None,
+    ):
+        """Initialize the cascade LM invoker.
+
+        Args:
+            lm_invokers (Sequence[Any]): The LM invokers, from the cheapest to the strongest.
+            confidence (Sequence[ConfidenceSignal]): The confidence signals. An output's confidence is its lowest
+                score, and signals that return None are ignored. An output that no signal scores escalates.
+            threshold (float, optional): The confidence below which a request escalates. Defaults to 0.8.
+            model_ids (Sequence[str] | None, optional): The model id of each invoker, for the stats and `prices`.
+                Defaults to None, in which case the invokers' `model_id` is used.
+            prices (dict[str, tuple[float, float]] | None, optional): The price of 1M input tokens and of 1M output
+                tokens of each model id, to compute the cost. Defaults to None.
+
+        Raises:
+            ValueError: If no LM invoker or no confidence signal is given.
+        """
+        if not lm_invokers:
+            raise ValueError("A cascade needs at least one LM invoker")
+        if not confidence:
+            raise ValueError("A cascade needs at least one confidence signal")
+
+        self.lm_invokers = list(lm_invokers)
+        self.confidence = list(confidence)
+        self.threshold = threshold
+        self.prices = prices or {}
+        if model_ids is None:
+            model_ids = [str(getattr(lm_invoker, "model_id", index)) for index, lm_invoker in enumerate(lm_invokers)]
+        self.stats = CascadeStats(tiers=[TierStats(model_id) for model_id in model_ids])
+
+    def score(self, output: Any) -> float:
+        """Return the confidence of an output: its lowest score, or 0 if no signal scores it.
+
+        Args:
+            output (Any): The LM output.
+
+        Returns:
+            float: The confidence between 0 and 1.
+        """
+        scores = [score for score in (signal(output) for signal in self.confidence) if score is not None]
+        if not scores:
+            # e.g. `logprob_confidence` with an invoker that does not return log probabilities
+            logger.warning("No confidence signal scored the output, so it is not confident")
+            return 0.0
+        return min(scores)
+
+    async def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the LM invokers from the cheapest to the strongest until an output is confident enough.
+
+        Args:
+            *args (Any): The positional arguments of the wrapped invokers' `invoke`.
+            **kwargs (Any): The keyword arguments of the wrapped invokers' `invoke`.
+
+        Returns:
+            Any: The first confident output, or the strongest model's output.
+
+        Raises:
+            Exception: The strongest model's error, if it fails.
+        """
+        self.stats.requests += 1
+        started_at = time.perf_counter()
+        event_emitter = kwargs.pop("event_emitter", None)
+        try:
+            last = len(self.lm_invokers) - 1
+            for index, (lm_invoker, tier) in enumerate(zip(self.lm_invokers, self.stats.tiers)):
+                tier.calls += 1
+                tier_started_at = time.perf_counter()
+                try:
+                    if index == last:
+                        output = await lm_invoker.invoke(*args, event_emitter=event_emitter, **kwargs)
+                    else:
+                        output = await lm_invoker.invoke(*args, **kwargs)
+                except Exception as error:
+                    tier.errors += 1
+                    if index == last:
+                        raise
+                    logger.warning("Escalating from %s after an error: %r", tier.model_id, error)
+                    continue
+                finally:
+                    tier.latency += time.perf_counter() - tier_started_at
+                tier.cost += self._cost(tier.model_id, output)
+
+                if index == last or self.score(output) >= self.threshold:
+                    tier.answers += 1
+                    if index < last and event_emitter is not None:
+                        await event_emitter.emit(_text(output), event_type=RESPONSE_EVENT_TYPE)
+                    return output
+                tier.escalations += 1
+        finally:
+            self.stats.latency += time.perf_counter() - started_at
+
+    def _cost(self, model_id: str, output: Any) -> float:
+        usage = getattr(output, "token_usage", None)
+        if usage is None or model_id not in self.prices:
+            return 0.0
+        input_price, output_price = self.prices[model_id]
+        input_cost = getattr(usage, "input_tokens", 0) * input_price
+        output_cost = getattr(usage, "output_tokens", 0) * output_price
+        return (input_cost + output_cost) / 1_000_000
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the strongest LM invoker."""
+        return getattr(self.lm_invokers[-1], name)
+
+
+def build_cascade_lm_invoker(
+    model_ids: Sequence[str],
+    confidence: Sequence[ConfidenceSignal],
+    threshold: float = 0.8,
+    prices: dict[str, tuple[float, float]] | None = None,
+    **kwargs: Any,
+) -> CascadeLMInvoker:
+    """Build a cascade LM invoker from model ids.
+
+    Args:
+        model_ids (Sequence[str]): The model ids, from the cheapest to the strongest, e.g. "openai/gpt-5-nano".
+        confidence (Sequence[ConfidenceSignal]): The confidence signals, e.g. `[logprob_confidence]` for invokers
+            that return log probabilities.
+        threshold (float, optional): The confidence below which a request escalates. Defaults to 0.8.
+        prices (dict[str, tuple[float, float]] | None, optional): The price of 1M input tokens and of 1M output
+            tokens of each model id. Defaults to None.
+        **kwargs (Any): The other arguments of `build_lm_invoker`, e.g. `config`, shared by every model.
+
+    Returns:
+        CascadeLMInvoker: The cascade LM invoker.
+    """
+    lm_invokers = [build_lm_invoker(model_id=model_id, **kwargs) for model_id in model_ids]
+    return CascadeLMInvoker(lm_invokers, confidence, threshold, model_ids, prices)
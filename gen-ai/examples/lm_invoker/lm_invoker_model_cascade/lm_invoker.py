@@ -0,0 +1,71 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_inference.model import OpenAILM
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.schema import ModelProvider
+
+from cascade import build_cascade_lm_invoker, validator_confidence
+
+load_dotenv()
+
+MODEL_IDS = [
+    f"{ModelProvider.OPENAI}/{OpenAILM.GPT_5_NANO}",
+    "openai/gpt-4.1-mini",
+    "openai/gpt-5",
+]
+PRICES = {  # USD per 1M input tokens and per 1M output tokens
+    MODEL_IDS[0]: (0.05, 0.40),
+    MODEL_IDS[1]: (0.40, 1.60),
+    MODEL_IDS[2]: (1.25, 10.00),
+}
+
+PROMPT = """Answer the question below. Output the answer in JSON format with "answer" and "confidence" as the keys,
+where "confidence" is your confidence between 0 and 1 that the answer is correct. For example:
+{{"answer": "Paris", "confidence": 0.98}}
+
+Question: {question}"""
+
+questions = [
+    "What is France's capital?",
+    "How many legs does a spider have?",
+    "What is 17 * 23?",
+    "Which element has the chemical symbol Fe?",
+    "What is the 12th Fibonacci number, counting from F(1) = 1?",
+    "How many distinct ways can 8 queens be placed on a chessboard so that none attack each other?",
+    "In which year did the Treaty of Westphalia end the Thirty Years' War?",
+    "What is the smallest positive integer that is the sum of two cubes in two different ways?",
+]
+
+
+json_output_parser = JSONOutputParser()
+
+
+def self_reported_confidence(response: str) -> float:
+    """Score the answer by the model's own confidence; an answer that is not valid JSON scores 0."""
+    return float(json_output_parser.parse(response)["confidence"])
+
+
+async def main():
+    lm_invoker = build_cascade_lm_invoker(
+        MODEL_IDS,
+        confidence=[validator_confidence(self_reported_confidence)],
+        threshold=0.9,
+        prices=PRICES,
+    )
+
+    responses = await asyncio.gather(
+        *(lm_invoker.invoke(PROMPT.format(question=question)) for question in questions)
+    )
+    print(f"Response: {responses[0]}")
+    print(f"Escalation rate: {lm_invoker.stats.escalation_rate:.0%}")
+    print(f"Mean latency: {lm_invoker.stats.mean_latency:.2f} seconds, cost: ${lm_invoker.stats.cost:.5f}")
+    for tier in lm_invoker.stats.tiers:
+        print(
+            f"{tier.model_id}: {tier.calls} calls, {tier.answers} answers, "
+            f"escalated {tier.escalation_rate:.0%}, ${tier.cost:.5f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_invoker
+from gllm_inference.model import OpenAILM
+from gllm_inference.schema import ModelProvider
+
+from rate_limiter import Priority, RateLimitedLMInvoker, governor_for
+
+load_dotenv()
+
+MODEL_ID = f"{ModelProvider.OPENAI}/{OpenAILM.GPT_5_NANO}"
+
+questions = [f"What is the capital of country number {i} in alphabetical order? Answer briefly." for i in range(1, 11)]
+evaluation_set = [f"Summarize the history of country number {i} in alphabetical order in one sentence." for i in range(1, 101)]
+
+
+async def main():
+    # Every invoker of the model shares the same governor, set to the quota of the account
+    governor = governor_for(
+        MODEL_ID,
+        requests_per_minute=500,
+        tokens_per_minute=200_000,
+        initial_concurrency=8,
+        latency_target=10.0,
+    )
+    lm_invoker = RateLimitedLMInvoker(build_lm_invoker(model_id=MODEL_ID), governor, max_output_tokens=256)
+    batch_lm_invoker = lm_invoker.with_priority(Priority.BATCH)
+
+    # A batch evaluation saturates the quota while users keep asking questions
+    evaluation = asyncio.gather(*(batch_lm_invoker.invoke(item) for item in evaluation_set))
+    await asyncio.sleep(1.0)
+    responses = await asyncio.gather(*(lm_invoker.invoke(question) for question in questions))
+    await evaluation
+
+    print(f"Response: {responses[0]}")
+    print(f"Concurrency limit: {governor.stats.concurrency:.1f}, rate limited responses: {governor.stats.rate_limited}")
+    for priority in Priority:
+        print(
+            f"{priority.name.lower()}: {governor.stats.requests[priority]} requests, "
+            f"mean wait {governor.stats.mean_wait(priority):.2f} seconds"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,353 @@
+"""Client-side rate limiting and adaptive concurrency for LM invokers.
+
+A `RateLimitGovernor` is shared by every invoker of a model (see `governor_for`) and admits requests when:
+- the requests per minute and tokens per minute token buckets hold enough capacity, and
+- fewer requests than the current concurrency limit are in flight.
+
+The concurrency limit adapts with AIMD (additive increase, multiplicative decrease): it grows by about one request
+per round trip while responses are fast, and is cut when the provider answers 429 or latencies exceed the target,
+at most once per `decrease_interval` so that a burst of 429s from the same round trip counts as one signal.
+A 429 also pauses the governor until the provider's retry delay (with jitter) has passed, so retries are paced by
+the buckets instead of hitting the provider all at once.
+
+Waiting callers are queued instead of failing: by priority class first (interactive before batch), then in arrival
+order. `RateLimitedLMInvoker` wraps an LM invoker to go through a governor.
+
+References:
+    [1] https://platform.openai.com/docs/guides/rate-limits
+    [2] https://en.wikipedia.org/wiki/Additive_increase/multiplicative_decrease
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+
+class Priority(IntEnum):
+    """The priority classes of the requests, served in this order."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class TokenBucket:
+    """A token bucket refilled continuously up to its per minute capacity."""
+
+    def __init__(self, per_minute: float):
+        """Initialize the token bucket, initially full.
+
+        Args:
+            per_minute (float): The capacity of the bucket, refilled every minute.
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Return the seconds until `amount` can be consumed, 0.0 if it can be consumed now."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Consume `amount`; a negative amount gives capacity back, and the level may go negative (a debt)."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class GovernorStats:
+    """The counters of a `RateLimitGovernor`.
+
+    Attributes:
+        requests (dict[Priority, int]): The number of admitted requests by priority.
+        wait_time (dict[Priority, float]): The total seconds admitted requests waited by priority.
+        rate_limited (int): The number of 429 responses.
+        concurrency (float): The current concurrency limit.
+    """
+
+    requests: dict[Priority, int] = field(default_factory=lambda: {priority: 0 for priority in Priority})
+    wait_time: dict[Priority, float] = field(default_factory=lambda: {priority: 0.0 for priority in Priority})
+    rate_limited: int = 0
+    concurrency: float = 0.0
+
+    def mean_wait(self, priority: Priority) -> float:
+        """The mean seconds requests of a priority waited before being admitted."""
+        return self.wait_time[priority] / self.requests[priority] if self.requests[priority] else 0.0
+
+
+class RateLimitGovernor:
+    """Admits requests to a model within its rate limits and an adaptive concurrency limit."""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float | None = None,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 256,
+        latency_target: float | None = None,
+        decrease_factor: float = 0.5,
+        latency_decrease_factor: float = 0.9,
+        decrease_interval: float = 1.0,
+        default_retry_after: float = 1.0,
+    ):
+        """Initialize the rate limit governor.
+
+        Args:
+            requests_per_minute (float): The requests per minute quota.
+            tokens_per_minute (float | None, optional): The tokens per minute quota. Defaults to None, in which
+                case tokens are not limited.
+            initial_concurrency (int, optional): The initial concurrency limit. Defaults to 8.
+            min_concurrency (int, optional): The lowest concurrency limit. Defaults to 1.
+            max_concurrency (int, optional): The highest concurrency limit. Defaults to 256.
+            latency_target (float | None, optional): The latency in seconds above which the concurrency limit is
+                decreased. Defaults to None, in which case only 429 responses decrease it.
+            decrease_factor (float, optional): The factor the concurrency limit is multiplied by on a 429.
+                Defaults to 0.5.
+            latency_decrease_factor (float, optional): The factor the concurrency limit is multiplied by when a
+                latency exceeds the target. Defaults to 0.9.
+            decrease_interval (float, optional): The minimum seconds between two decreases. Defaults to 1.0.
+            default_retry_after (float, optional): The seconds to pause after a 429 that does not say how long
+                to wait. Defaults to 1.0.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.latency_decrease_factor = latency_decrease_factor
+        self.decrease_interval = decrease_interval
+        self.default_retry_after = default_retry_after
+        self.stats = GovernorStats(concurrency=self.concurrency)
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = float("-inf")
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def acquire(self, tokens: float = 0.0, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait until a request may be sent. Every call must be followed by a call to `release`.
+
+        Args:
+            tokens (float, optional): The estimated tokens of the request. Defaults to 0.0.
+            priority (Priority, optional): The priority class of the request. Defaults to Priority.INTERACTIVE.
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), tokens, future))
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(tokens, used_tokens=0)  # admitted just before the cancellation, so never sent
+            raise
+
+        self.stats.requests[priority] += 1
+        self.stats.wait_time[priority] += time.monotonic() - queued_at
+
+    def release(
+        self,
+        estimated_tokens: float = 0.0,
+        used_tokens: float | None = None,
+        latency: float | None = None,
+        rate_limited: bool = False,
+        retry_after: float | None = None,
+    ) -> None:
+        """Report the outcome of an admitted request and adapt the concurrency limit.
+
+        Args:
+            estimated_tokens (float, optional): The tokens estimated on `acquire`. Defaults to 0.0.
+            used_tokens (float | None, optional): The tokens actually used, if known, to correct the estimate.
+                Defaults to None.
+            latency (float | None, optional): The seconds the request took, if it succeeded. Defaults to None,
+                in which case the concurrency limit is only adapted on a 429.
+            rate_limited (bool, optional): Whether the provider answered 429. Defaults to False.
+            retry_after (float | None, optional): The seconds the provider asked to wait. Defaults to None.
+        """
+        self.in_flight -= 1
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.consume(used_tokens - estimated_tokens)
+
+        if rate_limited:
+            self.stats.rate_limited += 1
+            self._decrease(self.decrease_factor)
+            delay = (retry_after or self.default_retry_after) * random.uniform(1.0, 1.5)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        elif latency is not None and self.latency_target is not None and latency > self.latency_target:
+            self._decrease(self.latency_decrease_factor)
+        elif latency is not None:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+        self.stats.concurrency = self.concurrency
+        self._dispatch()
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._decreased_at >= self.decrease_interval:
+            self.concurrency = max(self.min_concurrency, self.concurrency * factor)
+            self._decreased_at = now
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.cancelled():
+                heapq.heappop(self._waiters)
+                continue
+
+            if self.in_flight >= int(self.concurrency):
+                return  # resumed by `release`
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens) if self.tokens is not None else 0.0,
+            )
+            if wait > 0:
+                # Only the head of the queue waits for capacity, so callers are admitted one by one, in order
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            self.requests.consume(1)
+            if self.tokens is not None:
+                self.tokens.consume(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+
+_governors: dict[str, RateLimitGovernor] = {}
+
+
+def governor_for(model_id: str, **kwargs: Any) -> RateLimitGovernor:
+    """Return the governor shared by every invoker of a model, creating it on first use.
+
+    Args:
+        model_id (str): The model id, e.g. "openai/gpt-5-nano".
+        **kwargs (Any): The arguments of `RateLimitGovernor`, used when the governor is created.
+
+    Returns:
+        RateLimitGovernor: The shared governor.
+    """
+    if model_id not in _governors:
+        _governors[model_id] = RateLimitGovernor(**kwargs)
+    return _governors[model_id]
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return whether an error is a 429 response from the provider."""
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429 or "RateLimit" in type(error).__name__
+
+
+class RateLimitedLMInvoker:
+    """Wraps an LM invoker so that every invocation goes through a rate limit governor.
+
+    All other attributes are forwarded to the wrapped invoker, so it can be passed wherever the invoker is used,
+    e.g. as the `lm_invoker` of an `LMRequestProcessor`.
+    """
+
+    def __init__(
+        self,
+        lm_invoker: Any,
+        governor: RateLimitGovernor,
+        priority: Priority = Priority.INTERACTIVE,
+        max_output_tokens: int = 1024,
+        max_retries: int = 3,
+    ):
+        """Initialize the rate limited LM invoker.
+
+        Args:
+            lm_invoker (Any): The LM invoker to wrap.
+            governor (RateLimitGovernor): The governor, shared by every invoker of the model.
+            priority (Priority, optional): The priority class of the invocations. Defaults to
+                Priority.INTERACTIVE.
+            max_output_tokens (int, optional): The output tokens assumed when estimating the tokens of a request.
+                Defaults to 1024.
+            max_retries (int, optional): The number of times a rate limited invocation is queued again.
+                Defaults to 3.
+        """
+        self.lm_invoker = lm_invoker
+        self.governor = governor
+        self.priority = priority
+        self.max_output_tokens = max_output_tokens
+        self.max_retries = max_retries
+
+    def with_priority(self, priority: Priority) -> "RateLimitedLMInvoker":
+        """Return the same invoker, sharing the same governor, with another priority class."""
+        return RateLimitedLMInvoker(self.lm_invoker, self.governor, priority, self.max_output_tokens, self.max_retries)
+
+    def estimate_tokens(self, prompt: Any) -> int:
+        """Estimate the tokens of a request: about 4 characters per prompt token, plus the output tokens."""
+        return len(str(prompt)) // 4 + self.max_output_tokens
+
+    async def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the wrapped invoker once the governor admits the request, queueing again on 429.
+
+        Args:
+            prompt (Any): The prompt.
+            *args (Any): The other positional arguments of the wrapped invoker's `invoke`.
+            **kwargs (Any): The keyword arguments of the wrapped invoker's `invoke`.
+
+        Returns:
+            Any: The output of the wrapped invoker.
+
+        Raises:
+            Exception: The rate limit error, once the retries are exhausted, or any other error.
+        """
+        tokens = self.estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self.governor.acquire(tokens, self.priority)
+            started_at = time.monotonic()
+            try:
+                result = await self.lm_invoker.invoke(prompt, *args, **kwargs)
+            except Exception as error:
+                rate_limited = is_rate_limit_error(error)
+                self.governor.release(tokens, rate_limited=rate_limited, retry_after=_retry_after(error))
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+                continue
+            except BaseException:
+                self.governor.release(tokens)
+                raise
+
+            self.governor.release(tokens, self._used_tokens(result), time.monotonic() - started_at)
+            return result
+
+    @staticmethod
+    def _used_tokens(result: Any) -> int | None:
+        usage = getattr(result, "token_usage", None)
+        if usage is None:
+            return None
+        return getattr(usage, "input_tokens", 0) + getattr(usage, "output_tokens", 0)
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped invoker."""
+        return getattr(self.lm_invoker, name)
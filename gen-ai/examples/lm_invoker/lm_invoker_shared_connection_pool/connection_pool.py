@@ -0,0 +1,144 @@
+"""Shared HTTP connection pools for LM and EM invokers.
+
+Every invoker creates its own provider client, and every provider client owns its own HTTP connection pool, so a
+process holding an EM invoker and a few LM invokers for the same provider opens (and TLS handshakes) separate
+connections for each of them. `share_connection_pool` rebinds the provider clients found in the given invokers,
+request processors, routers, or synthesizers to one `httpx.AsyncClient` per provider endpoint, configured with a
+`ConnectionPoolConfig` (HTTP/2, connection limits, idle timeout).
+
+Provider clients that support `with_options(http_client=...)` are shared, e.g. the OpenAI and Anthropic clients,
+including OpenAI compatible endpoints. Each pool is built with the HTTP library of the provider client it serves
+(`httpx`, or a compatible fork), so clients using different libraries never share a pool.
+
+References:
+    [1] https://www.python-httpx.org/advanced/resource-limits/
+    [2] https://www.python-httpx.org/http2/
+"""
+
+import importlib
+from collections import Counter
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+_MAX_DEPTH = 4
+
+
+@dataclass(frozen=True)
+class ConnectionPoolConfig:
+    """The configuration of a shared connection pool.
+
+    Attributes:
+        http2 (bool): Whether to use HTTP/2, which multiplexes concurrent requests over a single connection.
+        max_connections (int): The maximum number of open connections per endpoint.
+        max_keepalive_connections (int): The maximum number of idle connections kept alive per endpoint.
+        keepalive_expiry (float): The seconds after which an idle connection is closed.
+        connect_timeout (float): The seconds allowed to open a connection. Read timeouts are still set by the
+            provider client on every request.
+    """
+
+    http2: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+
+
+_pools: dict[tuple[str, ConnectionPoolConfig, str], Any] = {}
+
+
+def _endpoint(base_url: Any) -> str:
+    url = urlsplit(str(base_url))
+    return f"{url.scheme}://{url.netloc}"
+
+
+def connection_pool(
+    base_url: str, config: ConnectionPoolConfig | None = None, http_library: ModuleType = httpx
+) -> httpx.AsyncClient:
+    """Return the shared HTTP client for an endpoint, creating it on first use.
+
+    Args:
+        base_url (str): Any URL of the endpoint; clients are shared per scheme, host, and port.
+        config (ConnectionPoolConfig | None, optional): The pool configuration. Defaults to None, in which case
+            the default configuration is used.
+        http_library (ModuleType, optional): The httpx compatible library to build the client with.
+            Defaults to `httpx`.
+
+    Returns:
+        httpx.AsyncClient: The shared HTTP client.
+    """
+    config = config or ConnectionPoolConfig()
+    key = (_endpoint(base_url), config, http_library.__name__)
+    if key not in _pools or _pools[key].is_closed:
+        _pools[key] = http_library.AsyncClient(
+            http2=config.http2,
+            limits=http_library.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=http_library.Timeout(None, connect=config.connect_timeout),
+        )
+    return _pools[key]
+
+
+def _http_library(http_client: Any) -> ModuleType:
+    # Provider SDKs may subclass the client, so look for the library's own `AsyncClient` in the class hierarchy
+    for cls in type(http_client).__mro__:
+        if cls.__name__ == "AsyncClient":
+            return importlib.import_module(cls.__module__.partition(".")[0])
+    return httpx
+
+
+def _is_provider_client(value: Any) -> bool:
+    return hasattr(value, "with_options") and hasattr(value, "base_url") and hasattr(value, "_client")
+
+
+def _share(obj: Any, config: ConnectionPoolConfig, shared: Counter, seen: set[int], depth: int) -> None:
+    if depth > _MAX_DEPTH or id(obj) in seen or not hasattr(obj, "__dict__"):
+        return
+
+    seen.add(id(obj))
+    for name, value in list(vars(obj).items()):
+        if _is_provider_client(value):
+            pool = connection_pool(str(value.base_url), config, _http_library(value._client))
+            if value._client is not pool:
+                setattr(obj, name, value.with_options(http_client=pool))
+            shared[_endpoint(value.base_url)] += 1
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                _share(item, config, shared, seen, depth + 1)
+        else:
+            _share(value, config, shared, seen, depth + 1)
+
+
+def share_connection_pool(*objects: Any, config: ConnectionPoolConfig | None = None) -> dict[str, int]:
+    """Make the provider clients of the given objects use the shared connection pool of their endpoint.
+
+    The objects are searched for provider clients a few levels deep, so an invoker can be passed directly or
+    through the component using it, e.g. an `LMRequestProcessor`, a router, or a response synthesizer.
+
+    Args:
+        *objects (Any): The invokers, or the components holding them.
+        config (ConnectionPoolConfig | None, optional): The pool configuration. Defaults to None, in which case
+            the default configuration is used.
+
+    Returns:
+        dict[str, int]: The number of provider clients sharing a pool, by endpoint.
+    """
+    config = config or ConnectionPoolConfig()
+    shared: Counter = Counter()
+    seen: set[int] = set()
+    for obj in objects:
+        _share(obj, config, shared, seen, depth=0)
+    return dict(shared)
+
+
+async def close_connection_pools() -> None:
+    """Close every shared connection pool, e.g. when the application shuts down."""
+    for client in _pools.values():
+        await client.aclose()
+    _pools.clear()
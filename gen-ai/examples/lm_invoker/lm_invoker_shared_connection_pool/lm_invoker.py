@@ -0,0 +1,48 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_invoker, build_lm_request_processor
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+
+from connection_pool import ConnectionPoolConfig, close_connection_pools, share_connection_pool
+
+load_dotenv()
+
+questions = [f"What is the capital of country number {i} in alphabetical order? Answer briefly." for i in range(1, 21)]
+
+
+async def main():
+    # The same invokers as a semantic routing RAG pipeline: one EM invoker and two LM invokers for the same provider
+    em_invoker = OpenAIEMInvoker("text-embedding-3-small")
+    lm_invoker = build_lm_invoker(model_id=os.getenv("LANGUAGE_MODEL"))
+    lm_request_processor = build_lm_request_processor(
+        model_id=os.getenv("LANGUAGE_MODEL"),
+        credentials=os.getenv("OPENAI_API_KEY"),
+        system_template="You are a helpful assistant that answers general knowledge questions.",
+        user_template="{query}",
+    )
+
+    shared = share_connection_pool(
+        em_invoker,
+        lm_invoker,
+        lm_request_processor,
+        config=ConnectionPoolConfig(http2=True, max_connections=50, keepalive_expiry=30.0),
+    )
+    for endpoint, clients in shared.items():
+        print(f"{clients} provider clients share the connection pool of {endpoint}")
+
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        em_invoker.invoke(questions),
+        *(lm_invoker.invoke(question) for question in questions[:10]),
+        *(lm_request_processor.process(query=question) for question in questions[10:]),
+    )
+    print(f"Answered {len(questions)} questions in {time.perf_counter() - started_at:.2f} seconds")
+
+    await close_connection_pools()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,432 @@
+"""Batch API mode for offline LM workloads.
+
+Bulk jobs, such as evaluation runs or bulk query rewriting, do not need an answer within seconds. Provider batch
+APIs run such requests within hours, at half the price and outside of the per-minute rate limits. `BatchLMInvoker`
+keeps the usual `invoke` interface: every call adds its request to a pending batch and waits for its own result. The
+pending batch is submitted once it is full or `flush_interval` seconds after its first request, then polled until it
+completes, and each result is mapped back to the call that is waiting for it.
+
+A `BatchLMInvoker` is passed as the `lm_invoker` of an `LMRequestProcessor`, whose processing is left as it is.
+
+The provider protocol sits behind `BatchProvider`. `OpenAIBatchProvider` uses the OpenAI Batch API, and
+`LocalBatchProvider` answers the batches locally with a handler, e.g. to test a batch job without a provider.
+
+References:
+    [1] https://platform.openai.com/docs/guides/batch
+    [2] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from gllm_inference.schema import LMOutput, TokenUsage
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+RESPONSE_EVENT_TYPE = "response"
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchError(RuntimeError):
+    """Raised for a request whose batch did not return a result for it."""
+
+
+class BatchProvider(ABC):
+    """The protocol of a provider batch API.
+
+    A batch is a list of request lines, each with a `custom_id`, the `method` and `url` of the endpoint, and the request
+    `body`. Its results are lines with the same `custom_id`, and either a `response` with a `status_code` and a `body`,
+    or an `error`.
+    """
+
+    @abstractmethod
+    async def submit(self, requests: list[dict[str, Any]]) -> str:
+        """Submit a batch.
+
+        Args:
+            requests (list[dict[str, Any]]): The request lines.
+
+        Returns:
+            str: The batch id.
+        """
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """Return the status of a batch, which is one of `TERMINAL_STATUSES` once the batch is over.
+
+        Args:
+            batch_id (str): The batch id.
+
+        Returns:
+            str: The status.
+        """
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> list[dict[str, Any]]:
+        """Return the result lines of a batch that is over.
+
+        Args:
+            batch_id (str): The batch id.
+
+        Returns:
+            list[dict[str, Any]]: The result lines, in any order. Requests without a result are missing.
+        """
+
+    async def cancel(self, batch_id: str) -> None:
+        """Cancel a batch. Does nothing by default.
+
+        Args:
+            batch_id (str): The batch id.
+        """
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """Submits batches to the OpenAI Batch API."""
+
+    def __init__(self, client: Any | None = None, completion_window: str = "24h"):
+        """Initialize the OpenAI batch provider.
+
+        Args:
+            client (Any | None, optional): The `openai.AsyncOpenAI` client. Defaults to None, in which case a client
+                reading the `OPENAI_API_KEY` environment variable is used.
+            completion_window (str, optional): The time frame within which the batch is processed. Defaults to "24h".
+        """
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI()
+        self.client = client
+        self.completion_window = completion_window
+
+    async def submit(self, requests: list[dict[str, Any]]) -> str:
+        """Upload the request lines as a JSONL file and create a batch from it."""
+        payload = "\n".join(json.dumps(request) for request in requests).encode()
+        input_file = await self.client.files.create(file=("batch.jsonl", payload), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        """Return the status of the batch."""
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status
+
+    async def results(self, batch_id: str) -> list[dict[str, Any]]:
+        """Download the output and error files of the batch."""
+        batch = await self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                lines.extend(json.loads(line) for line in content.text.splitlines() if line.strip())
+        return lines
+
+    async def cancel(self, batch_id: str) -> None:
+        """Cancel the batch."""
+        await self.client.batches.cancel(batch_id)
+
+
+class LocalBatchProvider(BatchProvider):
+    """Answers batches locally with a handler, standing in for a provider batch API."""
+
+    def __init__(self, handler: Callable[[dict[str, Any]], Any], delay: float = 0.0):
+        """Initialize the local batch provider.
+
+        Args:
+            handler (Callable[[dict[str, Any]], Any]): Answers the body of a request, synchronously or asynchronously,
+                with a chat completion body, or with the response text. An exception fails the request.
+            delay (float, optional): The seconds it takes a batch to complete. Defaults to 0.0.
+        """
+        self.handler = handler
+        self.delay = delay
+        self.submitted: list[list[dict[str, Any]]] = []
+        self._batches: dict[str, asyncio.Task] = {}
+
+    async def submit(self, requests: list[dict[str, Any]]) -> str:
+        """Start answering the batch in the background."""
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self.submitted.append(requests)
+        self._batches[batch_id] = asyncio.create_task(self._answer(requests))
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        """Return whether the batch is completed, cancelled, or still in progress."""
+        task = self._batches[batch_id]
+        if not task.done():
+            return "in_progress"
+        return "cancelled" if task.cancelled() else "completed"
+
+    async def results(self, batch_id: str) -> list[dict[str, Any]]:
+        """Return the answers of the batch."""
+        task = self._batches.pop(batch_id)
+        return [] if task.cancelled() else task.result()
+
+    async def cancel(self, batch_id: str) -> None:
+        """Stop answering the batch."""
+        self._batches[batch_id].cancel()
+
+    async def _answer(self, requests: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        await asyncio.sleep(self.delay)
+        return [await self._answer_one(request) for request in requests]
+
+    async def _answer_one(self, request: dict[str, Any]) -> dict[str, Any]:
+        try:
+            body = self.handler(request["body"])
+            if inspect.isawaitable(body):
+                body = await body
+        except Exception as error:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(error)}}
+
+        if isinstance(body, str):
+            body = {
+                "choices": [{"message": {"role": "assistant", "content": body}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+            }
+        return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+
+
+@dataclass
+class BatchStats:
+    """The counters of a `BatchLMInvoker`.
+
+    Attributes:
+        requests (int): The number of requests.
+        batches (int): The number of batches submitted.
+        succeeded (int): The number of requests answered.
+        failed (int): The number of requests that failed, or got no result.
+        input_tokens (int): The input tokens of the answered requests.
+        output_tokens (int): The output tokens of the answered requests.
+        wait (float): The total seconds from the submission of each batch to its end.
+    """
+
+    requests: int = 0
+    batches: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    wait: float = 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        """The mean number of requests per batch."""
+        return self.requests / self.batches if self.batches else 0.0
+
+
+def _chat_messages(prompt: Any) -> list[dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+
+    messages = []
+    for message in prompt:
+        if isinstance(message, tuple):
+            role, contents = message
+        else:
+            role, contents = message.role, getattr(message, "contents", getattr(message, "content", None))
+        if not isinstance(contents, list):
+            contents = [contents]
+        if not all(isinstance(content, str) for content in contents):
+            raise ValueError("Only text prompts can be sent in a batch")
+        messages.append({"role": str(getattr(role, "value", role)), "content": "\n".join(contents)})
+    return messages
+
+
+def _lm_output(line: dict[str, Any]) -> LMOutput:
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or body.get("error") or {}
+        raise BatchError(f"The batch request failed: {error.get('message', error)}")
+
+    usage = body.get("usage") or {}
+    return LMOutput(
+        response=body["choices"][0]["message"]["content"] or "",
+        token_usage=TokenUsage(
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+        ),
+    )
+
+
+class BatchLMInvoker:
+    """An LM invoker that sends its requests through a provider batch API.
+
+    It is passed as the `lm_invoker` of an `LMRequestProcessor`. Streaming invocations (with an `event_emitter`)
+    receive the whole response at once, when its batch completes.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        provider: BatchProvider | None = None,
+        default_hyperparameters: dict[str, Any] | None = None,
+        max_batch_size: int = 50_000,
+        max_batch_bytes: int = 190_000_000,
+        flush_interval: float = 60.0,
+        poll_interval: float = 30.0,
+    ):
+        """Initialize the batch LM invoker.
+
+        Args:
+            model_name (str): The model name, e.g. "gpt-4.1-mini".
+            provider (BatchProvider | None, optional): The batch API. Defaults to None, in which case
+                `OpenAIBatchProvider` is used.
+            default_hyperparameters (dict[str, Any] | None, optional): The hyperparameters of every request, e.g.
+                `temperature`. Defaults to None.
+            max_batch_size (int, optional): The maximum number of requests per batch. Defaults to 50,000, the limit
+                of the OpenAI Batch API.
+            max_batch_bytes (int, optional): The maximum size of a batch file. Defaults to 190,000,000, below the
+                200 MB limit of the OpenAI Batch API.
+            flush_interval (float, optional): The seconds to wait for more requests after the first request of a
+                batch, before submitting it. Defaults to 60.0.
+            poll_interval (float, optional): The seconds between two status checks of a submitted batch.
+                Defaults to 30.0.
+        """
+        self.model_name = model_name
+        self.provider = provider or OpenAIBatchProvider()
+        self.default_hyperparameters = default_hyperparameters or {}
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.stats = BatchStats()
+        self._pending: list[tuple[dict[str, Any], asyncio.Future]] = []
+        self._pending_bytes = 0
+        self._flush_timer: asyncio.Task | None = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def invoke(
+        self,
+        prompt: Any,
+        hyperparameters: dict[str, Any] | None = None,
+        event_emitter: Any | None = None,
+        **kwargs: Any,
+    ) -> LMOutput:
+        """Add a request to the pending batch and wait for its result.
+
+        Args:
+            prompt (Any): The prompt: a text, or the text messages made by a prompt builder.
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request. Defaults to None.
+            event_emitter (Any | None, optional): The event emitter to send the response to. Defaults to None.
+            **kwargs (Any): Other arguments, ignored.
+
+        Returns:
+            LMOutput: The output of the request.
+
+        Raises:
+            ValueError: If the prompt is not only text.
+            BatchError: If the batch did not return a result for the request.
+        """
+        request = {
+            "custom_id": uuid.uuid4().hex,
+            "method": "POST",
+            "url": CHAT_COMPLETIONS_ENDPOINT,
+            "body": {
+                "model": self.model_name,
+                "messages": _chat_messages(prompt),
+                **self.default_hyperparameters,
+                **(hyperparameters or {}),
+            },
+        }
+        size = len(json.dumps(request)) + 1
+        if self._pending and self._pending_bytes + size > self.max_batch_bytes:
+            await self.flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+        self._pending_bytes += size
+        self.stats.requests += 1
+        if len(self._pending) >= self.max_batch_size:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+
+        output = await future
+        if event_emitter is not None:
+            await event_emitter.emit(output.response, event_type=RESPONSE_EVENT_TYPE)
+        return output
+
+    async def flush(self) -> None:
+        """Submit the pending batch now, without waiting for `flush_interval`."""
+        if self._flush_timer is not None and self._flush_timer is not asyncio.current_task():
+            self._flush_timer.cancel()
+        self._flush_timer = None
+        if not self._pending:
+            return
+
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        try:
+            batch_id = await self.provider.submit([request for request, _ in pending])
+        except Exception as error:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            self.stats.failed += len(pending)
+            return
+
+        self.stats.batches += 1
+        logger.info("Submitted batch %s with %d requests", batch_id, len(pending))
+        task = asyncio.create_task(self._track(batch_id, pending))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def join(self) -> None:
+        """Submit the pending batch and wait until every submitted batch is over."""
+        await self.flush()
+        while self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def _track(self, batch_id: str, pending: list[tuple[dict[str, Any], asyncio.Future]]) -> None:
+        submitted_at = time.perf_counter()
+        futures = {request["custom_id"]: future for request, future in pending}
+        cancelled = False
+        try:
+            while (status := await self.provider.status(batch_id)) not in TERMINAL_STATUSES:
+                if not cancelled and all(future.done() for future in futures.values()):
+                    logger.info("Cancelling batch %s, since nobody waits for it anymore", batch_id)
+                    await self.provider.cancel(batch_id)
+                    cancelled = True
+                await asyncio.sleep(self.poll_interval)
+            logger.info("Batch %s is %s", batch_id, status)
+            lines = await self.provider.results(batch_id)
+        except Exception as error:
+            lines, status = [], repr(error)
+            logger.warning("Lost track of batch %s: %r", batch_id, error)
+        finally:
+            self.stats.wait += time.perf_counter() - submitted_at
+
+        for line in lines:
+            future = futures.pop(line.get("custom_id"), None)
+            try:
+                output = _lm_output(line)
+            except Exception as error:
+                self.stats.failed += 1
+                if future is not None and not future.done():
+                    future.set_exception(error)
+                continue
+            self.stats.succeeded += 1
+            self.stats.input_tokens += output.token_usage.input_tokens
+            self.stats.output_tokens += output.token_usage.output_tokens
+            if future is not None and not future.done():
+                future.set_result(output)
+
+        for future in futures.values():
+            self.stats.failed += 1
+            if not future.done():
+                future.set_exception(BatchError(f"Batch {batch_id} returned no result for the request: {status}"))
+
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+
+from batch import BatchLMInvoker
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+
+lm_invoker = BatchLMInvoker(
+    "gpt-4.1-mini",
+    flush_interval=5.0,  # submit the batch 5 seconds after its first request
+    poll_interval=60.0,  # batches take minutes to hours, so check them every minute
+)
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(
+        system_template="Rewrite the search query to be specific and self-contained. Output only the rewritten query.",
+        user_template="{query}",
+    ),
+    lm_invoker=lm_invoker,
+)
+
+queries = [
+    "cheap flights tokyo",
+    "python list sort desc",
+    "best laptop for ml under 1500",
+    "how long boil egg",
+    "symptoms of low vitamin d",
+    "fix git detached head",
+    "vegan protein sources cheap",
+    "what is rag llm",
+]
+
+
+async def main():
+    # Every request waits in the same batch, and gets its own result once the batch completes
+    rewritten_queries = await asyncio.gather(*(lmrp.process(query=query) for query in queries))
+    for query, rewritten_query in zip(queries, rewritten_queries):
+        print(f"{query} -> {rewritten_query}")
+
+    stats = lm_invoker.stats
+    print(f"Requests: {stats.requests}, batches: {stats.batches}, succeeded: {stats.succeeded}, failed: {stats.failed}")
+    print(f"Tokens: {stats.input_tokens} input, {stats.output_tokens} output, waited {stats.wait / 60:.1f} minutes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
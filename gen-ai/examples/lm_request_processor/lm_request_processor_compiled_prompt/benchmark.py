@@ -0,0 +1,92 @@
+"""Microbenchmark of prompt rendering: `PromptBuilder` against `CompiledPromptBuilder`.
+
+Each case renders the prompt messages of a representative template many times and reports the median time per
+render, measured with `timeit` over several rounds.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --number 20000 --repeat 7
+"""
+
+import argparse
+import statistics
+import timeit
+
+from gllm_inference.prompt_builder import PromptBuilder
+
+from compiled_prompt import CompiledPromptBuilder
+
+ROUTER_TEMPLATE = """
+Based on the following user query, determine if it is a deep research query or a normal query.
+
+- **normal**: Casual greetings, small talk, or simple conversational queries that do not require
+  in-depth research. Examples: "hello", "how are you", "what's the weather", "thanks", "goodbye".
+
+- **deep_research**: Queries that require comprehensive research, multi-source analysis, or
+  in-depth exploration of a topic. Examples: "research the latest AI trends", "compare X vs Y",
+  "analyze the market for...", "what are the pros and cons of...".
+
+Output the answer in JSON format with "route" as the key. For example:
+{{"route": "deep_research"}} or {{"route": "normal"}}
+
+Query: {text}
+"""
+
+CHUNK_COUNT = 20
+CHUNK_TEMPLATE = "".join(
+    f"[Document {index}] (source: {{source_{index}}}, score: {{score_{index}:.3f}})\n{{chunk_{index}}}\n\n"
+    for index in range(CHUNK_COUNT)
+)
+STUFF_SYSTEM_TEMPLATE = (
+    "You are a helpful assistant. Answer the question using only the documents below. "
+    'Cite documents as {{"document": <index>}}. If the documents do not contain the answer, say so.\n\n'
+    + CHUNK_TEMPLATE
+)
+STUFF_USER_TEMPLATE = "Question: {query}\nAnswer in {language}, in at most {max_sentences} sentences."
+
+STUFF_VALUES = {
+    "query": "Give me nocturnal creatures from the dataset",
+    "language": "English",
+    "max_sentences": 5,
+    **{f"chunk_{index}": "The owl is a nocturnal bird of prey with silent flight. " * 8 for index in range(CHUNK_COUNT)},
+    **{f"source_{index}": f"animals.csv#row-{index}" for index in range(CHUNK_COUNT)},
+    **{f"score_{index}": 1 / (index + 1) for index in range(CHUNK_COUNT)},
+}
+
+CASES = {
+    "router (1 variable, static system)": (
+        {"system_template": "You are a query router.", "user_template": ROUTER_TEMPLATE},
+        {"text": "research about the latest trends in AI"},
+    ),
+    f"chunk stuffing ({len(STUFF_VALUES)} variables)": (
+        {"system_template": STUFF_SYSTEM_TEMPLATE, "user_template": STUFF_USER_TEMPLATE},
+        STUFF_VALUES,
+    ),
+}
+
+
+def measure(function, number: int, repeat: int) -> float:
+    """Return the median microseconds per call of `function`."""
+    rounds = timeit.repeat(function, number=number, repeat=repeat)
+    return statistics.median(rounds) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10000, help="Renders per round")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds")
+    args = parser.parse_args()
+
+    print(f"{'case':<36} {'PromptBuilder':>14} {'Compiled':>10} {'speedup':>8}")
+    for name, (templates, values) in CASES.items():
+        prompt_builder = PromptBuilder(**templates)
+        compiled_prompt_builder = CompiledPromptBuilder(**templates, expected_variables=set(values))
+        assert compiled_prompt_builder.format(**values) == prompt_builder.format(**values)
+
+        baseline = measure(lambda: prompt_builder.format(**values), args.number, args.repeat)
+        compiled = measure(lambda: compiled_prompt_builder.format(**values), args.number, args.repeat)
+        print(f"{name:<36} {baseline:>12.2f}us {compiled:>8.2f}us {baseline / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Prompt templates parsed once and rendered by concatenation.
+
+`CompiledTemplate` parses a `str.format` style template once, when it is created: escaped braces (`{{` and `}}`)
+become literal text, and every `{variable}` becomes a slot. Rendering fills the slots and joins the pieces, without
+parsing the template again. Malformed templates fail when they are compiled, and missing variables are all reported
+at once.
+
+`CompiledPromptBuilder` is a `PromptBuilder` whose system and user templates are compiled. It checks the variables
+of the templates against the expected ones when it is built, and renders a system template without variables only
+once.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor
+    [2] https://docs.python.org/3/library/string.html#format-string-syntax
+"""
+
+import string
+from typing import Any
+
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.schema import Message
+
+_CONVERSIONS = {"s": str, "r": repr, "a": ascii}
+
+
+class CompiledTemplate:
+    """A `str.format` style template parsed into literal pieces and variable slots."""
+
+    def __init__(self, template: str):
+        """Compile the template.
+
+        Args:
+            template (str): The template, e.g. "Query: {query}". Format specs and conversions such as "{score:.2f}"
+                are supported.
+
+        Raises:
+            ValueError: If the template is malformed, e.g. has an unmatched brace, or uses a positional field.
+        """
+        self.template = template
+        self._pieces: list[str | None] = []
+        self._slots: list[tuple[int, str, str, str | None]] = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as error:
+            raise ValueError(f"Invalid template {template[:50]!r}: {error}") from error
+
+        for literal, field_name, format_spec, conversion in parsed:
+            if literal:
+                self._pieces.append(literal)
+            if field_name is None:
+                continue
+            if not field_name.isidentifier():
+                raise ValueError(f"Invalid template {template[:50]!r}: only named variables are supported")
+
+            self._slots.append((len(self._pieces), field_name, format_spec or "", conversion))
+            self._pieces.append(None)
+
+        self.variables = frozenset(name for _, name, _, _ in self._slots)
+        self._static = "".join(self._pieces) if not self._slots else None
+
+    @property
+    def is_static(self) -> bool:
+        """Whether the template has no variables, in which case it always renders to the same text."""
+        return self._static is not None
+
+    def render(self, values: dict[str, Any]) -> str:
+        """Render the template.
+
+        Args:
+            values (dict[str, Any]): The value of every variable. Extra values are ignored.
+
+        Returns:
+            str: The rendered text.
+
+        Raises:
+            KeyError: If variables are missing, listing all of them.
+        """
+        if self._static is not None:
+            return self._static
+
+        pieces = self._pieces.copy()
+        try:
+            for index, name, format_spec, conversion in self._slots:
+                value = values[name]
+                if conversion is not None:
+                    value = _CONVERSIONS[conversion](value)
+                pieces[index] = format(value, format_spec) if format_spec else str(value)
+        except KeyError:
+            raise KeyError(f"Missing prompt variables: {sorted(self.variables - values.keys())}") from None
+        return "".join(pieces)
+
+
+class CompiledPromptBuilder(PromptBuilder):
+    """A prompt builder whose templates are compiled once, when it is built."""
+
+    def __init__(
+        self,
+        system_template: str = "",
+        user_template: str = "",
+        expected_variables: set[str] | None = None,
+        **kwargs: Any,
+    ):
+        """Initialize the compiled prompt builder.
+
+        Args:
+            system_template (str, optional): The system template. Defaults to "".
+            user_template (str, optional): The user template. Defaults to "".
+            expected_variables (set[str] | None, optional): The variables the templates must use. Defaults to None,
+                in which case the variables are not checked at build time.
+            **kwargs (Any): The other arguments of `PromptBuilder`.
+
+        Raises:
+            ValueError: If a template is malformed, or the variables differ from `expected_variables`.
+        """
+        super().__init__(system_template=system_template, user_template=user_template, **kwargs)
+        self.compiled_system_template = CompiledTemplate(system_template)
+        self.compiled_user_template = CompiledTemplate(user_template)
+        self.variables = self.compiled_system_template.variables | self.compiled_user_template.variables
+        if expected_variables is not None and self.variables != expected_variables:
+            raise ValueError(
+                f"The templates use the variables {sorted(self.variables)}, expected {sorted(expected_variables)}"
+            )
+
+        self._system_message = (
+            Message.system(self.compiled_system_template.render({}))
+            if system_template and self.compiled_system_template.is_static
+            else None
+        )
+
+    def format(
+        self, history: list[Message] | None = None, extra_contents: list[Any] | None = None, **kwargs: Any
+    ) -> list[Message]:
+        """Render the prompt messages.
+
+        Args:
+            history (list[Message] | None, optional): The conversation history, placed between the system and the
+                user message. Defaults to None.
+            extra_contents (list[Any] | None, optional): Extra contents of the user message, e.g. attachments.
+                Defaults to None.
+            **kwargs (Any): The values of the template variables.
+
+        Returns:
+            list[Message]: The system message, if any, the history, and the user message.
+
+        Raises:
+            KeyError: If variables are missing, listing all of them.
+        """
+        missing = self.variables - kwargs.keys()
+        if missing:
+            raise KeyError(f"Missing prompt variables: {sorted(missing)}")
+
+        messages = []
+        if self._system_message is not None:
+            messages.append(self._system_message)
+        elif self.compiled_system_template.template:
+            messages.append(Message.system(self.compiled_system_template.render(kwargs)))
+
+        messages.extend(history or [])
+        user_text = self.compiled_user_template.render(kwargs)
+        messages.append(Message.user([user_text, *extra_contents] if extra_contents else user_text))
+        return messages
@@ -0,0 +1,38 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_inference.lm_invoker.openai_lm_invoker import OpenAILMInvoker
+from gllm_inference.output_parser.json_output_parser import JSONOutputParser
+from gllm_inference.request_processor import LMRequestProcessor
+
+from compiled_prompt import CompiledPromptBuilder
+
+load_dotenv()
+
+
+# The templates are parsed, and their variables checked, once here rather than on every request
+lmrp = LMRequestProcessor(
+    prompt_builder=CompiledPromptBuilder(
+        system_template="You are a query router.",
+        user_template="""
+        Based on the following user query, determine if it is a deep research query or a normal query.
+
+        Output the answer in JSON format with "route" as the key. For example:
+        {{"route": "deep_research"}} or {{"route": "normal"}}
+
+        Query: {text}
+        """,
+        expected_variables={"text"},
+    ),
+    lm_invoker=OpenAILMInvoker(model_name="gpt-4o-mini"),
+    output_parser=JSONOutputParser(),
+)
+
+
+async def main():
+    response = await lmrp.process(text="research about the latest trends in AI and machine learning")
+    print(f"Route: {response['route']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
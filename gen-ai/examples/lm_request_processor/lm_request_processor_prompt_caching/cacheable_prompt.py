@@ -0,0 +1,187 @@
+"""Prefix-stable prompt layout and prompt cache telemetry.
+
+Providers cache the longest prefix a prompt shares with a recent prompt, and bill the cached input tokens at a
+fraction of the price, with a lower latency. Only a byte-identical prefix is cached, so a system template such as
+"... Context: {context}" makes every prompt unique from its first variable on.
+
+`CacheablePromptBuilder` is a `PromptBuilder` with an explicit cacheable prefix: static text, such as instructions,
+examples, or reference documents, that is always emitted first and verbatim. The rendered system template follows it
+in the same system message, then the history and the user message, so the variable contents only ever come after the
+prefix.
+
+`PromptCacheLMInvoker` wraps an LM invoker to read the cached input tokens of every call from the usage of its
+`LMOutput`, log them, and aggregate them in `stats`, to verify and maximize the cache hit rate. It is used as the
+`lm_invoker` of an `LMRequestProcessor`, whose processing is left as it is.
+
+References:
+    [1] https://platform.openai.com/docs/guides/prompt-caching
+    [2] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.schema import Message
+
+logger = logging.getLogger(__name__)
+
+PREFIX_SEPARATOR = "\n\n"
+# The usage fields that hold the cached input tokens, across providers and SDK versions
+_CACHED_TOKENS_FIELDS = ("cached_tokens", "cache_read_tokens", "cache_read_input_tokens", "cached_input_tokens")
+_DETAILS_FIELDS = ("input_token_details", "prompt_tokens_details")
+
+
+def _field(value: Any, name: str) -> Any:
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def cached_tokens(lm_output: Any) -> int:
+    """Return the cached input tokens of an LM output.
+
+    Args:
+        lm_output (Any): The LM output, whose `token_usage` reports the cached input tokens directly or in its input
+            token details.
+
+    Returns:
+        int: The cached input tokens, or 0 if the usage does not report them.
+    """
+    usage = _field(lm_output, "token_usage")
+    if usage is None:
+        return 0
+    for source in (usage, *(_field(usage, name) for name in _DETAILS_FIELDS)):
+        if source is None:
+            continue
+        for name in _CACHED_TOKENS_FIELDS:
+            value = _field(source, name)
+            if value is not None:
+                return int(value)
+    return 0
+
+
+@dataclass
+class PromptCacheStats:
+    """The prompt cache counters of a `PromptCacheLMInvoker`.
+
+    Attributes:
+        requests (int): The number of LM calls.
+        hits (int): The number of LM calls with cached input tokens.
+        input_tokens (int): The input tokens of every LM call, cached or not.
+        cached_tokens (int): The cached input tokens of every LM call.
+    """
+
+    requests: int = 0
+    hits: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of LM calls with cached input tokens."""
+        return self.hits / self.requests if self.requests else 0.0
+
+    @property
+    def cached_token_ratio(self) -> float:
+        """The share of input tokens that were cached."""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def record(self, input_tokens: int, cached_tokens: int) -> None:
+        """Record the usage of an LM call.
+
+        Args:
+            input_tokens (int): The input tokens of the call.
+            cached_tokens (int): The cached input tokens of the call.
+        """
+        self.requests += 1
+        self.hits += cached_tokens > 0
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+
+
+class CacheablePromptBuilder(PromptBuilder):
+    """A prompt builder whose prompts all start with the same cacheable prefix."""
+
+    def __init__(self, cacheable_prefix: str, system_template: str = "", user_template: str = "", **kwargs: Any):
+        """Initialize the cacheable prompt builder.
+
+        Args:
+            cacheable_prefix (str): The static start of the system message, used verbatim: it is not a template, so
+                its braces are kept as they are.
+            system_template (str, optional): The system template, rendered after the prefix. Defaults to "".
+            user_template (str, optional): The user template. Defaults to "".
+            **kwargs (Any): The other arguments of `PromptBuilder`.
+
+        Raises:
+            ValueError: If the cacheable prefix is empty.
+        """
+        if not cacheable_prefix:
+            raise ValueError("The cacheable prefix must not be empty")
+
+        super().__init__(system_template=system_template, user_template=user_template, **kwargs)
+        self.cacheable_prefix = cacheable_prefix
+        self.prefix_hash = hashlib.sha256(cacheable_prefix.encode()).hexdigest()[:16]
+
+    def format(
+        self, history: list[Message] | None = None, extra_contents: list[Any] | None = None, **kwargs: Any
+    ) -> list[Message]:
+        """Render the prompt messages, starting with the cacheable prefix.
+
+        Args:
+            history (list[Message] | None, optional): The conversation history, placed between the system and the
+                user message. Defaults to None.
+            extra_contents (list[Any] | None, optional): Extra contents of the user message, e.g. attachments.
+                Defaults to None.
+            **kwargs (Any): The values of the template variables.
+
+        Returns:
+            list[Message]: The system message, starting with the cacheable prefix, the history, and the user message.
+        """
+        system_text = self.cacheable_prefix
+        if self.system_template:
+            system_text += PREFIX_SEPARATOR + self.system_template.format(**kwargs)
+
+        user_text = self.user_template.format(**kwargs)
+        return [
+            Message.system(system_text),
+            *(history or []),
+            Message.user([user_text, *extra_contents] if extra_contents else user_text),
+        ]
+
+
+class PromptCacheLMInvoker:
+    """Wraps an LM invoker to record the cached input tokens of every call.
+
+    All other attributes are forwarded to the wrapped invoker.
+    """
+
+    def __init__(self, lm_invoker: Any):
+        """Initialize the prompt cache LM invoker.
+
+        Args:
+            lm_invoker (Any): The LM invoker to wrap.
+        """
+        self.lm_invoker = lm_invoker
+        self.stats = PromptCacheStats()
+
+    async def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the wrapped LM invoker, recording the cached input tokens of its output.
+
+        Args:
+            *args (Any): The positional arguments of the wrapped invoker's `invoke`.
+            **kwargs (Any): The keyword arguments of the wrapped invoker's `invoke`.
+
+        Returns:
+            Any: The output of the wrapped invoker.
+        """
+        lm_output = await self.lm_invoker.invoke(*args, **kwargs)
+        input_tokens = _field(_field(lm_output, "token_usage"), "input_tokens") or 0
+        cached = cached_tokens(lm_output)
+        self.stats.record(input_tokens, cached)
+        logger.info("Prompt cache: %d of %d input tokens cached", cached, input_tokens)
+        return lm_output
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped LM invoker."""
+        return getattr(self.lm_invoker, name)
@@ -0,0 +1,54 @@
+import asyncio
+import csv
+import logging
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_invoker
+from gllm_inference.request_processor import LMRequestProcessor
+
+from cacheable_prompt import CacheablePromptBuilder, PromptCacheLMInvoker
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+
+# The instructions and the reference documents are the same for every request, so they form the cacheable prefix
+with open("data/imaginary_animals.csv", encoding="utf-8") as file:
+    animals = "\n".join(f"- {row['name']}: {row['description']}" for row in csv.DictReader(file))
+
+CACHEABLE_PREFIX = f"""You are a zoologist who answers questions about the imaginary animals below, in one or two \
+sentences. Only use the descriptions of the animals, and say so when they do not answer the question.
+
+Animals:
+{animals}"""
+
+lm_invoker = PromptCacheLMInvoker(build_lm_invoker(model_id="openai/gpt-4.1-mini"))
+lmrp = LMRequestProcessor(
+    prompt_builder=CacheablePromptBuilder(
+        cacheable_prefix=CACHEABLE_PREFIX,
+        system_template="The user is a {audience}.",  # variable contents only come after the prefix
+        user_template="Question: {question}",
+    ),
+    lm_invoker=lm_invoker,
+)
+
+questions = [
+    ("child", "Which animal glows in the dark?"),
+    ("biologist", "What does the Aquaflare feed on?"),
+    ("child", "Which animals can fly?"),
+    ("traveler", "Where can I see a Luminafox?"),
+]
+
+
+async def main():
+    # The first call writes the prefix to the provider's cache, and the next calls read it
+    for audience, question in questions:
+        response = await lmrp.process(audience=audience, question=question)
+        print(f"Response: {response}")
+
+    stats = lm_invoker.stats
+    print(f"Cache hit rate: {stats.hit_rate:.0%}, cached input tokens: {stats.cached_token_ratio:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
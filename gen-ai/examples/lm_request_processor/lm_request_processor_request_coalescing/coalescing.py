@@ -0,0 +1,213 @@
+"""Single-flight coalescing of identical in-flight LM requests.
+
+`CoalescingLMRequestProcessor` wraps an `LMRequestProcessor` so that concurrent calls to `process` with the same
+model, prompt templates, prompt variables, and hyperparameters share a single provider call. The first call (the
+leader) sends the request, and every identical call made while it is in flight waits for the same result. Streamed
+events are fanned out to the event emitter of every waiter, including the events emitted before it joined.
+
+Only idempotent requests are coalesced: requests whose processor has tools, which may have side effects, or that
+sample with a non-zero temperature are always sent on their own. `stats` counts how many calls were coalesced.
+
+References:
+    [1] https://pkg.go.dev/golang.org/x/sync/singleflight
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from gllm_core.event import EventEmitter
+
+
+@dataclass
+class CoalescingStats:
+    """The counters of a `CoalescingLMRequestProcessor`.
+
+    Attributes:
+        calls (int): The number of calls to `process`.
+        provider_calls (int): The number of calls sent to the wrapped processor.
+        coalesced (int): The number of calls that shared an in-flight call instead of sending their own.
+        not_eligible (int): The number of calls sent on their own because they are not idempotent.
+    """
+
+    calls: int = 0
+    provider_calls: int = 0
+    coalesced: int = 0
+    not_eligible: int = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """The share of calls that were coalesced."""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+
+class _FanOutEmitter:
+    """Records the events of a shared call and forwards them to the event emitters of its waiters."""
+
+    def __init__(self):
+        self.events: list[tuple[tuple, dict]] = []
+        self.subscribers: list[EventEmitter] = []
+
+    async def subscribe(self, event_emitter: EventEmitter) -> None:
+        # Events emitted while the earlier ones are replayed are appended to `events`, so the replay goes on until it
+        # catches up, and the subscriber is registered with no await in between so that no event is missed
+        replayed = 0
+        while replayed < len(self.events):
+            args, kwargs = self.events[replayed]
+            replayed += 1
+            await event_emitter.emit(*args, **kwargs)
+        self.subscribers.append(event_emitter)
+
+    async def emit(self, *args: Any, **kwargs: Any) -> None:
+        self.events.append((args, kwargs))
+        for event_emitter in list(self.subscribers):
+            await event_emitter.emit(*args, **kwargs)
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    emitter: _FanOutEmitter
+    waiters: int = 0
+    joined: int = 0
+
+
+class CoalescingLMRequestProcessor:
+    """Wraps an LM request processor so that identical concurrent requests share one provider call.
+
+    All other attributes are forwarded to the wrapped processor.
+    """
+
+    def __init__(self, lm_request_processor: Any, allow_sampling: bool = False):
+        """Initialize the coalescing LM request processor.
+
+        Args:
+            lm_request_processor (Any): The LM request processor to wrap.
+            allow_sampling (bool, optional): Whether to also coalesce requests sampled with a non-zero temperature,
+                in which case their waiters all get the same sample. Defaults to False.
+        """
+        self.lm_request_processor = lm_request_processor
+        self.allow_sampling = allow_sampling
+        self.stats = CoalescingStats()
+        self._flights: dict[str, _Flight] = {}
+
+    def is_idempotent(self, hyperparameters: dict[str, Any] | None = None) -> bool:
+        """Return whether a request with the given hyperparameters may be coalesced.
+
+        Args:
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request.
+                Defaults to None.
+
+        Returns:
+            bool: False if the processor has tools, or if the request samples and sampling is not allowed.
+        """
+        if getattr(self.lm_request_processor.lm_invoker, "tools", None):
+            return False
+
+        invoker_hyperparameters = getattr(self.lm_request_processor.lm_invoker, "default_hyperparameters", None) or {}
+        temperature = {**invoker_hyperparameters, **(hyperparameters or {})}.get("temperature")
+        return self.allow_sampling or not temperature
+
+    def request_key(self, prompt_kwargs: dict[str, Any], hyperparameters: dict[str, Any] | None = None) -> str:
+        """Return the key identifying a request: a hash of the model, the prompt, and the hyperparameters.
+
+        The prompt is identified by the templates of the prompt builder and the prompt variables, which together
+        determine the rendered prompt.
+
+        Args:
+            prompt_kwargs (dict[str, Any]): The prompt variables.
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request.
+                Defaults to None.
+
+        Returns:
+            str: The request key.
+        """
+        lm_invoker = self.lm_request_processor.lm_invoker
+        prompt_builder = self.lm_request_processor.prompt_builder
+        request = {
+            "model": getattr(lm_invoker, "model_id", None) or f"invoker-{id(lm_invoker)}",
+            "system_template": getattr(prompt_builder, "system_template", None),
+            "user_template": getattr(prompt_builder, "user_template", None) or f"prompt-builder-{id(prompt_builder)}",
+            "prompt": prompt_kwargs,
+            "hyperparameters": hyperparameters or {},
+        }
+        payload = json.dumps(request, sort_keys=True, default=repr).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    async def process(
+        self,
+        hyperparameters: dict[str, Any] | None = None,
+        event_emitter: EventEmitter | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Process a request, sharing the in-flight call of an identical request if there is one.
+
+        Args:
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request.
+                Defaults to None.
+            event_emitter (EventEmitter | None, optional): The event emitter to stream the response to.
+                Defaults to None.
+            **kwargs (Any): The prompt variables, as for `LMRequestProcessor.process`.
+
+        Returns:
+            Any: The processed output. When a call was shared, every waiter gets its own copy.
+        """
+        self.stats.calls += 1
+        if not self.is_idempotent(hyperparameters):
+            self.stats.not_eligible += 1
+            self.stats.provider_calls += 1
+            return await self.lm_request_processor.process(
+                hyperparameters=hyperparameters, event_emitter=event_emitter, **kwargs
+            )
+
+        key = self.request_key(kwargs, hyperparameters)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, hyperparameters, kwargs)
+        else:
+            self.stats.coalesced += 1
+
+        flight.waiters += 1
+        flight.joined += 1
+        try:
+            if event_emitter is not None:
+                await flight.emitter.subscribe(event_emitter)
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # The shared call is only cancelled when nobody waits for it anymore
+            if flight.waiters == 1:
+                flight.task.cancel()
+                # Closed at once, so that an identical request does not join the cancelled call before it completes
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.waiters -= 1
+            if event_emitter is not None and event_emitter in flight.emitter.subscribers:
+                flight.emitter.subscribers.remove(event_emitter)
+
+        # The flight is closed once its call completes, so `joined` is final here
+        return result if flight.joined == 1 else copy.deepcopy(result)
+
+    def _start(self, key: str, hyperparameters: dict[str, Any] | None, prompt_kwargs: dict[str, Any]) -> _Flight:
+        emitter = _FanOutEmitter()
+        task = asyncio.create_task(
+            self.lm_request_processor.process(hyperparameters=hyperparameters, event_emitter=emitter, **prompt_kwargs)
+        )
+        flight = self._flights[key] = _Flight(task, emitter)
+
+        def close(_: asyncio.Task) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        # Registered before any waiter awaits the task, so the flight is closed before the waiters resume
+        task.add_done_callback(close)
+        self.stats.provider_calls += 1
+        return flight
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped LM request processor."""
+        return getattr(self.lm_request_processor, name)
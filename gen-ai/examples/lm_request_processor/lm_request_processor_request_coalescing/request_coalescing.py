@@ -0,0 +1,38 @@
+import asyncio
+
+from dotenv import load_dotenv
+from gllm_core.event import EventEmitter
+from gllm_inference.builder import build_lm_request_processor
+
+from coalescing import CoalescingLMRequestProcessor
+
+load_dotenv()
+
+
+lmrp = CoalescingLMRequestProcessor(
+    build_lm_request_processor(
+        model_id="openai/gpt-4.1-mini",
+        system_template="You are a helpful assistant. Answer briefly.",
+        user_template="{question}",
+    )
+)
+
+
+async def main():
+    # 50 users ask the same trending question at once, and one of them streams the answer
+    trending_question = "Who won the latest FIFA World Cup?"
+    responses = await asyncio.gather(
+        lmrp.process(question=trending_question, event_emitter=EventEmitter.with_print_handler()),
+        *(lmrp.process(question=trending_question) for _ in range(49)),
+        lmrp.process(question="What is France's capital?"),
+    )
+
+    print(f"\nResponse: {responses[1]}")
+    print(
+        f"Calls: {lmrp.stats.calls}, provider calls: {lmrp.stats.provider_calls}, "
+        f"coalesced: {lmrp.stats.coalesced} ({lmrp.stats.dedup_ratio:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
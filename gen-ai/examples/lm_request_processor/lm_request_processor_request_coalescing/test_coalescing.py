@@ -0,0 +1,73 @@
+"""Tests of the event fan-out of `CoalescingLMRequestProcessor`.
+
+Run with `uv run python -m unittest test_coalescing.py`.
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from coalescing import CoalescingLMRequestProcessor
+
+
+class _RecordingEmitter:
+    """Records the events it receives, optionally slowly, to let new events arrive while it replays."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.events: list[int] = []
+
+    async def emit(self, value: int) -> None:
+        await asyncio.sleep(self.delay)
+        self.events.append(value)
+
+
+class _StreamingLMRequestProcessor:
+    """Streams numbered events, then returns their count."""
+
+    def __init__(self, events: int, interval: float):
+        self.events = events
+        self.interval = interval
+        self.lm_invoker = SimpleNamespace(model_id="fake/model", tools=None, default_hyperparameters=None)
+        self.prompt_builder = SimpleNamespace(system_template=None, user_template="{query}")
+
+    async def process(self, hyperparameters=None, event_emitter=None, **kwargs) -> int:
+        for value in range(1, self.events + 1):
+            await event_emitter.emit(value)
+            await asyncio.sleep(self.interval)
+        return self.events
+
+
+class CoalescingFanOutTest(unittest.IsolatedAsyncioTestCase):
+    async def test_late_subscriber_receives_events_emitted_during_its_replay(self):
+        lmrp = CoalescingLMRequestProcessor(_StreamingLMRequestProcessor(events=12, interval=0.002))
+        leader = _RecordingEmitter()
+        late = _RecordingEmitter(delay=0.005)  # replays slower than the events arrive
+
+        async def join_late() -> int:
+            await asyncio.sleep(0.007)
+            return await lmrp.process(event_emitter=late, query="hello")
+
+        results = await asyncio.gather(lmrp.process(event_emitter=leader, query="hello"), join_late())
+
+        self.assertEqual(results, [12, 12])
+        self.assertEqual(lmrp.stats.provider_calls, 1)
+        self.assertEqual(leader.events, list(range(1, 13)))
+        self.assertEqual(late.events, list(range(1, 13)))
+
+    async def test_request_after_last_waiter_cancelled_starts_a_new_call(self):
+        lmrp = CoalescingLMRequestProcessor(_StreamingLMRequestProcessor(events=3, interval=0.01))
+        first = asyncio.create_task(lmrp.process(query="hello"))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        # Joins right after the cancellation, before the cancelled call has completed
+        second = asyncio.create_task(lmrp.process(query="hello"))
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+        self.assertEqual(await second, 3)
+        self.assertEqual(lmrp.stats.provider_calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
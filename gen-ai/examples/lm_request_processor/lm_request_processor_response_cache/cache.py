@@ -0,0 +1,320 @@
+"""An exact-match response cache for LM request processors.
+
+`with_response_cache(lm_request_processor, cache)` wraps the processor's LM invoker with a `CachedLMInvoker`. The
+invoker receives the fully rendered messages, so the cache key is a hash of those messages together with the model
+id, the tools, the response schema, and the sampling hyperparameters: two calls share a cached response only if the
+provider would have received exactly the same request. The output parser still runs on every call.
+
+Two backends are provided: `InMemoryResponseCache` (an LRU dictionary, hits in microseconds) and
+`SQLiteResponseCache` (a local database file that survives restarts). Both support a TTL and a maximum number of
+entries. Requests sampled with a non-zero temperature are not cached by default, and `bypass_cache()` skips the
+cache for the calls made within it.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor
+"""
+
+import copy
+import hashlib
+import importlib
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+
+RESPONSE_EVENT_TYPE = "response"
+
+_bypass: ContextVar[bool] = ContextVar("bypass_response_cache", default=False)
+
+
+@contextmanager
+def bypass_cache() -> Iterator[None]:
+    """Skip the response cache, neither reading nor writing it, for the calls made within this context."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class ResponseCache(ABC):
+    """A store of LM responses by request key."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """Return the cached response of a request, or None if it is not cached or has expired.
+
+        Args:
+            key (str): The request key.
+
+        Returns:
+            Any | None: The cached response.
+        """
+
+    @abstractmethod
+    def put(self, key: str, response: Any) -> None:
+        """Cache the response of a request.
+
+        Args:
+            key (str): The request key.
+            response (Any): The response, a string or a pydantic model such as `LMOutput`.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every cached response."""
+
+
+class InMemoryResponseCache(ResponseCache):
+    """A least recently used cache of responses held in memory."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        """Initialize the in-memory response cache.
+
+        Args:
+            max_entries (int, optional): The maximum number of cached responses. Defaults to 1024.
+            ttl (float | None, optional): The seconds a response stays cached. Defaults to None, in which case
+                responses never expire.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached response of a request, or None if it is not cached or has expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: Any) -> None:
+        """Cache the response of a request, evicting the least recently used one if the cache is full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self._entries.clear()
+
+
+def _encode(response: Any) -> str:
+    if isinstance(response, BaseModel):
+        model_type = type(response)
+        return json.dumps(
+            {"type": f"{model_type.__module__}:{model_type.__qualname__}", "data": response.model_dump(mode="json")}
+        )
+    return json.dumps({"type": None, "data": response})
+
+
+def _decode(data: str) -> Any:
+    payload = json.loads(data)
+    if payload["type"] is None:
+        return payload["data"]
+
+    module_name, _, qualname = payload["type"].partition(":")
+    model_type: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        model_type = getattr(model_type, name)
+    return model_type.model_validate(payload["data"])
+
+
+class SQLiteResponseCache(ResponseCache):
+    """A cache of responses persisted in a local SQLite database."""
+
+    def __init__(self, path: str | Path = "response_cache.db", max_entries: int = 100_000, ttl: float | None = None):
+        """Initialize the SQLite response cache.
+
+        Args:
+            path (str | Path, optional): The database file. Defaults to "response_cache.db".
+            max_entries (int, optional): The maximum number of cached responses. The least recently used ones are
+                evicted first. Defaults to 100_000.
+            ttl (float | None, optional): The seconds a response stays cached. Defaults to None, in which case
+                responses never expire.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached response of a request, or None if it is not cached or has expired."""
+        now = time.time()
+        row = self._connection.execute(
+            "SELECT data FROM responses WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return _decode(row[0])
+
+    def put(self, key: str, response: Any) -> None:
+        """Cache the response of a request, evicting expired and least recently used responses."""
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else float("inf")
+        self._connection.execute(
+            "INSERT OR REPLACE INTO responses (key, data, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, _encode(response), expires_at, now),
+        )
+        self._connection.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        self._connection.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self._connection.execute("DELETE FROM responses")
+
+
+@dataclass
+class CacheStats:
+    """The counters of a `CachedLMInvoker`.
+
+    Attributes:
+        hits (int): The number of invocations answered from the cache.
+        misses (int): The number of invocations sent to the provider and cached.
+        bypassed (int): The number of invocations that skipped the cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"  # stable across processes, unlike `repr`
+    return repr(value)
+
+
+class CachedLMInvoker:
+    """Wraps an LM invoker to answer repeated requests from a response cache.
+
+    All other attributes are forwarded to the wrapped invoker, so it can be passed wherever the invoker is used.
+    """
+
+    def __init__(self, lm_invoker: Any, cache: ResponseCache, cache_sampling: bool = False):
+        """Initialize the cached LM invoker.
+
+        Args:
+            lm_invoker (Any): The LM invoker to wrap.
+            cache (ResponseCache): The response cache.
+            cache_sampling (bool, optional): Whether to also cache requests sampled with a non-zero temperature,
+                which makes repeated calls return the same sample. Defaults to False.
+        """
+        self.lm_invoker = lm_invoker
+        self.cache = cache
+        self.cache_sampling = cache_sampling
+        self.stats = CacheStats()
+
+    def request_key(self, prompt: Any, hyperparameters: dict[str, Any] | None = None) -> str:
+        """Return the cache key of a request.
+
+        Args:
+            prompt (Any): The rendered prompt, e.g. a list of messages.
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request.
+                Defaults to None.
+
+        Returns:
+            str: A hash of the prompt, the model id, the tools, the response schema, and the hyperparameters.
+        """
+        request = {
+            "invoker": self._invoker_key(),
+            "prompt": prompt,
+            "hyperparameters": self._hyperparameters(hyperparameters),
+        }
+        payload = json.dumps(request, sort_keys=True, default=_jsonable).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def _invoker_key(self) -> dict[str, Any]:
+        # Read on every request rather than memoised, since the tools or the response schema may be changed in place
+        return {
+            "model": getattr(self.lm_invoker, "model_id", None) or type(self.lm_invoker).__name__,
+            "tools": getattr(self.lm_invoker, "tools", None),
+            "response_schema": getattr(self.lm_invoker, "response_schema", None),
+        }
+
+    def _hyperparameters(self, hyperparameters: dict[str, Any] | None) -> dict[str, Any]:
+        defaults = getattr(self.lm_invoker, "default_hyperparameters", None) or {}
+        return {**defaults, **(hyperparameters or {})}
+
+    async def invoke(self, prompt: Any, hyperparameters: dict[str, Any] | None = None, **kwargs: Any) -> Any:
+        """Return the cached response of the request, or invoke the wrapped invoker and cache its response.
+
+        Args:
+            prompt (Any): The rendered prompt.
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the request.
+                Defaults to None.
+            **kwargs (Any): The other keyword arguments of the wrapped invoker's `invoke`. On a cache hit, the
+                cached response text is sent to the `event_emitter`, if any.
+
+        Returns:
+            Any: The response.
+        """
+        sampled = bool(self._hyperparameters(hyperparameters).get("temperature"))
+        if _bypass.get() or (sampled and not self.cache_sampling):
+            self.stats.bypassed += 1
+            return await self.lm_invoker.invoke(prompt, hyperparameters=hyperparameters, **kwargs)
+
+        key = self.request_key(prompt, hyperparameters)
+        response = self.cache.get(key)
+        if response is not None:
+            self.stats.hits += 1
+            event_emitter = kwargs.get("event_emitter")
+            if event_emitter is not None:
+                await event_emitter.emit(getattr(response, "response", str(response)), event_type=RESPONSE_EVENT_TYPE)
+            return copy.copy(response)
+
+        self.stats.misses += 1
+        response = await self.lm_invoker.invoke(prompt, hyperparameters=hyperparameters, **kwargs)
+        self.cache.put(key, response)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped invoker."""
+        return getattr(self.lm_invoker, name)
+
+
+def with_response_cache(lm_request_processor: Any, cache: ResponseCache, cache_sampling: bool = False) -> Any:
+    """Enable the response cache on an LM request processor.
+
+    Args:
+        lm_request_processor (Any): The LM request processor, e.g. made with `build_lm_request_processor`.
+        cache (ResponseCache): The response cache. It may be shared by several processors.
+        cache_sampling (bool, optional): Whether to also cache requests sampled with a non-zero temperature.
+            Defaults to False.
+
+    Returns:
+        Any: The same LM request processor, whose LM invoker is now a `CachedLMInvoker`.
+    """
+    lm_request_processor.lm_invoker = CachedLMInvoker(lm_request_processor.lm_invoker, cache, cache_sampling)
+    return lm_request_processor
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_request_processor
+
+from cache import InMemoryResponseCache, SQLiteResponseCache, bypass_cache, with_response_cache
+
+load_dotenv()
+
+
+USER_TEMPLATE = """Based on the following user query, determine if it is a deep research query or a normal query.
+Output the answer in JSON format with "route" as the key. For example:
+{{"route": "deep_research"}} or {{"route": "normal"}}
+
+Query: {text}"""
+
+# Persisted across runs: run the script twice to see the first call answered from the cache too
+router_lmrp = with_response_cache(
+    build_lm_request_processor(
+        model_id="openai/gpt-4.1-mini",
+        system_template="You are a query router.",
+        user_template=USER_TEMPLATE,
+        output_parser_type="json",
+    ),
+    SQLiteResponseCache("response_cache.db", max_entries=10_000, ttl=24 * 60 * 60),
+)
+
+# In memory only, for the fastest hits
+rewrite_lmrp = with_response_cache(
+    build_lm_request_processor(
+        model_id="openai/gpt-4.1-mini",
+        system_template="Rewrite the user query to be more specific for a search engine. Only output the query.",
+        user_template="{query}",
+    ),
+    InMemoryResponseCache(max_entries=1024, ttl=60 * 60),
+)
+
+
+async def timed(label: str, coroutine) -> None:
+    started_at = time.perf_counter()
+    response = await coroutine
+    print(f"{label:<12} {(time.perf_counter() - started_at) * 1000:>9.3f} ms  {response}")
+
+
+async def main():
+    for attempt in range(1, 3):
+        await timed(f"router #{attempt}", router_lmrp.process(text="research about the latest trends in AI"))
+        await timed(f"rewrite #{attempt}", rewrite_lmrp.process(query="nocturnal animals"))
+
+    with bypass_cache():
+        await timed("rewrite", rewrite_lmrp.process(query="nocturnal animals"))
+
+    print(f"Router cache: {router_lmrp.lm_invoker.stats}")
+    print(f"Rewrite cache: {rewrite_lmrp.lm_invoker.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
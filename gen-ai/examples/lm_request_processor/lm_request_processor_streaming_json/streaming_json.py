@@ -0,0 +1,357 @@
+"""Incremental JSON parsing of a streamed LM output, with an early exit once the needed keys are complete.
+
+`IncrementalJSONParser` is fed the output text chunk by chunk, as it is streamed, and keeps the partially parsed
+value up to date: objects and arrays appear as soon as they are opened, and strings grow as their characters arrive.
+Every chunk is scanned once, so the cost grows linearly with the length of the output instead of the whole text being
+parsed again after every chunk. Text around the JSON value, such as a "```json" fence, is skipped.
+
+`EarlyExitLMRequestProcessor` wraps an LM request processor whose output is a JSON object. It streams the output
+through the parser and returns as soon as every key in `until` has a complete value, e.g. the "route" of a router,
+cancelling the rest of the generation. It can also report the partial value after every chunk, so long structured
+outputs can be consumed progressively.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor/stream-lm-output
+    [2] https://www.json.org/json-en.html
+"""
+
+import asyncio
+import inspect
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+RESPONSE_EVENT_TYPE = "response"
+
+_WHITESPACE = frozenset(" \t\r\n")
+_SCALAR_START = frozenset("-0123456789tfn")
+_STRING_RUN = re.compile(r'[^"\\]+')
+_SCALAR_RUN = re.compile(r"[^\s,\]}]+")
+_LITERALS = {"true": True, "false": False, "null": None}
+_DECODER = json.JSONDecoder(strict=False)  # LMs sometimes write raw newlines within strings
+
+# What the innermost open object or array expects next
+_KEY_OR_END, _KEY, _COLON, _VALUE, _VALUE_OR_END, _COMMA_OR_END = range(6)
+
+
+class _Frame:
+    __slots__ = ("container", "key", "expects")
+
+    def __init__(self, container: dict | list):
+        self.container = container
+        self.key: str | None = None
+        self.expects = _KEY_OR_END if isinstance(container, dict) else _VALUE_OR_END
+
+
+def _decode_string(raw: str) -> str:
+    return _DECODER.decode(f'"{raw}"')
+
+
+class IncrementalJSONParser:
+    """Parses a JSON object or array from text fed chunk by chunk."""
+
+    def __init__(self):
+        """Initialize the incremental JSON parser."""
+        self.done = False
+        self._root: dict | list | None = None
+        self._stack: list[_Frame] = []
+        self._string: list[str] | None = None
+        self._string_is_key = False
+        self._string_dirty = False
+        self._escaped = False
+        self._scalar: list[str] | None = None
+        self._completed_keys: set[str] = set()
+        self._offset = 0
+
+    @property
+    def value(self) -> dict | list | None:
+        """The value parsed so far, or None if it has not started.
+
+        Open objects and arrays hold the values parsed so far, and an unfinished string holds the characters
+        received so far. Unfinished numbers and literals are left out. The value is updated in place as more text is
+        fed.
+        """
+        if self._string_dirty:
+            raw = "".join(self._string[:-1] if self._escaped else self._string)
+            try:
+                string = _decode_string(raw)
+            except ValueError:
+                string = _decode_string(raw[: raw.rindex("\\")])  # an unfinished "\uXXXX" escape
+            self._set(string)
+            self._string_dirty = False
+        return self._root
+
+    @property
+    def completed_keys(self) -> frozenset[str]:
+        """The keys of the top-level object whose values are complete."""
+        return frozenset(self._completed_keys)
+
+    def is_complete(self, keys: str | Iterable[str]) -> bool:
+        """Return whether the given keys of the top-level object all have complete values.
+
+        Args:
+            keys (str | Iterable[str]): A key or several keys.
+
+        Returns:
+            bool: Whether every key is complete.
+        """
+        if isinstance(keys, str):
+            return keys in self._completed_keys
+        return self._completed_keys.issuperset(keys)
+
+    def feed(self, text: str) -> None:
+        """Parse the next chunk of the text. Text after the end of the value is ignored.
+
+        Args:
+            text (str): The next chunk.
+
+        Raises:
+            ValueError: If the text is not valid JSON.
+        """
+        index, length = 0, len(text)
+        while index < length and not self.done:
+            if self._string is not None:
+                index = self._read_string(text, index)
+                continue
+
+            if self._scalar is not None:
+                match = _SCALAR_RUN.match(text, index)
+                if match:
+                    self._scalar.append(match.group())
+                    index = match.end()
+                if index < length:
+                    self._finish_scalar()
+                continue
+
+            character = text[index]
+            index += 1
+            if character in _WHITESPACE:
+                continue
+            if not self._stack:
+                if self._root is None and character in "{[":
+                    self._open({} if character == "{" else [])
+                continue  # text around the value, e.g. a Markdown fence
+            self._read_structure(character, self._offset + index - 1)
+
+        self._offset += length
+
+    def _read_string(self, text: str, index: int) -> int:
+        if self._escaped:
+            self._string.append(text[index])
+            self._escaped = False
+            self._string_dirty = not self._string_is_key
+            return index + 1
+
+        match = _STRING_RUN.match(text, index)
+        if match:
+            self._string.append(match.group())
+            self._string_dirty = not self._string_is_key
+            return match.end()
+
+        if text[index] == "\\":
+            self._string.append("\\")
+            self._escaped = True
+            return index + 1
+
+        string = _decode_string("".join(self._string))
+        self._string = None
+        self._string_dirty = False
+        frame = self._stack[-1]
+        if self._string_is_key:
+            frame.key = string
+            frame.expects = _COLON
+        else:
+            self._set(string)
+            self._complete()
+        return index + 1
+
+    def _read_structure(self, character: str, offset: int) -> None:
+        frame = self._stack[-1]
+        expects = frame.expects
+        if expects in (_KEY_OR_END, _KEY) and character == '"':
+            self._string, self._string_is_key = [], True
+        elif expects == _COLON and character == ":":
+            frame.expects = _VALUE
+        elif expects == _COMMA_OR_END and character == ",":
+            frame.expects = _KEY if isinstance(frame.container, dict) else _VALUE
+        elif expects in (_KEY_OR_END, _VALUE_OR_END, _COMMA_OR_END) and character == (
+            "}" if isinstance(frame.container, dict) else "]"
+        ):
+            self._close()
+        elif expects in (_VALUE, _VALUE_OR_END):
+            self._start_value(character, offset)
+        else:
+            raise ValueError(f"Invalid JSON: unexpected {character!r} at offset {offset}")
+
+    def _start_value(self, character: str, offset: int) -> None:
+        frame = self._stack[-1]
+        frame.expects = _COMMA_OR_END
+        if character in "{[":
+            container = {} if character == "{" else []
+            self._add(container)
+            self._open(container)
+        elif character == '"':
+            self._add("")
+            self._string, self._string_is_key = [], False
+        elif character in _SCALAR_START:
+            self._scalar = [character]
+        else:
+            raise ValueError(f"Invalid JSON: unexpected {character!r} at offset {offset}")
+
+    def _finish_scalar(self) -> None:
+        token = "".join(self._scalar)
+        self._scalar = None
+        if token in _LITERALS:
+            value = _LITERALS[token]
+        else:
+            try:
+                value = json.loads(token)
+            except ValueError:
+                raise ValueError(f"Invalid JSON: unexpected {token!r} at offset {self._offset}") from None
+        self._add(value)
+        self._complete()
+
+    def _open(self, container: dict | list) -> None:
+        if self._root is None:
+            self._root = container
+        self._stack.append(_Frame(container))
+
+    def _close(self) -> None:
+        self._stack.pop()
+        if self._stack:
+            self._complete()
+        else:
+            self.done = True
+
+    def _add(self, value: Any) -> None:
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+
+    def _set(self, value: Any) -> None:
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container[-1] = value
+
+    def _complete(self) -> None:
+        if len(self._stack) == 1 and isinstance(self._root, dict):
+            self._completed_keys.add(self._stack[0].key)
+
+
+@dataclass
+class EarlyExitStats:
+    """The counters of an `EarlyExitLMRequestProcessor`.
+
+    Attributes:
+        calls (int): The number of calls to `process`.
+        early_exits (int): The number of calls that returned before the generation finished.
+    """
+
+    calls: int = 0
+    early_exits: int = 0
+
+
+class _ParsingEmitter:
+    """Feeds the streamed response to a parser, and forwards every event to the caller's event emitter."""
+
+    def __init__(
+        self,
+        parser: IncrementalJSONParser,
+        until: frozenset[str],
+        resolved: asyncio.Future,
+        event_emitter: Any | None,
+        on_partial: Callable[[Any], Any] | None,
+    ):
+        self.parser = parser
+        self.until = until
+        self.resolved = resolved
+        self.event_emitter = event_emitter
+        self.on_partial = on_partial
+        self.failed = False
+
+    async def emit(self, value: Any, *args: Any, **kwargs: Any) -> None:
+        if self.event_emitter is not None:
+            await self.event_emitter.emit(value, *args, **kwargs)
+        if kwargs.get("event_type") != RESPONSE_EVENT_TYPE or self.failed or not isinstance(value, str):
+            return
+
+        try:
+            self.parser.feed(value)
+        except ValueError:
+            self.failed = True  # leave it to the output parser of the processor
+            return
+
+        if self.on_partial is not None:
+            result = self.on_partial(self.parser.value)
+            if inspect.isawaitable(result):
+                await result
+        if self.until and self.parser.is_complete(self.until) and not self.resolved.done():
+            self.resolved.set_result(None)
+
+
+class EarlyExitLMRequestProcessor:
+    """Wraps an LM request processor with a JSON output to return as soon as the needed keys are complete.
+
+    All other attributes are forwarded to the wrapped processor.
+    """
+
+    def __init__(
+        self,
+        lm_request_processor: Any,
+        until: str | Iterable[str] = (),
+        on_partial: Callable[[Any], Any] | None = None,
+    ):
+        """Initialize the early exit LM request processor.
+
+        Args:
+            lm_request_processor (Any): The LM request processor, whose output parser parses a JSON object.
+            until (str | Iterable[str], optional): The top-level keys after which the generation is cancelled, e.g.
+                "route". Defaults to (), in which case the generation always runs to the end.
+            on_partial (Callable[[Any], Any] | None, optional): Called, or awaited if it is a coroutine function,
+                with the partially parsed output after every streamed chunk. The value is updated in place, so it
+                must be copied to be kept. Defaults to None.
+        """
+        self.lm_request_processor = lm_request_processor
+        self.until = frozenset([until] if isinstance(until, str) else until)
+        self.on_partial = on_partial
+        self.stats = EarlyExitStats()
+
+    async def process(self, *args: Any, event_emitter: Any | None = None, **kwargs: Any) -> Any:
+        """Process the request, returning as soon as the keys in `until` are complete.
+
+        Args:
+            *args (Any): The positional arguments of the wrapped processor's `process`.
+            event_emitter (Any | None, optional): The event emitter, which receives the streamed events up to the
+                early exit. Defaults to None.
+            **kwargs (Any): The keyword arguments of the wrapped processor's `process`, e.g. the prompt variables.
+
+        Returns:
+            Any: On an early exit, an object with the complete top-level keys parsed so far, which include every key
+                in `until`. Otherwise, the output of the wrapped processor.
+        """
+        self.stats.calls += 1
+        resolved = asyncio.get_running_loop().create_future()
+        parser = IncrementalJSONParser()
+        emitter = _ParsingEmitter(parser, self.until, resolved, event_emitter, self.on_partial)
+        task = asyncio.create_task(self.lm_request_processor.process(*args, event_emitter=emitter, **kwargs))
+        try:
+            await asyncio.wait({task, resolved}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not task.done():
+                task.cancel()  # closes the stream, which stops the generation
+                await asyncio.gather(task, return_exceptions=True)
+
+        if task.cancelled():
+            self.stats.early_exits += 1
+            output = parser.value
+            return {key: output[key] for key in parser.completed_keys}
+        return task.result()
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped processor."""
+        return getattr(self.lm_request_processor, name)
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from dotenv import load_dotenv
+from gllm_inference.builder import build_lm_request_processor
+
+from streaming_json import EarlyExitLMRequestProcessor
+
+load_dotenv()
+
+
+# "route" is asked first, so it is complete after a few tokens and the explanation after it is never generated
+router_lmrp = build_lm_request_processor(
+    model_id="openai/gpt-4.1-mini",
+    system_template="You are a query router.",
+    user_template="""Based on the following user query, determine if it is a deep research query or a normal query.
+Output the answer in JSON format with "route" as the first key, followed by a "reason" explaining the choice in a
+few sentences. For example:
+{{"route": "deep_research", "reason": "..."}} or {{"route": "normal", "reason": "..."}}
+
+Query: {text}""",
+    output_parser_type="json",
+)
+early_exit_router_lmrp = EarlyExitLMRequestProcessor(router_lmrp, until="route")
+
+
+def print_progress(partial: dict) -> None:
+    sections = partial.get("sections", [])
+    if sections and "title" in sections[-1]:
+        print(f"\rReceived {len(sections)} section(s), writing {sections[-1]['title']!r:<60}", end="")
+
+
+# A long structured output consumed as it is generated
+outline_lmrp = EarlyExitLMRequestProcessor(
+    build_lm_request_processor(
+        model_id="openai/gpt-4.1-mini",
+        system_template="You write report outlines.",
+        user_template="""Write an outline of a report about {topic} with 6 sections.
+Output the answer in JSON format: {{"sections": [{{"title": "...", "summary": "..."}}]}}""",
+        output_parser_type="json",
+    ),
+    on_partial=print_progress,
+)
+
+
+async def main():
+    query = "research about the latest trends in AI and machine learning"
+
+    started_at = time.perf_counter()
+    response = await router_lmrp.process(text=query)
+    print(f"Full output: {(time.perf_counter() - started_at) * 1000:.0f} ms, route: {response['route']}")
+
+    started_at = time.perf_counter()
+    response = await early_exit_router_lmrp.process(text=query)
+    print(f"Early exit:  {(time.perf_counter() - started_at) * 1000:.0f} ms, route: {response['route']}")
+
+    outline = await outline_lmrp.process(topic="the latest trends in AI")
+    print(f"\nOutline: {[section['title'] for section in outline['sections']]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Microbenchmark of structured output parsing of large nested responses.
+
+Each case compares the per-request work of the examples before and after caching: rendering the schema string,
+building a validator, and parsing the LM output into the schema type from a dictionary or directly from the raw JSON.
+It reports the median time per request, measured with `timeit` over several rounds.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --days 60 --activities 20 --number 50
+"""
+
+import argparse
+import json
+import statistics
+import timeit
+
+from pydantic import BaseModel, TypeAdapter
+
+from structured_output import StructuredOutputParser, schema_string, validate_json
+
+
+class Activity(BaseModel):
+    type: str
+    activity_location: str
+    description: str
+
+
+class Day(BaseModel):
+    day: int
+    activities: list[Activity]
+
+
+class Itinerary(BaseModel):
+    location: str
+    days: list[Day]
+
+
+def make_output(days: int, activities: int) -> str:
+    """Return a fenced JSON itinerary, as an LM would write it."""
+    itinerary = {
+        "location": "Tokyo, Japan",
+        "days": [
+            {
+                "day": day,
+                "activities": [
+                    {
+                        "type": "Sightseeing",
+                        "activity_location": f"Spot {day}-{index}",
+                        "description": "Visit the spot for a panoramic view of the city, especially at night. " * 2,
+                    }
+                    for index in range(activities)
+                ],
+            }
+            for day in range(1, days + 1)
+        ],
+    }
+    return f"```json\n{json.dumps(itinerary, indent=2)}\n```"
+
+
+def measure(function, number: int, repeat: int) -> float:
+    """Return the median microseconds per call of `function`."""
+    rounds = timeit.repeat(function, number=number, repeat=repeat)
+    return statistics.median(rounds) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="Days in the itinerary")
+    parser.add_argument("--activities", type=int, default=20, help="Activities per day")
+    parser.add_argument("--number", type=int, default=20, help="Requests per round")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds")
+    args = parser.parse_args()
+
+    output = make_output(args.days, args.activities)
+    text = output.removeprefix("```json\n").removesuffix("\n```")
+    output_parser = StructuredOutputParser(Itinerary)
+    assert output_parser.parse(output) == Itinerary.model_validate(json.loads(text))
+    assert validate_json(list[Day], json.dumps(json.loads(text)["days"])) == Itinerary.model_validate_json(text).days
+
+    days_text = json.dumps(json.loads(text)["days"])
+    cases = {
+        "schema string": (
+            lambda: str(Itinerary.model_json_schema()),
+            lambda: schema_string(Itinerary),
+        ),
+        "validator of list[Day]": (
+            lambda: TypeAdapter(list[Day]).validate_python(json.loads(days_text)),
+            lambda: validate_json(list[Day], days_text),
+        ),
+        "parse output into Itinerary": (
+            lambda: Itinerary.model_validate(json.loads(text)),
+            lambda: output_parser.parse(output),
+        ),
+    }
+
+    print(f"Output of {len(output) / 1024:.0f} KiB, {args.days * args.activities} activities")
+    print(f"{'case':<30} {'per request':>14} {'cached':>12} {'speedup':>8}")
+    for name, (baseline_function, cached_function) in cases.items():
+        baseline = measure(baseline_function, args.number, args.repeat)
+        cached = measure(cached_function, args.number, args.repeat)
+        print(f"{name:<30} {baseline:>12.1f}us {cached:>10.1f}us {baseline / cached:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Schema strings and validators cached per schema type, and an output parser that validates raw JSON.
+
+Rendering a pydantic model's JSON schema and building a `TypeAdapter` are both costly, and neither changes between
+requests. `schema_string` and `type_adapter` compute them once per schema type and reuse them afterwards.
+
+`StructuredOutputParser` is an output parser for an `LMRequestProcessor` that validates the LM output into the
+schema type directly from the raw JSON text, with pydantic's JSON parser, instead of decoding it into a dictionary
+first and validating the dictionary.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor/produce-consistent-output-from-lm
+    [2] https://docs.pydantic.dev/latest/concepts/performance/
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+
+_JSON_START = {"{": "}", "[": "]"}
+_JSON_START_PATTERN = re.compile(r"[{\[]")
+_DECODER = json.JSONDecoder()
+
+
+@lru_cache(maxsize=256)
+def type_adapter(schema_type: Any) -> TypeAdapter:
+    """Return the validator of a schema type, built once per type.
+
+    Args:
+        schema_type (Any): The schema type, e.g. a pydantic model or `list[Activity]`.
+
+    Returns:
+        TypeAdapter: The validator of the type.
+    """
+    return TypeAdapter(schema_type)
+
+
+@lru_cache(maxsize=256)
+def schema_string(schema_type: Any) -> str:
+    """Return the JSON schema of a schema type as a compact JSON string, rendered once per type.
+
+    Args:
+        schema_type (Any): The schema type, e.g. a pydantic model or `list[Activity]`.
+
+    Returns:
+        str: The JSON schema, to be placed in a prompt.
+    """
+    return json.dumps(type_adapter(schema_type).json_schema(), separators=(",", ":"))
+
+
+def validate_json(schema_type: Any, data: str | bytes) -> Any:
+    """Validate raw JSON into a schema type, without decoding it into Python objects first.
+
+    Args:
+        schema_type (Any): The schema type, e.g. a pydantic model or `list[Activity]`.
+        data (str | bytes): The JSON text.
+
+    Returns:
+        Any: The validated value, e.g. an instance of the model.
+
+    Raises:
+        pydantic.ValidationError: If the JSON is invalid or does not match the schema.
+    """
+    return type_adapter(schema_type).validate_json(data)
+
+
+class StructuredOutputParser:
+    """Parses the JSON output of an LM into a schema type."""
+
+    def __init__(self, schema_type: Any):
+        """Initialize the structured output parser.
+
+        Args:
+            schema_type (Any): The schema type, e.g. a pydantic model or `list[Activity]`.
+        """
+        self.schema_type = schema_type
+        self.schema = schema_string(schema_type)
+
+    def parse(self, result: Any) -> Any:
+        """Parse the output of an LM.
+
+        Args:
+            result (Any): The LM output, or its text. Text around the JSON value, such as a "```json" fence, is
+                ignored. If the text holds other brackets, the first JSON value that matches the schema is returned.
+
+        Returns:
+            Any: The validated value, e.g. an instance of the model.
+
+        Raises:
+            pydantic.ValidationError: If the output is not valid JSON or does not match the schema.
+        """
+        text = result if isinstance(result, (str, bytes)) else getattr(result, "response", str(result))
+        if isinstance(text, bytes):
+            text = text.decode()
+
+        start = min((index for index in map(text.find, _JSON_START) if index >= 0), default=0)
+        end = len(text)
+        if text[start : start + 1] in _JSON_START:
+            end = text.rfind(_JSON_START[text[start]]) + 1 or end
+        try:
+            return validate_json(self.schema_type, text[start:end])
+        except ValidationError as error:
+            # The text may hold other brackets around the JSON value, e.g. "Sure! [see below]\n{...}", so each JSON
+            # value decoded from an opening bracket is tried in turn, and the first one matching the schema is returned
+            for match in _JSON_START_PATTERN.finditer(text):
+                try:
+                    _, value_end = _DECODER.raw_decode(text, match.start())
+                    return validate_json(self.schema_type, text[match.start() : value_end])
+                except (ValueError, ValidationError):
+                    continue
+            raise error
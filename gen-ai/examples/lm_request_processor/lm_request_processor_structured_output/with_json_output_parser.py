@@ -1,10 +1,13 @@
 import asyncio
-import json
 
 from dotenv import load_dotenv
-from gllm_inference.builder import build_lm_request_processor
+from gllm_inference.builder import build_lm_invoker
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
 from pydantic import BaseModel
 
+from structured_output import StructuredOutputParser
+
 
 load_dotenv()
 
@@ -25,18 +28,20 @@ class ActivityList(BaseModel):
     activities: list[Activity]
 
 
-lmrp = build_lm_request_processor(
-    model_id="openai/gpt-4.1-mini",
-    system_template=SYSTEM_TEMPLATE,
-    user_template=USER_TEMPLATE,
-    output_parser_type="json",
+# The schema string and the validator of ActivityList are built once, not on every request
+output_parser = StructuredOutputParser(ActivityList)
+lmrp = LMRequestProcessor(
+    prompt_builder=PromptBuilder(system_template=SYSTEM_TEMPLATE, user_template=USER_TEMPLATE),
+    lm_invoker=build_lm_invoker(model_id="openai/gpt-4.1-mini"),
+    output_parser=output_parser,
 )
 
 
 async def main():
-    schema = str(ActivityList.model_json_schema())
-    response = await lmrp.process(question="I want to go to Tokyo, Japan. What should I do?", schema=schema) 
-    print(f"Structured output:\n{json.dumps(response, indent=4)}")  # For pretty print
+    response = await lmrp.process(
+        question="I want to go to Tokyo, Japan. What should I do?", schema=output_parser.schema
+    )
+    print(f"Structured output:\n{response.model_dump_json(indent=4)}")  # For pretty print
 
 
 if __name__ == "__main__":
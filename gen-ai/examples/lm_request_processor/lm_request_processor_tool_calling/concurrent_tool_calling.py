@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from dotenv import load_dotenv
+from gllm_core.schema import tool
+from gllm_inference.builder import build_lm_request_processor
+
+from concurrent_tools import ConcurrentToolLMRequestProcessor
+
+
+load_dotenv()
+
+
+@tool
+async def get_exchange_rate(base: str, quote: str) -> float:
+    """Get the exchange rate between two currencies."""
+    await asyncio.sleep(1)  # Simulate a call to a remote API
+    return {"USD/JPY": 150.0, "USD/EUR": 0.92}.get(f"{base}/{quote}", 1.0)
+
+
+@tool
+def get_weather(city: str) -> str:
+    """Get the weather of a city."""
+    time.sleep(1)  # Simulate a blocking call to a remote API
+    return f"{city} weather: cloudy, 23°C."
+
+
+@tool
+def nth_prime(n: int) -> int:
+    """Get the n-th prime number."""
+    count, candidate = 0, 1
+    while count < n:
+        candidate += 1
+        if all(candidate % divisor for divisor in range(2, int(candidate**0.5) + 1)):
+            count += 1
+    return candidate
+
+
+lmrp = ConcurrentToolLMRequestProcessor(
+    build_lm_request_processor(
+        model_id="openai/gpt-4.1-mini",
+        system_template="You are a helpful assistant. Call every tool you need at once.",
+        user_template="{question}",
+        config={"tools": [get_exchange_rate, get_weather, nth_prime]},
+    ),
+    cpu_bound={"nth_prime"},
+    timeouts={"get_weather": 5, "nth_prime": 10},
+)
+
+
+async def main():
+    started_at = time.perf_counter()
+    response = await lmrp.process(
+        question="What is the weather in Tokyo and in Paris, how many yen is 100 USD, and what is the 20000th prime?"
+    )
+    print(f"Response:\n{response}")
+    print(f"Took {time.perf_counter() - started_at:.1f} s")
+    lmrp.tool_executor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
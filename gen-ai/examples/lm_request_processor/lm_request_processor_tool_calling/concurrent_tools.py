@@ -0,0 +1,196 @@
+"""Concurrent execution of the tool calls of an LM turn.
+
+When the LM asks for several tool calls in one turn, they are independent of each other, so `ToolExecutor` runs them
+all at once instead of one after another: async tools are gathered on the event loop, sync tools run in a bounded
+thread pool, and tools marked as CPU bound run in a process pool. Each tool may have its own timeout. A tool that
+fails or times out returns an error message as its result, so the other results still reach the LM, and the results
+are returned in the order of the calls. A sync tool that times out cannot be interrupted, so it keeps its worker until
+it returns.
+
+`ConcurrentToolLMRequestProcessor` runs the tool calling loop of an LM request processor with a `ToolExecutor`.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/utilize-language-model-request-processor/extend-lm-capabilities-with-tools
+    [2] https://docs.python.org/3/library/asyncio-task.html#running-tasks-concurrently
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Iterable
+
+from gllm_inference.schema import Message, ToolResult
+
+logger = logging.getLogger(__name__)
+
+
+def _function(tool: Any) -> Any:
+    return getattr(tool, "func", tool)
+
+
+def _call_in_process(module_name: str, qualname: str, arguments: dict[str, Any]) -> Any:
+    # Tools are looked up by name in the worker process, since a decorated function cannot be pickled by reference
+    target: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        target = getattr(target, name)
+    return _function(target)(**arguments)
+
+
+class ToolExecutor:
+    """Executes the tool calls of an LM turn concurrently."""
+
+    def __init__(
+        self,
+        tools: Iterable[Any],
+        max_workers: int = 8,
+        cpu_bound: Iterable[str] = (),
+        timeouts: dict[str, float] | None = None,
+        default_timeout: float | None = 60.0,
+    ):
+        """Initialize the tool executor.
+
+        Args:
+            tools (Iterable[Any]): The tools, e.g. functions decorated with `@tool`.
+            max_workers (int, optional): The maximum number of sync tools running at once in threads, and of CPU bound
+                tools running at once in processes. Defaults to 8.
+            cpu_bound (Iterable[str], optional): The names of the sync tools to run in a process pool. They must be
+                defined at the top level of a module. Defaults to ().
+            timeouts (dict[str, float] | None, optional): The timeout in seconds of each tool, by name. Defaults to
+                None, in which case every tool uses `default_timeout`.
+            default_timeout (float | None, optional): The timeout in seconds of the other tools. Defaults to 60.0.
+                None means no timeout.
+        """
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_workers = max_workers
+        self.cpu_bound = frozenset(cpu_bound)
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+
+    async def execute(self, tool_calls: list[Any]) -> list[ToolResult]:
+        """Execute tool calls concurrently.
+
+        Args:
+            tool_calls (list[Any]): The tool calls of the LM output.
+
+        Returns:
+            list[ToolResult]: The result of each tool call, in the order of the calls.
+        """
+        outputs = await asyncio.gather(*(self._execute(tool_call) for tool_call in tool_calls))
+        return [ToolResult(id=tool_call.id, output=output) for tool_call, output in zip(tool_calls, outputs)]
+
+    async def _execute(self, tool_call: Any) -> str:
+        tool = self.tools.get(tool_call.name)
+        if tool is None:
+            return f"Error: unknown tool {tool_call.name!r}"
+
+        timeout = self.timeouts.get(tool_call.name, self.default_timeout)
+        try:
+            output = await asyncio.wait_for(self._run(tool, tool_call.args or {}), timeout)
+        except TimeoutError:
+            logger.warning("Tool %s timed out after %s seconds", tool_call.name, timeout)
+            return f"Error: {tool_call.name} timed out after {timeout} seconds"
+        except Exception as error:
+            logger.warning("Tool %s failed: %r", tool_call.name, error)
+            return f"Error: {tool_call.name} failed: {error}"
+        return output if isinstance(output, str) else str(output)
+
+    async def _run(self, tool: Any, arguments: dict[str, Any]) -> Any:
+        function = _function(tool)
+        if inspect.iscoroutinefunction(function):
+            return await function(**arguments)
+
+        if tool.name in self.cpu_bound:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(self.max_workers)
+            pool = self._process_pool
+            call = partial(_call_in_process, function.__module__, function.__qualname__, arguments)
+        else:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="tool")
+            pool = self._thread_pool
+            call = partial(function, **arguments)
+
+        output = await asyncio.get_running_loop().run_in_executor(pool, call)
+        return await output if inspect.isawaitable(output) else output
+
+    def close(self) -> None:
+        """Shut down the worker pools, without waiting for tools that are still running."""
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+
+class ConcurrentToolLMRequestProcessor:
+    """Wraps an LM request processor with tools to execute the tool calls of each LM turn concurrently.
+
+    All other attributes are forwarded to the wrapped processor.
+    """
+
+    def __init__(self, lm_request_processor: Any, max_lm_calls: int = 5, **kwargs: Any):
+        """Initialize the concurrent tool LM request processor.
+
+        Args:
+            lm_request_processor (Any): The LM request processor, whose LM invoker has tools, e.g. made with
+                `build_lm_request_processor(..., config={"tools": [...]})`.
+            max_lm_calls (int, optional): The maximum number of LM turns of a request. Defaults to 5.
+            **kwargs (Any): The other arguments of `ToolExecutor`, e.g. `timeouts`.
+
+        Raises:
+            ValueError: If `max_lm_calls` is less than 1.
+        """
+        if max_lm_calls < 1:
+            raise ValueError(f"max_lm_calls must be at least 1, got {max_lm_calls}")
+
+        self.lm_request_processor = lm_request_processor
+        self.max_lm_calls = max_lm_calls
+        self.tool_executor = ToolExecutor(lm_request_processor.lm_invoker.tools, **kwargs)
+
+    async def process(
+        self,
+        history: list[Message] | None = None,
+        hyperparameters: dict[str, Any] | None = None,
+        event_emitter: Any | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Process the request, executing the tool calls of each LM turn concurrently.
+
+        Args:
+            history (list[Message] | None, optional): The conversation history. Defaults to None.
+            hyperparameters (dict[str, Any] | None, optional): The hyperparameters of the LM. Defaults to None.
+            event_emitter (Any | None, optional): The event emitter of the LM. Defaults to None.
+            **kwargs (Any): The values of the prompt variables.
+
+        Returns:
+            Any: The parsed output of the last LM turn.
+
+        Raises:
+            RuntimeError: If the LM still asks for tool calls after `max_lm_calls` LM turns.
+        """
+        lm_request_processor = self.lm_request_processor
+        messages = lm_request_processor.prompt_builder.format(history=history, **kwargs)
+        for lm_call in range(1, self.max_lm_calls + 1):
+            lm_output = await lm_request_processor.lm_invoker.invoke(
+                messages, hyperparameters=hyperparameters, event_emitter=event_emitter
+            )
+            if not getattr(lm_output, "tool_calls", None):
+                break
+
+            if lm_call == self.max_lm_calls:
+                pending = ", ".join(tool_call.name for tool_call in lm_output.tool_calls)
+                raise RuntimeError(f"The LM still asked for tool calls ({pending}) after {lm_call} LM turns")
+
+            tool_results = await self.tool_executor.execute(lm_output.tool_calls)
+            messages = [*messages, Message.assistant(lm_output.tool_calls), Message.user(tool_results)]
+
+        output_parser = lm_request_processor.output_parser
+        return output_parser.parse(lm_output.response) if output_parser is not None else lm_output.response
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward any other attribute to the wrapped processor."""
+        return getattr(self.lm_request_processor, name)
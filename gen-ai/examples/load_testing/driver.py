@@ -0,0 +1,191 @@
+"""A load test driver for pipelines.
+
+`run_load` invokes a pipeline repeatedly for a fixed duration, either:
+- open loop, at a target rate (`rps`): requests arrive on schedule whether or not earlier ones have completed,
+  like real traffic, so queueing shows up in the latencies; or
+- closed loop, at a fixed `concurrency`: each worker sends its next request as soon as the previous one completes,
+  which measures the maximum throughput.
+
+The `LoadReport` holds the latency percentiles, the throughput, the event loop lag (how late the loop runs its
+callbacks, which grows when CPU bound work blocks it), and the memory use.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline
+"""
+
+import asyncio
+import math
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from gllm_pipeline.pipeline.pipeline import Pipeline
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the `q` percentile (0 to 100) of `values` with the nearest-rank method, or 0.0 if there are none."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class LoadReport:
+    """The results of a load test.
+
+    Attributes:
+        duration (float): The seconds from the first request to the last completion.
+        latencies (list[float]): The seconds each successful request took.
+        errors (dict[str, int]): The number of failed requests by exception type.
+        loop_lags (list[float]): The event loop lag samples in seconds.
+        peak_rss_mb (float | None): The peak resident memory of the process in MB, if available.
+        peak_traced_mb (float | None): The peak memory allocated by Python during the test in MB, if traced.
+    """
+
+    duration: float
+    latencies: list[float] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=dict)
+    loop_lags: list[float] = field(default_factory=list)
+    peak_rss_mb: float | None = None
+    peak_traced_mb: float | None = None
+
+    @property
+    def requests(self) -> int:
+        """The number of completed requests, successful or not."""
+        return len(self.latencies) + sum(self.errors.values())
+
+    @property
+    def throughput(self) -> float:
+        """The successful requests per second."""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    def format(self) -> str:
+        """Format the report as a table."""
+        lines = [
+            f"requests     {self.requests} ({sum(self.errors.values())} failed)",
+            f"throughput   {self.throughput:.1f} req/s",
+            f"latency      p50 {percentile(self.latencies, 50):.3f}s  p95 {percentile(self.latencies, 95):.3f}s  "
+            f"p99 {percentile(self.latencies, 99):.3f}s  max {max(self.latencies, default=0.0):.3f}s",
+            f"loop lag     p50 {percentile(self.loop_lags, 50) * 1000:.1f}ms  "
+            f"p99 {percentile(self.loop_lags, 99) * 1000:.1f}ms  max {max(self.loop_lags, default=0.0) * 1000:.1f}ms",
+        ]
+        if self.peak_rss_mb is not None:
+            lines.append(f"peak RSS     {self.peak_rss_mb:.1f} MB")
+        if self.peak_traced_mb is not None:
+            lines.append(f"peak traced  {self.peak_traced_mb:.1f} MB")
+        for error, count in self.errors.items():
+            lines.append(f"error        {error}: {count}")
+        return "\n".join(lines)
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+async def _monitor_loop_lag(lags: list[float], interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(
+    pipeline: Pipeline,
+    make_state: Callable[[int], dict[str, Any]],
+    config: dict[str, Any] | None = None,
+    rps: float | None = None,
+    concurrency: int | None = None,
+    duration: float = 10.0,
+    poisson: bool = True,
+    trace_memory: bool = False,
+    lag_interval: float = 0.01,
+    seed: int | None = None,
+) -> LoadReport:
+    """Run a load test against a pipeline.
+
+    Args:
+        pipeline (Pipeline): The pipeline to invoke.
+        make_state (Callable[[int], dict[str, Any]]): Builds the initial state of the n-th request.
+        config (dict[str, Any] | None, optional): The runtime config of every request. Defaults to None.
+        rps (float | None, optional): The target request rate of an open loop test. Defaults to None.
+        concurrency (int | None, optional): The number of workers of a closed loop test. Defaults to None.
+        duration (float, optional): The seconds during which requests are sent. Requests in flight at the end
+            are awaited. Defaults to 10.0.
+        poisson (bool, optional): Whether open loop arrivals are random (a Poisson process) rather than evenly
+            spaced. Defaults to True.
+        trace_memory (bool, optional): Whether to trace Python allocations, which slows the test down.
+            Defaults to False.
+        lag_interval (float, optional): The seconds between two event loop lag samples. Defaults to 0.01.
+        seed (int | None, optional): The random seed of the Poisson arrivals. Defaults to None.
+
+    Returns:
+        LoadReport: The results of the load test.
+
+    Raises:
+        ValueError: If neither or both of `rps` and `concurrency` are set.
+    """
+    if (rps is None) == (concurrency is None):
+        raise ValueError("Set either rps (open loop) or concurrency (closed loop)")
+
+    report = LoadReport(duration=0.0)
+    counter = iter(range(sys.maxsize))
+
+    async def send() -> None:
+        index = next(counter)
+        started_at = time.perf_counter()
+        try:
+            await pipeline.invoke(make_state(index), dict(config or {}))
+        except Exception as error:
+            name = type(error).__name__
+            report.errors[name] = report.errors.get(name, 0) + 1
+        else:
+            report.latencies.append(time.perf_counter() - started_at)
+
+    if trace_memory:
+        tracemalloc.start()
+    monitor = asyncio.create_task(_monitor_loop_lag(report.loop_lags, lag_interval))
+    started_at = time.perf_counter()
+    end_at = started_at + duration
+    try:
+        if rps is not None:
+            rng = random.Random(seed)
+            requests: set[asyncio.Task] = set()
+            next_at = started_at
+            while next_at < end_at:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                task = asyncio.create_task(send())
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+                next_at += rng.expovariate(rps) if poisson else 1 / rps
+            await asyncio.gather(*requests)
+        else:
+            async def worker() -> None:
+                while time.perf_counter() < end_at:
+                    await send()
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        report.duration = time.perf_counter() - started_at
+    finally:
+        monitor.cancel()
+        if trace_memory:
+            report.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+
+    report.peak_rss_mb = _peak_rss_mb()
+    return report
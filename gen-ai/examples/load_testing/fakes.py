@@ -0,0 +1,265 @@
+"""Drop-in fake components with simulated latency.
+
+The fakes take the place of the components that call a provider, so that a pipeline can be load tested without
+spending any quota:
+- `FakeLMInvoker`: an LM invoker, e.g. the `lm_invoker` of an `LMRequestProcessor`. Streams its response when
+  invoked with an event emitter.
+- `FakeEMInvoker`: an EM invoker returning deterministic embeddings.
+- `FakeDeepResearcher`: a deep researcher component.
+- `FakeRouter`: a router component picking routes with fixed probabilities.
+- `FakeRetriever`: a retriever component returning canned chunks.
+
+Each call waits for a latency drawn from a `LatencyModel` and fails with `SimulatedError` at the configured error
+rate. Given a seed, the drawn latencies, routes, and failures are reproducible.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/add-a-custom-component
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+from typing import Any, Callable
+
+from gllm_core.event import EventEmitter
+from gllm_core.schema import Chunk
+from gllm_core.schema.component import Component
+from gllm_inference.schema import LMOutput
+
+from latency import Constant, LatencyModel
+
+RESPONSE_EVENT_TYPE = "response"
+
+
+class SimulatedError(Exception):
+    """Raised by a fake component to simulate a provider failure."""
+
+
+class _Simulated:
+    """Draws latencies and failures for a fake component."""
+
+    def __init__(self, latency: LatencyModel, error_rate: float, seed: int | None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def simulate(self) -> None:
+        """Wait for a drawn latency, then fail at the error rate."""
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self._rng))
+        if self._rng.random() < self.error_rate:
+            raise SimulatedError(f"{type(self).__name__} failed (simulated)")
+
+
+class FakeLMInvoker(_Simulated):
+    """An LM invoker that answers with a canned response after a simulated latency.
+
+    The latency is the time to the first token, and every further token of the response adds `token_latency`, so
+    longer responses take longer whether they are streamed or not.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        response: str | Callable[[Any], str] = "This is a simulated response.",
+        token_latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initialize the fake LM invoker.
+
+        Args:
+            latency (LatencyModel): The time to the first token.
+            response (str | Callable[[Any], str], optional): The response, or a function computing it from the
+                prompt. Defaults to "This is a simulated response.".
+            token_latency (LatencyModel | None, optional): The time between two tokens. Defaults to None, in
+                which case the whole response arrives with the first token.
+            error_rate (float, optional): The share of invocations that fail. Defaults to 0.0.
+            seed (int | None, optional): The random seed. Defaults to None.
+        """
+        super().__init__(latency, error_rate, seed)
+        self.response = response
+        self.token_latency = token_latency or Constant(0.0)
+
+    async def invoke(
+        self,
+        prompt: Any,
+        hyperparameters: dict[str, Any] | None = None,
+        event_emitter: EventEmitter | None = None,
+        **kwargs: Any,
+    ) -> LMOutput:
+        """Simulate an invocation, streaming the response tokens to the event emitter if any.
+
+        Args:
+            prompt (Any): The prompt, passed to the response function if any.
+            hyperparameters (dict[str, Any] | None, optional): Ignored. Defaults to None.
+            event_emitter (EventEmitter | None, optional): The event emitter to stream the response to.
+                Defaults to None.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            LMOutput: The simulated output.
+        """
+        await self.simulate()
+        response = self.response(prompt) if callable(self.response) else self.response
+        tokens = response.split(" ")
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(self.token_latency.sample(self._rng))
+            if event_emitter is not None:
+                await event_emitter.emit(token if index == 0 else f" {token}", event_type=RESPONSE_EVENT_TYPE)
+        return LMOutput(response=response)
+
+
+class FakeEMInvoker(_Simulated):
+    """An EM invoker returning deterministic unit vectors after a simulated latency.
+
+    The same text always gets the same embedding, so a fake EM invoker can also back a vector data store.
+    """
+
+    def __init__(self, latency: LatencyModel, dimension: int = 256, error_rate: float = 0.0, seed: int | None = None):
+        """Initialize the fake EM invoker.
+
+        Args:
+            latency (LatencyModel): The latency of one invocation, whether it embeds one text or a batch.
+            dimension (int, optional): The embedding dimension. Defaults to 256.
+            error_rate (float, optional): The share of invocations that fail. Defaults to 0.0.
+            seed (int | None, optional): The random seed of the latencies and failures. Defaults to None.
+        """
+        super().__init__(latency, error_rate, seed)
+        self.dimension = dimension
+
+    async def invoke(self, text: str | list[str], **kwargs: Any) -> list[float] | list[list[float]]:
+        """Simulate an invocation.
+
+        Args:
+            text (str | list[str]): The text or texts to embed.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            list[float] | list[list[float]]: The embedding of the text, or one embedding per text.
+        """
+        await self.simulate()
+        if isinstance(text, str):
+            return self._embed(text)
+        return [self._embed(item) for item in text]
+
+    def _embed(self, text: str) -> list[float]:
+        rng = random.Random(hashlib.sha256(text.encode()).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimension)]
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector]
+
+
+class FakeDeepResearcher(_Simulated, Component):
+    """A deep researcher that returns a canned report after a simulated latency."""
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        report: str = "This is a simulated research report.",
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initialize the fake deep researcher.
+
+        Args:
+            latency (LatencyModel): The duration of one research.
+            report (str, optional): The report. Defaults to "This is a simulated research report.".
+            error_rate (float, optional): The share of researches that fail. Defaults to 0.0.
+            seed (int | None, optional): The random seed. Defaults to None.
+        """
+        Component.__init__(self)
+        _Simulated.__init__(self, latency, error_rate, seed)
+        self.report = report
+
+    async def _run(self, query: str, event_emitter: EventEmitter | None = None, **kwargs: Any) -> LMOutput:
+        """Simulate a research.
+
+        Args:
+            query (str): The research query.
+            event_emitter (EventEmitter | None, optional): The event emitter to send the report to.
+                Defaults to None.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            LMOutput: The simulated report.
+        """
+        await self.simulate()
+        if event_emitter is not None:
+            await event_emitter.emit(self.report, event_type=RESPONSE_EVENT_TYPE)
+        return LMOutput(response=self.report)
+
+
+class FakeRouter(_Simulated, Component):
+    """A router that picks a route with a fixed probability after a simulated latency."""
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        routes: dict[str, float],
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initialize the fake router.
+
+        Args:
+            latency (LatencyModel): The duration of one routing decision.
+            routes (dict[str, float]): The probability of each route, e.g. the production traffic mix.
+            error_rate (float, optional): The share of decisions that fail. Defaults to 0.0.
+            seed (int | None, optional): The random seed. Defaults to None.
+        """
+        Component.__init__(self)
+        _Simulated.__init__(self, latency, error_rate, seed)
+        self.routes = routes
+
+    async def _run(self, **kwargs: Any) -> str:
+        """Simulate a routing decision, whatever the inputs.
+
+        Returns:
+            str: The selected route.
+        """
+        await self.simulate()
+        return self._rng.choices(list(self.routes), weights=list(self.routes.values()))[0]
+
+
+class FakeRetriever(_Simulated, Component):
+    """A retriever that returns canned chunks after a simulated latency."""
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        contents: list[str] | None = None,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initialize the fake retriever.
+
+        Args:
+            latency (LatencyModel): The duration of one retrieval.
+            contents (list[str] | None, optional): The contents of the chunks to return. Defaults to None, in
+                which case 20 placeholder chunks are used.
+            error_rate (float, optional): The share of retrievals that fail. Defaults to 0.0.
+            seed (int | None, optional): The random seed. Defaults to None.
+        """
+        Component.__init__(self)
+        _Simulated.__init__(self, latency, error_rate, seed)
+        contents = contents or [f"Simulated document {index}." for index in range(20)]
+        self.chunks = [Chunk(content=content, metadata={"index": index}) for index, content in enumerate(contents)]
+
+    async def _run(self, query: str, top_k: int | None = None, **kwargs: Any) -> list[Chunk]:
+        """Simulate a retrieval.
+
+        Args:
+            query (str): The query, ignored.
+            top_k (int | None, optional): The number of chunks to return. Defaults to None, in which case every
+                chunk is returned.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            list[Chunk]: The first `top_k` canned chunks.
+        """
+        await self.simulate()
+        return self.chunks[:top_k]
@@ -0,0 +1,167 @@
+"""Latency distributions for simulated components.
+
+Every fake component draws the duration of each call from a `LatencyModel`:
+- `Constant`: always the same latency.
+- `LogNormal`: the long-tailed shape of real provider latencies, set from its median and p99.
+- `Replay`: latencies replayed from recorded samples or from a histogram of a production dashboard.
+
+References:
+    [1] https://en.wikipedia.org/wiki/Log-normal_distribution
+"""
+
+import bisect
+import json
+import math
+import random
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+_Z_99 = 2.3263478740408408  # the 99th percentile of the standard normal distribution
+
+
+class LatencyModel(ABC):
+    """A distribution of latencies in seconds."""
+
+    @abstractmethod
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency.
+
+        Args:
+            rng (random.Random): The random number generator to draw from.
+
+        Returns:
+            float: The latency in seconds.
+        """
+
+    def scaled(self, factor: float) -> "Scaled":
+        """Return this distribution with every latency multiplied by `factor`, e.g. to compress a test run."""
+        return Scaled(self, factor)
+
+
+class Constant(LatencyModel):
+    """Always the same latency."""
+
+    def __init__(self, seconds: float):
+        """Initialize the constant latency.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+        self.seconds = seconds
+
+    def sample(self, rng: random.Random) -> float:
+        """Return the constant latency."""
+        return self.seconds
+
+
+class LogNormal(LatencyModel):
+    """A log-normal latency distribution, set from its median and its p99."""
+
+    def __init__(self, median: float, p99: float, minimum: float = 0.0):
+        """Initialize the log-normal latency.
+
+        Args:
+            median (float): The median latency in seconds.
+            p99 (float): The 99th percentile latency in seconds, at least the median.
+            minimum (float, optional): A latency floor in seconds, e.g. the network round trip. Defaults to 0.0.
+        """
+        if p99 < median:
+            raise ValueError(f"p99 ({p99}) must be at least the median ({median})")
+
+        self.mu = math.log(median)
+        self.sigma = math.log(p99 / median) / _Z_99
+        self.minimum = minimum
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a log-normal latency."""
+        return max(self.minimum, rng.lognormvariate(self.mu, self.sigma))
+
+
+class Replay(LatencyModel):
+    """Latencies replayed from recorded samples."""
+
+    def __init__(self, samples: list[float]):
+        """Initialize the replayed latency.
+
+        Args:
+            samples (list[float]): The recorded latencies in seconds.
+        """
+        if not samples:
+            raise ValueError("At least one latency sample is required")
+
+        self.samples = list(samples)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "Replay":
+        """Load recorded latencies from a JSON file holding a list of seconds.
+
+        Args:
+            path (str | Path): The JSON file.
+
+        Returns:
+            Replay: The replayed latency.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_histogram(cls, buckets: dict[float, int]) -> "ReplayHistogram":
+        """Replay a latency histogram, e.g. exported from a monitoring dashboard.
+
+        Args:
+            buckets (dict[float, int]): The number of requests per bucket, keyed by the bucket's upper bound in
+                seconds. Each bucket starts at the previous upper bound.
+
+        Returns:
+            ReplayHistogram: The replayed latency.
+        """
+        return ReplayHistogram(buckets)
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one of the recorded latencies."""
+        return rng.choice(self.samples)
+
+
+class ReplayHistogram(LatencyModel):
+    """Latencies drawn from a histogram, uniformly within each bucket."""
+
+    def __init__(self, buckets: dict[float, int]):
+        """Initialize the histogram latency.
+
+        Args:
+            buckets (dict[float, int]): The number of requests per bucket, keyed by the bucket's upper bound in
+                seconds. Each bucket starts at the previous upper bound.
+        """
+        if not any(buckets.values()):
+            raise ValueError("At least one bucket must hold a request")
+
+        self.bounds = sorted(buckets)
+        self.cumulative = []
+        total = 0
+        for bound in self.bounds:
+            total += buckets[bound]
+            self.cumulative.append(total)
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a bucket by its share of the requests, then a latency within the bucket."""
+        index = bisect.bisect_right(self.cumulative, rng.randrange(self.cumulative[-1]))
+        lower = self.bounds[index - 1] if index else 0.0
+        return rng.uniform(lower, self.bounds[index])
+
+
+class Scaled(LatencyModel):
+    """Another latency distribution with every latency multiplied by a factor."""
+
+    def __init__(self, model: LatencyModel, factor: float):
+        """Initialize the scaled latency.
+
+        Args:
+            model (LatencyModel): The distribution to scale.
+            factor (float): The factor to multiply every latency by.
+        """
+        self.model = model
+        self.factor = factor
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency from the wrapped distribution and scale it."""
+        return self.model.sample(rng) * self.factor
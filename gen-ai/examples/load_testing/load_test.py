@@ -0,0 +1,130 @@
+"""Example script to load test a routed RAG pipeline offline, with simulated component latency.
+
+The pipeline has the shape of the semantic routing RAG pipeline, but its router, retriever, and language models are
+fakes whose latencies follow the distributions below, so no provider is called.
+
+Usage:
+    python load_test.py --rps 50 --duration 20
+    python load_test.py --concurrency 100 --duration 20
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import argparse
+import asyncio
+
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.prompt_builder import PromptBuilder
+from gllm_inference.request_processor import LMRequestProcessor
+from gllm_pipeline.pipeline.pipeline import Pipeline
+from gllm_pipeline.pipeline.states import RAGState
+from gllm_pipeline.steps import step, switch
+
+from driver import run_load
+from fakes import FakeLMInvoker, FakeRetriever, FakeRouter
+from latency import Constant, LogNormal, Replay
+
+QUERIES = [
+    "Give me nocturnal creatures from the dataset",
+    "Which animals live in the desert?",
+    "What is the capital of France?",
+    "Tell me a joke",
+]
+
+
+class RouterState(RAGState):
+    """State for the router."""
+    route: str
+    source: str
+
+
+def build_pipeline(scale: float = 1.0) -> Pipeline:
+    """Build the routed RAG pipeline with fake components.
+
+    Args:
+        scale (float, optional): The factor to multiply every simulated latency by. Defaults to 1.0.
+
+    Returns:
+        Pipeline: The pipeline.
+    """
+    # Latencies of a typical deployment: an embedding based router, a vector store, and a small language model
+    router = FakeRouter(LogNormal(median=0.05, p99=0.3).scaled(scale), routes={"knowledge_base": 0.7, "general": 0.3})
+    retriever = FakeRetriever(
+        Replay.from_histogram({0.02: 50, 0.05: 35, 0.1: 12, 0.5: 3}).scaled(scale),
+    )
+    lm_invoker = FakeLMInvoker(
+        LogNormal(median=0.6, p99=4.0, minimum=0.1).scaled(scale),
+        response="Owls, bats, and fennec foxes are nocturnal creatures from the dataset.",
+        token_latency=Constant(0.01 * scale),
+        error_rate=0.01,
+    )
+
+    response_synthesizer = ResponseSynthesizer.stuff(
+        lm_request_processor=LMRequestProcessor(
+            prompt_builder=PromptBuilder(system_template="Answer using the context: {context}", user_template="{query}"),
+            lm_invoker=lm_invoker,
+        )
+    )
+    response_synthesizer_general = ResponseSynthesizer.stuff(
+        lm_request_processor=LMRequestProcessor(
+            prompt_builder=PromptBuilder(
+                system_template="You are a helpful assistant that answers general knowledge questions.",
+                user_template="{query}",
+            ),
+            lm_invoker=lm_invoker,
+        )
+    )
+
+    retrieve_step = step(
+        component=retriever,
+        input_map={"query": "user_query", "top_k": "top_k"},
+        output_state="chunks",
+    )
+    synthesize_step = step(
+        component=response_synthesizer,
+        input_map={"query": "user_query", "chunks": "chunks"},
+        output_state="response",
+    )
+    synthesize_general_step = step(
+        component=response_synthesizer_general,
+        input_map={"query": "user_query"},
+        output_state="response",
+    )
+    conditional_step = switch(
+        condition=router,
+        branches={
+            "knowledge_base": [retrieve_step, synthesize_step],
+            "general": synthesize_general_step,
+        },
+        default=synthesize_general_step,
+        input_map={"source": "user_query"},
+        output_state="route",
+    )
+    return Pipeline(steps=[conditional_step], state_type=RouterState)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rps", type=float, help="Target request rate (open loop)")
+    mode.add_argument("--concurrency", type=int, help="Number of concurrent workers (closed loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds during which requests are sent")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor to multiply every simulated latency by")
+    parser.add_argument("--trace-memory", action="store_true", help="Trace Python allocations (slower)")
+    args = parser.parse_args()
+
+    report = await run_load(
+        build_pipeline(args.scale),
+        make_state=lambda index: {"user_query": QUERIES[index % len(QUERIES)]},
+        config={"top_k": 5},
+        rps=args.rps,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        trace_memory=args.trace_memory,
+    )
+    print(report.format())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())